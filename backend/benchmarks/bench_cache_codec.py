@@ -0,0 +1,119 @@
+"""
+Benchmark: cache entry encoding, legacy JSON versus services.cache_codec.
+
+Builds representative cached results for classify, detect, segment and
+generate, then reports stored bytes and mean encode/decode time for the
+previous path (json.dumps(..., default=str), as CacheService used to store
+entries) and for the versioned binary codec.
+
+Usage (from the backend directory):
+    python benchmarks/bench_cache_codec.py --iterations 2000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import cache_codec
+
+
+def wrap(service_type: str, data: dict) -> dict:
+    """Wrap a provider result the way CacheService stores it"""
+    return {
+        "result": {"success": True, "data": data, "processing_time": 1834.27},
+        "cached_at": str(int(time.time())),
+        "service_type": service_type,
+        "ttl_hours": 168,
+        "tags": [f"service:{service_type}", "user:1"]
+    }
+
+
+def build_payloads() -> dict:
+    rng = random.Random(7)
+    labels = ["person", "car", "bicycle", "dog", "traffic light", "bus", "building", "tree", "bench", "sign"]
+
+    classify = wrap("classify", {
+        "class": "mountain landscape",
+        "confidence": 0.92,
+        "description": "A scenic mountain landscape with snow-capped peaks above a pine forest and a lake",
+        "alternatives": [
+            {"label": "nature scene", "score": 0.87},
+            {"label": "outdoor landscape", "score": 0.83},
+            {"label": "scenic view", "score": 0.79}
+        ]
+    })
+    detect = wrap("detect", {
+        "objects": [
+            {
+                "name": rng.choice(labels),
+                "confidence": round(rng.uniform(0.5, 0.99), 4),
+                "bbox": [round(rng.uniform(0, 90), 2) for _ in range(4)]
+            }
+            for _ in range(60)
+        ]
+    })
+    segment = wrap("segment", {
+        "segments": [
+            {
+                "name": rng.choice(labels),
+                "mask": "polygon(" + ", ".join(
+                    f"{rng.uniform(0, 100):.1f}% {rng.uniform(0, 100):.1f}%" for _ in range(120)
+                ) + ")",
+                "confidence": round(rng.uniform(0.5, 0.99), 4)
+            }
+            for _ in range(12)
+        ]
+    })
+    generate = wrap("generate", {
+        "url": "https://api.together.ai/imgproxy/" + "".join(rng.choice("abcdef0123456789") for _ in range(96)) + "/format:jpeg/" + "x" * 80,
+        "prompt": "a watercolor painting of a lighthouse on a rocky coast at sunset, dramatic clouds"
+    })
+    return {"classify": classify, "detect": detect, "segment": segment, "generate": generate}
+
+
+def legacy_encode(value) -> bytes:
+    return json.dumps(value, default=str).encode()
+
+
+def legacy_decode(data: bytes):
+    return json.loads(data)
+
+
+def measure(encode, decode, value, iterations: int):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        data = encode(value)
+    encode_us = (time.perf_counter() - start) / iterations * 1e6
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        decode(data)
+    decode_us = (time.perf_counter() - start) / iterations * 1e6
+    return len(data), encode_us, decode_us
+
+
+def main(iterations: int):
+    info = cache_codec.get_codec_info()
+    print(f"codec: v{info['version']} {info['format']} + {info['compression']} "
+          f"(threshold {info['compression_threshold']} B)")
+    print(f"{'service':<10}{'json B':>10}{'codec B':>10}{'saved':>8}"
+          f"{'json enc us':>13}{'codec enc us':>14}{'json dec us':>13}{'codec dec us':>14}")
+
+    for service_type, value in build_payloads().items():
+        assert cache_codec.decode(cache_codec.encode(value)) == json.loads(legacy_encode(value))
+        json_size, json_enc, json_dec = measure(legacy_encode, legacy_decode, value, iterations)
+        codec_size, codec_enc, codec_dec = measure(cache_codec.encode, cache_codec.decode, value, iterations)
+        saved = (1 - codec_size / json_size) * 100
+        print(f"{service_type:<10}{json_size:>10}{codec_size:>10}{saved:>7.1f}%"
+              f"{json_enc:>13.1f}{codec_enc:>14.1f}{json_dec:>13.1f}{codec_dec:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000, help="encode/decode rounds per payload")
+    args = parser.parse_args()
+    main(args.iterations)
@@ -0,0 +1,93 @@
+"""
+Benchmark: concurrent /api/v1/generate calls against a simulated slow provider.
+
+Runs N generate requests at once through the ASGI app and reports the wall
+clock time next to the sum of the individual request times. With a
+non-blocking provider layer the requests overlap, so wall time stays close to
+a single call. Pass --blocking to simulate the old behaviour (a synchronous
+client called inside ``async def``) for comparison. A /api/health probe is
+sent while the load is running to show whether the event loop stays responsive.
+
+Usage (from the backend directory):
+    python benchmarks/bench_concurrent_generate.py -n 16 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("TOGETHER_API_KEY", "bench-key")
+
+import httpx
+
+
+class FakeImages:
+    """Stand-in for the Together images resource with a fixed upstream latency"""
+
+    def __init__(self, latency: float, blocking: bool):
+        self.latency = latency
+        self.blocking = blocking
+
+    async def generate(self, **kwargs):
+        if self.blocking:
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+        return SimpleNamespace(data=[SimpleNamespace(url="https://example.com/image.png")])
+
+
+async def run(n: int, latency: float, blocking: bool, concurrency: int):
+    import main
+    from services import ai_services
+
+    for provider in ai_services.PROVIDER_CONCURRENCY_LIMITS:
+        ai_services.PROVIDER_CONCURRENCY_LIMITS[provider] = concurrency
+        ai_services._provider_semaphores[provider] = ai_services.ProviderLimit(concurrency)
+    main.ai_service.together_client = SimpleNamespace(images=FakeImages(latency, blocking))
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def generate(i: int) -> float:
+            start = time.perf_counter()
+            response = await client.post("/api/v1/generate", json={"prompt": f"benchmark prompt {i}"})
+            elapsed = time.perf_counter() - start
+            if response.status_code != 200:
+                print(f"request {i} failed: {response.status_code} {response.text}")
+            return elapsed
+
+        async def health() -> float:
+            # Measured from when the probe is due, so time spent waiting for a
+            # blocked event loop is included
+            due = time.perf_counter() + latency / 4
+            await asyncio.sleep(latency / 4)
+            await client.get("/api/health")
+            return time.perf_counter() - due
+
+        start = time.perf_counter()
+        results = await asyncio.gather(health(), *(generate(i) for i in range(n)))
+        wall = time.perf_counter() - start
+
+    health_latency, durations = results[0], results[1:]
+    print(f"mode:                 {'blocking' if blocking else 'non-blocking'}")
+    print(f"requests:             {n}")
+    print(f"provider latency:     {latency * 1000:.0f} ms")
+    print(f"provider concurrency: {concurrency}")
+    print(f"wall time:            {wall * 1000:.0f} ms")
+    print(f"sum of request times: {sum(durations) * 1000:.0f} ms")
+    print(f"overlap factor:       {sum(durations) / wall:.1f}x")
+    print(f"/api/health latency:  {health_latency * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=16, help="number of concurrent generate requests")
+    parser.add_argument("--latency", type=float, default=0.5, help="simulated provider latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=8, help="per-provider concurrency limit")
+    parser.add_argument("--blocking", action="store_true", help="simulate a synchronous provider client")
+    args = parser.parse_args()
+    asyncio.run(run(args.n, args.latency, args.blocking, args.concurrency))
@@ -0,0 +1,65 @@
+"""
+Benchmark: vision payload size and preprocessing cost per task.
+
+Encodes synthetic photos at typical camera resolutions, then reports, for
+classify, detect and segment, the data-URL length sent upstream before and
+after services.image_preprocessing and the mean preprocessing time. Upstream
+latency depends on the provider; the live before/after comparison is served by
+GET /api/v1/performance/preprocessing.
+
+Usage (from the backend directory):
+    python benchmarks/bench_image_preprocessing.py --iterations 5
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.image_preprocessing import IMAGE_PREPROCESS_CONFIG, ImagePreprocessor
+from services.uploads import IngestedUpload
+
+RESOLUTIONS = [(1280, 960), (4032, 3024), (6000, 4000)]
+
+
+def synthetic_photo(width: int, height: int) -> bytes:
+    """Smooth shapes plus sensor-like noise, so JPEG sizes resemble real photos"""
+    rng = np.random.default_rng(width)
+    base = Image.fromarray(rng.integers(0, 255, size=(24, 32, 3), dtype=np.uint8)).resize((width, height), Image.BICUBIC)
+    pixels = np.asarray(base, dtype=np.int16) + rng.normal(0, 6, size=(height, width, 3)).astype(np.int16)
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buffer, format="JPEG", quality=92)
+    return buffer.getvalue()
+
+
+async def measure(preprocessor: ImagePreprocessor, service_type: str, upload: IngestedUpload, iterations: int):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        prepared = await preprocessor.prepare(service_type, upload)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / iterations
+    return len(prepared.data_url()), elapsed_ms
+
+
+def main(iterations: int):
+    preprocessor = ImagePreprocessor()
+    preprocessor.enabled = True
+    print(f"{'image':>12}{'task':>10}{'max side':>10}{'before KB':>11}{'after KB':>10}{'saved':>8}{'prep ms':>9}")
+    for width, height in RESOLUTIONS:
+        upload = IngestedUpload.from_bytes(synthetic_photo(width, height), "image/jpeg")
+        before = len(upload.data_url())
+        for service_type, config in IMAGE_PREPROCESS_CONFIG.items():
+            after, elapsed_ms = asyncio.run(measure(preprocessor, service_type, upload, iterations))
+            print(f"{width}x{height:<7}{service_type:>10}{config['max_side']:>10}{before / 1024:>11.0f}"
+                  f"{after / 1024:>10.0f}{(1 - after / before) * 100:>7.1f}%{elapsed_ms:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5)
+    main(parser.parse_args().iterations)
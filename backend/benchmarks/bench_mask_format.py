@@ -0,0 +1,87 @@
+"""
+Benchmark: segmentation response size and serialisation time per mask format.
+
+Builds segmentation results with real per-pixel masks, then compares:
+
+- the current schema, where each mask is a JSON array string in
+  SegmentationSegment.mask;
+- the inline RLE format (mask_format=rle);
+- the binary payload (mask_format=binary).
+
+For each it reports the response bytes, the cache entry bytes
+(services.cache_codec) and the mean time to serialise a response from the
+masks.
+
+Usage (from the backend directory):
+    python benchmarks/bench_mask_format.py --width 1024 --height 768 --segments 6
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import cache_codec
+from services.mask_codec import mask_to_rle, pack_binary
+
+
+def build_masks(width: int, height: int, count: int):
+    """Overlapping ellipses with ragged edges, roughly like model output"""
+    rng = np.random.default_rng(11)
+    ys, xs = np.mgrid[0:height, 0:width]
+    masks = []
+    for _ in range(count):
+        cx, cy = rng.uniform(0.2, 0.8) * width, rng.uniform(0.2, 0.8) * height
+        rx, ry = rng.uniform(0.05, 0.3) * width, rng.uniform(0.05, 0.3) * height
+        noise = rng.normal(0, 0.03, size=(height, width))
+        masks.append(((xs - cx) / rx) ** 2 + ((ys - cy) / ry) ** 2 + noise <= 1)
+    return masks
+
+
+def timed(func, iterations: int):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        output = func()
+    return output, (time.perf_counter() - start) * 1000 / iterations
+
+
+def main(width: int, height: int, count: int, iterations: int):
+    masks = build_masks(width, height, count)
+    names = [f"segment {i}" for i in range(count)]
+
+    def array_response():
+        segments = [
+            {"name": name, "mask": json.dumps(mask.astype(np.uint8).tolist(), separators=(",", ":")), "confidence": 0.9}
+            for name, mask in zip(names, masks)
+        ]
+        return segments, json.dumps({"job_id": 1, "segments": segments, "processing_time": 1.0}).encode()
+
+    def rle_response():
+        segments = [{"name": name, "rle": mask_to_rle(mask), "confidence": 0.9} for name, mask in zip(names, masks)]
+        return segments, json.dumps({"job_id": 1, "segments": segments, "processing_time": 1.0}).encode()
+
+    def binary_response():
+        segments = [{"name": name, "rle": mask_to_rle(mask), "confidence": 0.9} for name, mask in zip(names, masks)]
+        return segments, pack_binary({"job_id": 1, "processing_time": 1.0}, segments)
+
+    print(f"{count} masks of {width}x{height}")
+    print(f"{'format':>14}{'response KB':>14}{'cache KB':>11}{'serialise ms':>15}")
+    for label, build in (("json array", array_response), ("rle", rle_response), ("binary", binary_response)):
+        (segments, body), elapsed_ms = timed(build, iterations)
+        # "json array" is the cache entry as stored before array masks were compacted to RLE
+        cache_bytes = len(cache_codec.encode({"result": {"success": True, "data": {"segments": segments}}}))
+        print(f"{label:>14}{len(body) / 1024:>14.1f}{cache_bytes / 1024:>11.1f}{elapsed_ms:>15.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1024)
+    parser.add_argument("--height", type=int, default=768)
+    parser.add_argument("--segments", type=int, default=6)
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+    main(args.width, args.height, args.segments, args.iterations)
@@ -0,0 +1,87 @@
+"""
+Benchmark: MemoryStorage read queries, indexed versus full scan-and-sort.
+
+Fills a MemoryStorage with N jobs and N chat messages spread over many users,
+then times get_recent_ai_jobs, get_ai_jobs_by_user and get_chat_history
+against the scan-and-sort queries they replaced, which are reproduced below
+over the same records.
+
+Usage (from the backend directory):
+    python benchmarks/bench_storage_index.py --records 100000 1000000 --users 1000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.storage import MemoryStorage
+
+
+def scan_recent_jobs(storage: MemoryStorage, limit: int):
+    return sorted(storage.ai_jobs.values(), key=lambda x: x.created_at, reverse=True)[:limit]
+
+
+def scan_jobs_by_user(storage: MemoryStorage, user_id: int):
+    user_jobs = [job for job in storage.ai_jobs.values() if job.user_id == user_id]
+    return sorted(user_jobs, key=lambda x: x.created_at, reverse=True)
+
+
+def scan_chat_history(storage: MemoryStorage, user_id: int, limit: int):
+    user_messages = [msg for msg in storage.chat_messages.values() if msg.user_id == user_id]
+    return sorted(user_messages, key=lambda x: x.timestamp)[-limit:]
+
+
+async def fill(records: int, users: int) -> MemoryStorage:
+    # Retention off, so the store holds every record the table reports
+    storage = MemoryStorage(max_jobs=0, max_messages=0, max_age_hours=0, max_bytes=0)
+    for i in range(records):
+        user_id = i % users + 1
+        await storage.create_ai_job({"user_id": user_id, "service_type": "generate", "prompt": f"prompt {i}"})
+        await storage.create_chat_message({"user_id": user_id, "role": "user", "content": f"message {i}"})
+    return storage
+
+
+async def time_ms(query, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await query()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+async def run(record_counts, users: int, iterations: int):
+    print(f"{'records':>9}  {'query':<26}{'scan ms':>10}{'index ms':>11}{'speedup':>10}")
+    for records in record_counts:
+        storage = await fill(records, users)
+        user_id = users // 2
+
+        async def scan(query, *args):
+            return query(storage, *args)
+
+        queries = [
+            ("recent jobs (20)",
+             lambda: scan(scan_recent_jobs, 20),
+             lambda: storage.get_recent_ai_jobs(20)),
+            (f"jobs by user ({records // users})",
+             lambda: scan(scan_jobs_by_user, user_id),
+             lambda: storage.get_ai_jobs_by_user(user_id)),
+            ("chat history (50)",
+             lambda: scan(scan_chat_history, user_id, 50),
+             lambda: storage.get_chat_history(user_id, 50)),
+        ]
+        for name, scanned, indexed in queries:
+            assert [r.id for r in await scanned()] == [r.id for r in await indexed()]
+            scan_ms = await time_ms(scanned, iterations)
+            index_ms = await time_ms(indexed, iterations)
+            print(f"{records:>9}  {name:<26}{scan_ms:>10.3f}{index_ms:>11.4f}{scan_ms / index_ms:>9.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.records, args.users, args.iterations))
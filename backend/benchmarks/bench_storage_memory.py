@@ -0,0 +1,88 @@
+"""
+Benchmark: memory held per stored job, plain dicts versus slotted JobRecords.
+
+Builds N jobs twice with identical payloads (a unique prompt, a small result
+and parameters dict): once as the ten-key dicts MemoryStorage used to store,
+and once as services.storage.JobRecord with interned ServiceType/JobStatus
+enums. Reports the tracemalloc bytes per job for each.
+
+Usage (from the backend directory):
+    python benchmarks/bench_storage_memory.py --jobs 1000000
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.database import JobStatus, ServiceType
+from services.storage import JobRecord
+
+SERVICES = ["generate", "classify", "detect", "segment", "chat"]
+
+
+def payload(i: int):
+    return f"prompt {i}", {"url": f"https://img/{i}.png"}, {"width": 1024}
+
+
+def as_dict(i: int):
+    prompt, result, parameters = payload(i)
+    return {
+        "id": i,
+        "user_id": 1,
+        "service_type": SERVICES[i % 5],
+        "prompt": prompt,
+        "image_url": None,
+        "status": "completed",
+        "result": result,
+        "parameters": parameters,
+        "created_at": datetime.utcnow(),
+        "completed_at": datetime.utcnow()
+    }
+
+
+def as_record(i: int):
+    prompt, result, parameters = payload(i)
+    return JobRecord(
+        id=i,
+        user_id=1,
+        service_type=ServiceType(SERVICES[i % 5]),
+        prompt=prompt,
+        image_url=None,
+        status=JobStatus("completed"),
+        result=result,
+        parameters=parameters,
+        created_at=datetime.utcnow(),
+        completed_at=datetime.utcnow()
+    )
+
+
+def bytes_per_job(build, jobs: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    store = {i: build(i) for i in range(jobs)}
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    return current / jobs
+
+
+def main(jobs: int):
+    # The payload tuple itself is not part of either layout
+    payload_only = bytes_per_job(payload, jobs) - sys.getsizeof(payload(0))
+    before = bytes_per_job(as_dict, jobs)
+    after = bytes_per_job(as_record, jobs)
+    print(f"{jobs} jobs")
+    print(f"{'layout':<12}{'bytes/job':>11}{'excluding payload':>20}{'total MB':>10}")
+    for name, per_job in (("dict", before), ("JobRecord", after)):
+        print(f"{name:<12}{per_job:>11.0f}{per_job - payload_only:>20.0f}{per_job * jobs / 2**20:>10.0f}")
+    print(f"saved {before - after:.0f} bytes per job ({(1 - after / before) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=1_000_000)
+    main(parser.parse_args().jobs)
@@ -0,0 +1,104 @@
+"""
+Benchmark: peak memory per vision request, in-memory base64 versus streaming ingestion.
+
+For each upload size, a child process builds the provider image payload the
+way the vision handlers used to (image.read(), base64.b64encode(...).decode(),
+then the data-URL f-string in AIServiceManager) and the way they do now
+(services.uploads.ingest_upload, then IngestedUpload.data_url()). The upload
+starts in a SpooledTemporaryFile rolled to disk, as Starlette leaves it.
+Each mode runs in a fresh process so its peak RSS is not hidden by the
+other's. Traced Python allocations are reported too.
+
+Usage (from the backend directory):
+    python benchmarks/bench_upload_memory.py --sizes 1 5 10
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_upload(size: int):
+    from fastapi import UploadFile
+    from starlette.datastructures import Headers
+
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    block = os.urandom(1024 * 1024)
+    for offset in range(0, size, len(block)):
+        spool.write(block[:size - offset])
+    spool.seek(0)
+    return UploadFile(spool, filename="photo.jpg", headers=Headers({"content-type": "image/jpeg"}))
+
+
+async def legacy_payload(upload) -> str:
+    image_data = await upload.read()
+    base64_image = base64.b64encode(image_data).decode("utf-8")
+    return f"data:image/jpeg;base64,{base64_image}"
+
+
+async def streaming_payload(upload) -> str:
+    from services.uploads import ingest_upload
+
+    ingested = await ingest_upload(upload, max_size=1 << 40)
+    return ingested.data_url()
+
+
+def child(mode: str, size_mb: float):
+    # Imported up front in both modes, so the baseline includes the modules either way
+    import services.uploads  # noqa: F401
+
+    upload = make_upload(int(size_mb * 1024 * 1024))
+    build = legacy_payload if mode == "legacy" else streaming_payload
+
+    baseline = peak_rss_mb()
+    tracemalloc.start()
+    url = asyncio.run(build(upload))
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(json.dumps({
+        "rss_delta_mb": peak_rss_mb() - baseline,
+        "traced_peak_mb": traced_peak / (1024 * 1024),
+        "payload_chars": len(url)
+    }))
+
+
+def run_child(mode: str, size_mb: float) -> dict:
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", mode, "--sizes", str(size_mb)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(sizes):
+    print(f"{'upload MB':>10}{'legacy RSS':>13}{'stream RSS':>13}{'legacy traced':>16}{'stream traced':>16}")
+    for size_mb in sizes:
+        legacy = run_child("legacy", size_mb)
+        streaming = run_child("streaming", size_mb)
+        assert legacy["payload_chars"] == streaming["payload_chars"]
+        print(f"{size_mb:>10.1f}{legacy['rss_delta_mb']:>11.1f}MB{streaming['rss_delta_mb']:>11.1f}MB"
+              f"{legacy['traced_peak_mb']:>14.1f}MB{streaming['traced_peak_mb']:>14.1f}MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 5, 10], help="upload sizes in MB")
+    parser.add_argument("--child", choices=["legacy", "streaming"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.sizes[0])
+    else:
+        main(args.sizes)
@@ -1,5 +1,9 @@
 import os
-from pydantic import BaseSettings
+try:
+    # pydantic 2 moved BaseSettings out; its v1 shim keeps this class working unchanged
+    from pydantic.v1 import BaseSettings
+except ImportError:
+    from pydantic import BaseSettings
 
 class Settings(BaseSettings):
     # API Configuration
@@ -1,16 +1,18 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Depends
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Depends, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
 import uvicorn
 import os
 import asyncio
-import base64
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 import json
+import time
 
 from models.schemas import (
+    GenerationParameters,
     ImageGenerationRequest, 
     ImageGenerationResponse,
     ChatRequest,
@@ -19,10 +21,24 @@ from models.schemas import (
     ChatHistoryResponse,
     ClassificationResponse,
     DetectionResponse,
-    SegmentationResponse
+    SegmentationResponse,
+    JobAcceptedResponse
 )
 from models.database import Base, User, AIRequest, ChatSession, ChatMessage, ServiceType
-from services.ai_services import AIServiceManager
+from services.ai_services import ai_service_manager
+from services.http_transport import http_transport
+from services.request_coalescer import request_coalescer, content_hash
+from services.uploads import IngestedUpload, UploadSizeLimitMiddleware, ingest_upload, release_after
+from services.semantic_cache import semantic_cache
+from services.perceptual_cache import perceptual_cache
+from services.image_preprocessing import image_preprocessor, upright_size
+from services.mask_codec import BINARY_MASK_MEDIA_TYPE, mask_grid, pack_binary, render_segments
+from services.tiled_detection import (
+    DEFAULT_TILE_OVERLAP, DEFAULT_TILE_SIZE, TILING_ERROR_CODES, detect_tiled
+)
+from services.cache_warmer import cache_warmer, CACHE_WARM_ON_STARTUP
+from services.job_queue import job_queue, JobQueueFull, JOB_LONG_POLL_MAX_SECONDS
+from services.job_events import format_sse, job_events
 from services.rate_limiter import RateLimitService, check_rate_limit
 from services.storage import MemoryStorage
 from auth.security import get_current_active_user
@@ -42,6 +58,12 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Oversized vision uploads are refused while the body streams in
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    paths=["/api/v1/classify", "/api/v1/detect", "/api/v1/segment"]
+)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -60,10 +82,11 @@ from routes.mlops import router as mlops_router
 app.include_router(mlops_router, prefix="/api/v1", tags=["MLOps & Analytics"])
 
 # Initialize services
-ai_service = AIServiceManager()
+ai_service = ai_service_manager
 
 #init storage
-storage = MemoryStorage()
+storage = MemoryStorage(event_bus=job_events)
+cache_warmer.storage = storage
 
 # Import monitoring and MLOps services
 from services.mlflow_service import mlflow_service
@@ -77,6 +100,148 @@ async def startup_event():
     print("🚀 AI Showcase Platform API Starting...")
     print("📝 API Documentation available at: /docs")
     print("🔬 ReDoc Documentation available at: /redoc")
+    if os.getenv("HTTP_PRECONNECT", "true").lower() == "true":
+        asyncio.create_task(http_transport.preconnect())
+    await cache_service.start()
+    job_queue.start()
+    job_events.start()
+    storage.start()
+    await semantic_cache.load()
+    if CACHE_WARM_ON_STARTUP:
+        cache_warmer.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled provider connections on shutdown"""
+    cache_warmer.cancel()
+    await job_queue.stop()
+    await job_events.stop()
+    await storage.stop()
+    await http_transport.close()
+    await cache_service.aclose()
+
+async def run_ai_service(
+    service_type: str,
+    input_hash: str,
+    parameters: Dict[str, Any],
+    call,
+    response: Response,
+    semantic_text: Optional[str] = None,
+    semantic_namespace: str = "",
+    image: Optional[IngestedUpload] = None
+) -> Dict[str, Any]:
+    """Serve a result from the cache, or run it once across identical in-flight requests and cache it
+
+    When semantic_text is given and the semantic tier is enabled for the
+    service, an exact-match miss is followed by a similarity lookup on it;
+    matches are only made within the same semantic_namespace. Likewise,
+    image enables the perceptual-hash tier for near-duplicate uploads.
+
+    A call that may outlive the request, shared with other requests or run
+    as a background refresh, holds its own reference to image.
+    """
+    use_semantic = semantic_text is not None and semantic_cache.supports(service_type)
+    use_perceptual = image is not None and perceptual_cache.supports(service_type)
+    fingerprint = None
+    perceptual_namespace = json.dumps(parameters, sort_keys=True)
+    start_time = time.time()
+    ttl_config = CACHE_TTL_CONFIG[service_type]
+    coalescing_key = request_coalescer.make_key(service_type, input_hash, parameters)
+
+    async def call_and_cache():
+        result = await call()
+        if result["success"]:
+            await cache_service.aset(
+                service_type, input_hash, result, parameters,
+                ttl_hours=ttl_config["ttl_hours"],
+                stale_hours=ttl_config["stale_hours"]
+            )
+            if fingerprint is not None:
+                perceptual_cache.add(
+                    service_type, fingerprint, result,
+                    ttl_hours=ttl_config["ttl_hours"],
+                    namespace=perceptual_namespace
+                )
+            if use_semantic:
+                await semantic_cache.add(
+                    service_type, semantic_text, result,
+                    ttl_hours=ttl_config["ttl_hours"],
+                    namespace=semantic_namespace
+                )
+        elif result.get("error_code"):
+            # Only failures the provider would repeat for this input are cached, briefly
+            await cache_service.aset_negative(service_type, input_hash, result, parameters)
+        return result
+
+    def holding_image(call):
+        # The reference is taken as the call starts, while the request still holds the upload
+        if image is None:
+            return call
+        return lambda: release_after(image.retain(), call())
+
+    shared_call = holding_image(call_and_cache)
+    cached = await cache_service.aget(
+        service_type, input_hash, parameters,
+        refresh=holding_image(lambda: request_coalescer.run(coalescing_key, shared_call))
+    )
+    if cached:
+        if cached["result"].get("success") is False:
+            response.headers["X-Cache"] = "NEGATIVE"
+        else:
+            response.headers["X-Cache"] = "STALE" if cached.get("stale") else "HIT"
+        return {**cached["result"], "processing_time": (time.time() - start_time) * 1000}
+
+    if use_semantic:
+        similar = await semantic_cache.get(service_type, semantic_text, semantic_namespace)
+        if similar:
+            response.headers["X-Cache"] = "SEMANTIC"
+            response.headers["X-Cache-Similarity"] = f"{similar['similarity']:.4f}"
+            return {**similar["result"], "processing_time": (time.time() - start_time) * 1000}
+
+    if use_perceptual:
+        fingerprint = await perceptual_cache.fingerprint(image.open())
+        similar = perceptual_cache.get(service_type, fingerprint, perceptual_namespace)
+        if similar:
+            response.headers["X-Cache"] = "PERCEPTUAL"
+            response.headers["X-Cache-Distance"] = str(similar["distance"])
+            return {**similar["result"], "processing_time": (time.time() - start_time) * 1000}
+
+    response.headers["X-Cache"] = "MISS"
+    result, _ = await request_coalescer.run(coalescing_key, shared_call)
+    return result
+
+async def complete_ai_job(job_id: int, run) -> None:
+    """Worker side of an async-mode request: run it and record the outcome on its job"""
+    await storage.update_ai_job(job_id, {"status": "processing"})
+    try:
+        result = await run()
+    except Exception as e:
+        result = {"success": False, "error": str(e)}
+    await storage.update_ai_job(job_id, {
+        "status": "completed" if result["success"] else "failed",
+        "result": result["data"] if result["success"] else {"error": result["error"]}
+    })
+
+async def enqueue_ai_job(job_id: int, run, upload: Optional[IngestedUpload] = None) -> JSONResponse:
+    """Hand a request to the job workers and answer 202 Accepted with where to poll for it
+
+    An upload the job reads is held until the job finishes.
+    """
+    held = upload.retain() if upload is not None else None
+    try:
+        job_queue.submit(lambda: release_after(held, complete_ai_job(job_id, run)))
+    except JobQueueFull as e:
+        if held is not None:
+            held.close()
+        await storage.update_ai_job(job_id, {"status": "failed", "result": {"error": str(e)}})
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+    status_url = f"/api/v1/jobs/{job_id}"
+    return JSONResponse(
+        status_code=202,
+        content=JobAcceptedResponse(job_id=job_id, status="pending", status_url=status_url).model_dump(),
+        headers={"Location": status_url}
+    )
 
 @app.get("/")
 async def root():
@@ -108,36 +273,51 @@ async def health_check():
     }
 
 # Image Generation Endpoints
-@app.post("/api/v1/generate", response_model=ImageGenerationResponse)
-async def generate_image(request: ImageGenerationRequest):
+@app.post("/api/v1/generate", response_model=ImageGenerationResponse, responses={202: {"model": JobAcceptedResponse}})
+async def generate_image(
+    request: ImageGenerationRequest,
+    response: Response,
+    async_mode: bool = Query(False, alias="async")
+):
     """Generate images from text prompts using AI models"""
     try:
+        # Defaults are filled in so an omitted and an explicit default share a cache key
+        parameters = (request.parameters or GenerationParameters()).dict()
+
         # Create job record
         job = await storage.create_ai_job({
             "user_id": 1,  # Demo user
             "service_type": "generate",
             "prompt": request.prompt,
-            "parameters": request.parameters.dict() if request.parameters else {},
-            "status": "processing"
+            "parameters": parameters,
+            "status": "pending" if async_mode else "processing"
         })
         print("request", request.prompt)
         print("request1", request.parameters)
         # Process the request
-        result = await ai_service.generate_image(
-            request.prompt, 
-            request.parameters.dict() if request.parameters else {}
+        run = lambda: run_ai_service(
+            "generate",
+            content_hash(request.prompt.strip().encode()),
+            parameters,
+            lambda: ai_service.generate_image(request.prompt, parameters),
+            response,
+            semantic_text=request.prompt,
+            semantic_namespace=json.dumps(parameters, sort_keys=True)
         )
+        if async_mode:
+            return await enqueue_ai_job(job.id, run)
+        result = await run()
         print("resultzz", result)
         
         # Update job with result
-        await storage.update_ai_job(job["id"], {
+        await storage.update_ai_job(job.id, {
             "status": "completed" if result["success"] else "failed",
             "result": result["data"] if result["success"] else {"error": result["error"]}
         })
 
         if result["success"]:
             return ImageGenerationResponse(
-                job_id=job["id"],
+                job_id=job.id,
                 url=result["data"]["url"],
                 prompt=result["data"]["prompt"],
                 processing_time=result["processing_time"]
@@ -145,38 +325,52 @@ async def generate_image(request: ImageGenerationRequest):
         else:
             raise HTTPException(status_code=500, detail=result["error"])
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Image Classification Endpoints
-@app.post("/api/v1/classify", response_model=ClassificationResponse)
+@app.post("/api/v1/classify", response_model=ClassificationResponse, responses={202: {"model": JobAcceptedResponse}})
 async def classify_image(
+    response: Response,
     image: UploadFile = File(...),
-    use_hugging_face: bool = Form(False, alias="useHuggingFace")
+    use_hugging_face: bool = Form(False, alias="useHuggingFace"),
+    async_mode: bool = Query(False, alias="async")
 ):
     """Classify images and identify objects with confidence scores"""
+    upload = None
     try:
         # Validate file type
         if not image.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
 
-        # Read and encode image
-        image_data = await image.read()
-        base64_image = base64.b64encode(image_data).decode('utf-8')
+        # Stream the upload within the size limit; it is only shrunk and base64-encoded if the request goes upstream
+        upload = await ingest_upload(image)
 
         # Create job record
         job = await storage.create_ai_job({
             "user_id": 1,
             "service_type": "classify",
             "parameters": {"use_hugging_face": use_hugging_face},
-            "status": "processing"
+            "status": "pending" if async_mode else "processing"
         })
 
-        # Process the request
-        result = await ai_service.classify_image(base64_image, use_hugging_face)
+        # Process the request, sharing the upstream call with identical in-flight requests
+        run = lambda: run_ai_service(
+            "classify",
+            upload.digest,
+            {"use_hugging_face": use_hugging_face},
+            lambda: image_preprocessor.run("classify", upload, lambda image_url: ai_service.classify_image(image_url, use_hugging_face)),
+            response,
+            image=upload
+        )
+        if async_mode:
+            return await enqueue_ai_job(job.id, run, upload)
+        result = await run()
         print("result_classify", result)
         # Update job with result
-        await storage.update_ai_job(job["id"], {
+        await storage.update_ai_job(job.id, {
             "status": "completed" if result["success"] else "failed",
             "result": result["data"] if result["success"] else {"error": result["error"]}
         })
@@ -185,7 +379,7 @@ async def classify_image(
             print("yesss")
             data = result["data"]
             return ClassificationResponse.model_validate({
-                "job_id":job["id"],
+                "job_id":job.id,
                 "class":data["class"],
                 "confidence":data["confidence"],
                 "description":data["description"],
@@ -195,105 +389,195 @@ async def classify_image(
         else:
             raise HTTPException(status_code=500, detail=result["error"])
             
+    except HTTPException:
+        # Validation and upload-size errors keep their status code
+        raise
     except Exception as e:
         print("Exception occurred:", e)
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if upload is not None:
+            upload.close()
 
 # Object Detection Endpoints
-@app.post("/api/v1/detect", response_model=DetectionResponse)
+@app.post("/api/v1/detect", response_model=DetectionResponse, responses={202: {"model": JobAcceptedResponse}})
 async def detect_objects(
+    response: Response,
     image: UploadFile = File(...),
-    use_hugging_face: bool = Form(False)
+    use_hugging_face: bool = Form(False),
+    tiled: bool = Form(False),
+    tile_size: int = Form(DEFAULT_TILE_SIZE, ge=256, le=4096),
+    tile_overlap: float = Form(DEFAULT_TILE_OVERLAP, ge=0, le=0.5),
+    async_mode: bool = Query(False, alias="async")
 ):
-    """Detect and locate objects in images with bounding boxes"""
+    """Detect and locate objects in images with bounding boxes
+
+    With tiled set, large images are split into overlapping tile_size tiles
+    that are detected separately and merged, which finds small objects a
+    single downscaled call misses.
+    """
+    upload = None
     try:
         # Validate file type
         if not image.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
 
-        # Read and encode image
-        image_data = await image.read()
-        base64_image = base64.b64encode(image_data).decode('utf-8')
+        # Stream the upload within the size limit; it is only shrunk and base64-encoded if the request goes upstream
+        upload = await ingest_upload(image)
+
+        parameters = {"use_hugging_face": use_hugging_face}
+        detect = lambda image_url: ai_service.detect_objects(image_url, use_hugging_face)
+        call = lambda: image_preprocessor.run("detect", upload, detect)
+        if tiled:
+            # The image is only opened to plan tiles on a cache miss; refusals come back as results
+            parameters["tiling"] = {"tile_size": tile_size, "overlap": tile_overlap}
+            call = lambda: detect_tiled(upload, detect, tile_size, tile_overlap)
 
         # Create job record
         job = await storage.create_ai_job({
             "user_id": 1,
             "service_type": "detect",
-            "parameters": {"use_hugging_face": use_hugging_face},
-            "status": "processing"
+            "parameters": parameters,
+            "status": "pending" if async_mode else "processing"
         })
 
-        # Process the request
-        result = await ai_service.detect_objects(base64_image, use_hugging_face)
+        # Process the request, sharing the upstream call with identical in-flight requests
+        run = lambda: run_ai_service(
+            "detect",
+            upload.digest,
+            parameters,
+            call,
+            response,
+            image=upload
+        )
+        if async_mode:
+            return await enqueue_ai_job(job.id, run, upload)
+        result = await run()
         
         # Update job with result
-        await storage.update_ai_job(job["id"], {
+        await storage.update_ai_job(job.id, {
             "status": "completed" if result["success"] else "failed",
             "result": result["data"] if result["success"] else {"error": result["error"]}
         })
 
         if result["success"]:
             return DetectionResponse(
-                job_id=job["id"],
+                job_id=job.id,
                 objects=result["data"]["objects"],
                 processing_time=result["processing_time"]
             )
+        elif result.get("error_code") in TILING_ERROR_CODES:
+            raise HTTPException(status_code=400, detail=result["error"])
         else:
             raise HTTPException(status_code=500, detail=result["error"])
             
+    except HTTPException:
+        # Validation and upload-size errors keep their status code
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if upload is not None:
+            upload.close()
 
 # Image Segmentation Endpoints
-@app.post("/api/v1/segment", response_model=SegmentationResponse)
+@app.post("/api/v1/segment", response_model=SegmentationResponse, responses={202: {"model": JobAcceptedResponse}})
 async def segment_image(
+    response: Response,
     image: UploadFile = File(...),
-    use_hugging_face: bool = Form(False)
+    use_hugging_face: bool = Form(False),
+    mask_format: str = Form("polygon", pattern="^(polygon|rle|binary)$"),
+    async_mode: bool = Query(False, alias="async")
 ):
-    """Perform pixel-level image segmentation and masking"""
+    """Perform pixel-level image segmentation and masking
+
+    By default ("polygon") each segment's mask is returned as the provider
+    gave it. mask_format "rle" returns masks run-length encoded inline; "binary"
+    returns an application/octet-stream payload of a JSON header followed
+    by the raw run lengths (see services.mask_codec.pack_binary).
+    """
+    upload = None
     try:
         # Validate file type
         if not image.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
 
-        # Read and encode image
-        image_data = await image.read()
-        base64_image = base64.b64encode(image_data).decode('utf-8')
+        # Stream the upload within the size limit; it is only shrunk and base64-encoded if the request goes upstream
+        upload = await ingest_upload(image)
 
         # Create job record
         job = await storage.create_ai_job({
             "user_id": 1,
             "service_type": "segment",
             "parameters": {"use_hugging_face": use_hugging_face},
-            "status": "processing"
+            "status": "pending" if async_mode else "processing"
         })
 
-        # Process the request
-        result = await ai_service.segment_image(base64_image, use_hugging_face)
+        # Process the request, sharing the upstream call with identical in-flight requests
+        run = lambda: run_ai_service(
+            "segment",
+            upload.digest,
+            {"use_hugging_face": use_hugging_face},
+            lambda: image_preprocessor.run("segment", upload, lambda image_url: ai_service.segment_image(image_url, use_hugging_face)),
+            response,
+            image=upload
+        )
+        if async_mode:
+            return await enqueue_ai_job(job.id, run, upload)
+        result = await run()
         
         # Update job with result
-        await storage.update_ai_job(job["id"], {
+        await storage.update_ai_job(job.id, {
             "status": "completed" if result["success"] else "failed",
             "result": result["data"] if result["success"] else {"error": result["error"]}
         })
 
         if result["success"]:
+            grid = None
+            if mask_format != "polygon":
+                try:
+                    grid = mask_grid(*await image_preprocessor.execute(upright_size, upload.open()))
+                except Exception:
+                    pass  # polygons are then returned as they are
+            segments = render_segments(result["data"]["segments"], mask_format, grid)
+            if mask_format == "binary":
+                payload = pack_binary(
+                    {"job_id": job.id, "processing_time": result["processing_time"]},
+                    segments
+                )
+                # X-Cache and related headers set on the injected response are carried over
+                headers = {k: v for k, v in response.headers.items() if k.startswith("x-")}
+                return Response(content=payload, media_type=BINARY_MASK_MEDIA_TYPE, headers=headers)
             return SegmentationResponse(
-                job_id=job["id"],
-                segments=result["data"]["segments"],
+                job_id=job.id,
+                segments=segments,
                 processing_time=result["processing_time"]
             )
         else:
             raise HTTPException(status_code=500, detail=result["error"])
             
+    except HTTPException:
+        # Validation and upload-size errors keep their status code
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if upload is not None:
+            upload.close()
 
 # Chat Endpoints
-@app.post("/api/v1/chat", response_model=ChatResponse)
-async def chat_completion(request: ChatRequest):
-    """AI chatbot with context-aware responses"""
+@app.post("/api/v1/chat", response_model=ChatResponse, responses={202: {"model": JobAcceptedResponse}})
+async def chat_completion(
+    request: ChatRequest,
+    response: Response,
+    async_mode: bool = Query(False, alias="async")
+):
+    """AI chatbot with context-aware responses
+
+    In async mode the reply is recorded on a "chat" job as well as in the
+    chat history.
+    """
     try:
         # Save user message
         await storage.create_chat_message({
@@ -304,19 +588,41 @@ async def chat_completion(request: ChatRequest):
 
         # Get chat history
         history = await storage.get_chat_history(1, 10)
-        messages = [{"role": msg["role"], "content": msg["content"]} for msg in history]
-
-        # Process chat completion
-        result = await ai_service.chat_completion(messages)
-        # print("result", result)
-        if result["success"]:
-            # Save assistant response
-            await storage.create_chat_message({
+        messages = [{"role": msg.role, "content": msg.content} for msg in history]
+
+        async def run():
+            # Process chat completion, keyed on the whole conversation context
+            result = await run_ai_service(
+                "chat",
+                content_hash(json.dumps(messages).encode()),
+                {},
+                lambda: ai_service.chat_completion(messages),
+                response,
+                semantic_text=request.message,
+                # Similar questions only share an answer when the earlier conversation matches
+                semantic_namespace=content_hash(json.dumps(messages[:-1]).encode())
+            )
+            if result["success"]:
+                # Save assistant response
+                await storage.create_chat_message({
+                    "user_id": 1,
+                    "role": "assistant",
+                    "content": result["data"]["response"]
+                })
+            return result
+
+        if async_mode:
+            job = await storage.create_ai_job({
                 "user_id": 1,
-                "role": "assistant",
-                "content": result["data"]["response"]
+                "service_type": "chat",
+                "prompt": request.message,
+                "status": "pending"
             })
+            return await enqueue_ai_job(job.id, run)
 
+        result = await run()
+        # print("result", result)
+        if result["success"]:
             return ChatResponse(
                 response=result["data"]["response"],
                 processing_time=result["processing_time"]
@@ -324,15 +630,73 @@ async def chat_completion(request: ChatRequest):
         # else:
         #     raise HTTPException(status_code=500, detail=result["error"])
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/v1/chat/stream")
+async def chat_completion_stream(request: ChatRequest):
+    """AI chatbot that relays tokens as server-sent events while they are generated"""
+    start_time = datetime.utcnow()
+
+    # Save user message
+    await storage.create_chat_message({
+        "user_id": 1,
+        "role": "user",
+        "content": request.message
+    })
+
+    # Get chat history
+    history = await storage.get_chat_history(1, 10)
+    messages = [{"role": msg.role, "content": msg.content} for msg in history]
+
+    # Open the upstream stream before responding so setup errors surface as HTTP errors
+    result = await ai_service.chat_completion(messages, stream=True)
+    if not result["success"]:
+        raise HTTPException(status_code=500, detail=result["error"])
+
+    async def event_stream():
+        tokens = result["data"]["stream"]
+        content = []
+        try:
+            async for token in tokens:
+                content.append(token)
+                yield format_sse({"token": token})
+        except Exception as e:
+            yield format_sse({"error": f"Chat completion failed: {str(e)}"}, event="error")
+            return
+        finally:
+            # Closes the upstream request if the client disconnected mid-stream
+            await tokens.aclose()
+
+        # Save the full assistant response once the stream has finished
+        message = await storage.create_chat_message({
+            "user_id": 1,
+            "role": "assistant",
+            "content": "".join(content)
+        })
+        processing_time = (datetime.utcnow() - start_time).total_seconds() * 1000
+        yield format_sse({
+            "message_id": message.id,
+            "processing_time": processing_time
+        }, event="done")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Runs even when the client disconnects before event_stream starts,
+        # which would otherwise leave the provider slot and upstream stream open
+        background=BackgroundTask(result["data"]["stream"].aclose)
+    )
+
 @app.get("/api/v1/chat/history", response_model=ChatHistoryResponse)
 async def get_chat_history():
     """Get chat conversation history"""
     try:
         history = await storage.get_chat_history(1, 50)
-        return ChatHistoryResponse(messages=history)
+        return ChatHistoryResponse(messages=[message.to_dict() for message in history])
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -342,18 +706,54 @@ async def get_recent_jobs():
     """Get recent AI processing jobs"""
     try:
         jobs = await storage.get_recent_ai_jobs(20)
-        return {"jobs": jobs}
+        return {"jobs": [job.to_dict() for job in jobs]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/v1/storage/stats")
+async def get_storage_stats():
+    """Record counts, estimated memory and retention/eviction counters of the job store"""
+    try:
+        return await storage.get_storage_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/v1/jobs/events")
+async def stream_job_events(
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Push created, progress, completed and failed events for the current user's jobs as server-sent events
+
+    Each event's data is a summary of the job (id, user_id, service_type,
+    status); clients fetch the job, or their job list, when one arrives.
+    """
+    user_id = current_user.id
+    # The stream stays open indefinitely, so the session is not held for it
+    db.close()
+    return StreamingResponse(
+        job_events.stream(
+            lambda event: event["type"].startswith("job.") and event["data"].get("user_id") == user_id
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/api/v1/jobs/{job_id}", response_model=AIJobResponse)
-async def get_job(job_id: int):
-    """Get specific AI job details"""
+async def get_job(job_id: int, wait: float = Query(0, ge=0)):
+    """Get specific AI job details
+
+    With wait, a pending or processing job is held for up to that many
+    seconds and returned as soon as it completes or fails (long polling).
+    Longer waits are cut to JOB_LONG_POLL_MAX_SECONDS rather than refused.
+    """
     try:
-        job = await storage.get_ai_job(job_id)
+        job = await storage.wait_for_ai_job(job_id, min(wait, JOB_LONG_POLL_MAX_SECONDS))
         if not job:
             raise HTTPException(status_code=404, detail="Job not found")
-        return AIJobResponse(**job)
+        return AIJobResponse.model_validate(job)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
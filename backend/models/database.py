@@ -20,6 +20,12 @@ class ServiceType(str, enum.Enum):
     SEGMENT = "segment"
     CHAT = "chat"
 
+class JobStatus(str, enum.Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
 class User(Base):
     __tablename__ = "users"
     
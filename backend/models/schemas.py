@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
@@ -41,9 +41,14 @@ class DetectionResponse(BaseModel):
     objects: List[DetectionObject]
     processing_time: float
 
+class RLEMask(BaseModel):
+    size: List[int]  # [height, width]
+    counts: str      # base64 LEB128 run lengths, row-major, background first
+
 class SegmentationSegment(BaseModel):
     name: str
-    mask: str
+    mask: Optional[str] = None
+    rle: Optional[RLEMask] = None
     confidence: float
 
 class SegmentationResponse(BaseModel):
@@ -65,6 +70,9 @@ class ChatHistoryResponse(BaseModel):
     messages: List[ChatMessage]
 
 class AIJobResponse(BaseModel):
+    # Built straight from storage.JobRecord
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     user_id: Optional[int]
     service_type: str
@@ -76,6 +84,11 @@ class AIJobResponse(BaseModel):
     created_at: datetime
     completed_at: Optional[datetime]
 
+class JobAcceptedResponse(BaseModel):
+    job_id: int
+    status: str
+    status_url: str
+
 # Error Response Models
 class ErrorResponse(BaseModel):
     error: str
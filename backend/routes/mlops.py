@@ -1,14 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Literal, Optional
 
 from database import get_db
 from models.database import User
-from auth.security import get_current_active_user
+from auth.security import get_current_active_user, require_admin
 from services.mlflow_service import mlflow_service
 from services.cache_service import cache_service
 from services.monitoring import performance_monitor
+from services.http_transport import http_transport
+from services.ai_services import ai_service_manager
+from services.request_coalescer import request_coalescer
+from services.semantic_cache import semantic_cache
+from services.perceptual_cache import perceptual_cache
+from services.image_preprocessing import image_preprocessor
+from services.job_queue import job_queue
+from services.job_events import job_events
+from services.cache_warmer import cache_warmer, CACHE_WARM_TOP_N, CACHE_WARM_MAX_CALLS, CACHE_WARM_RATE_PER_MINUTE
 
 router = APIRouter()
 
@@ -55,6 +65,7 @@ class PerformanceStatsResponse(BaseModel):
     memory: Dict[str, Any]
     disk: Dict[str, Any]
     requests: Dict[str, Any]
+    transport: Optional[Dict[str, Any]] = None
 
 class CacheStatsResponse(BaseModel):
     status: str
@@ -62,8 +73,25 @@ class CacheStatsResponse(BaseModel):
     misses: int
     sets: int
     hit_rate: float
-    memory_used: str
-    total_requests: int
+    memory_used: str = "N/A"
+    total_requests: int = 0
+    saved_ms: float = 0
+    negative_hits: int = 0
+    backend: Optional[str] = None
+    backend_events: Optional[Dict[str, int]] = None
+    services: Optional[Dict[str, Any]] = None
+    encoding: Optional[Dict[str, Any]] = None
+    revalidation: Optional[Dict[str, int]] = None
+    tiers: Optional[Dict[str, Any]] = None
+    coalescing: Optional[Dict[str, Any]] = None
+    semantic: Optional[Dict[str, Any]] = None
+    perceptual: Optional[Dict[str, Any]] = None
+
+class CacheWarmRequest(BaseModel):
+    source: Literal["auto", "memory", "database"] = "auto"
+    top_n: int = Field(CACHE_WARM_TOP_N, ge=1, le=1000)
+    max_calls: int = Field(CACHE_WARM_MAX_CALLS, ge=0, le=1000)
+    rate_per_minute: float = Field(CACHE_WARM_RATE_PER_MINUTE, gt=0, le=600)
 
 @router.get("/experiments", response_model=List[ExperimentResponse])
 async def get_user_experiments(
@@ -173,13 +201,79 @@ async def get_health_status(
             detail=f"Failed to fetch health status: {str(e)}"
         )
 
+@router.get("/performance/transport")
+async def get_transport_stats(
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get provider connection pool and concurrency utilisation"""
+    try:
+        stats = http_transport.get_transport_stats()
+        stats["providers"] = ai_service_manager.get_provider_stats()
+        return stats
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch transport stats: {str(e)}"
+        )
+
+@router.get("/performance/preprocessing")
+async def get_preprocessing_stats(
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get vision upload preprocessing savings: bytes saved and upstream latency change per service"""
+    try:
+        return image_preprocessor.get_stats()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch preprocessing stats: {str(e)}"
+        )
+
+@router.get("/performance/jobs")
+async def get_job_queue_stats(
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get async-mode job worker utilisation and queue depth"""
+    try:
+        return job_queue.get_stats()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch job queue stats: {str(e)}"
+        )
+
+@router.get("/batch/events")
+async def stream_batch_events(
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Push progress of the current user's batch jobs as server-sent events"""
+    user_id = current_user.id
+    # The stream outlives the request's session; hand its connection back to the pool now
+    db.close()
+    return StreamingResponse(
+        job_events.stream(lambda event: event["type"].startswith("batch.") and event["data"].get("user_id") == user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/performance/events")
+async def get_job_event_stats(
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get job event fan-out statistics: subscribers, deliveries and Redis relay"""
+    return job_events.get_stats()
+
 @router.get("/cache/stats", response_model=CacheStatsResponse)
 async def get_cache_stats(
     current_user: User = Depends(get_current_active_user)
 ):
     """Get cache statistics"""
     try:
-        stats = cache_service.get_cache_stats()
+        stats = await cache_service.aget_cache_stats()
+        stats["coalescing"] = request_coalescer.get_stats()
+        stats["semantic"] = semantic_cache.get_stats()
+        stats["perceptual"] = perceptual_cache.get_stats()
         return CacheStatsResponse(**stats)
     except Exception as e:
         raise HTTPException(
@@ -187,19 +281,45 @@ async def get_cache_stats(
             detail=f"Failed to fetch cache stats: {str(e)}"
         )
 
-@router.post("/cache/clear")
-async def clear_user_cache(
-    current_user: User = Depends(get_current_active_user)
+@router.post("/cache/clear/{service_type}")
+async def clear_service_cache(
+    service_type: str,
+    current_user: User = Depends(require_admin)
 ):
-    """Clear user's cache entries"""
+    """Clear every cache entry for one AI service (admin only)"""
     try:
-        cleared_count = cache_service.clear_user_cache(current_user.id)
+        cleared_count = await cache_service.aclear_service_cache(service_type)
         return {
-            "message": "Cache cleared successfully",
+            "message": f"{service_type} cache cleared successfully",
             "cleared_entries": cleared_count
         }
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to clear cache: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.post("/cache/warm", status_code=status.HTTP_202_ACCEPTED)
+async def start_cache_warming(
+    request: CacheWarmRequest,
+    current_user: User = Depends(require_admin)
+):
+    """Warm the cache with the most frequent recent inputs, within an upstream budget (admin only)"""
+    already_running = cache_warmer.is_running()
+    progress = cache_warmer.start(
+        source=request.source,
+        top_n=request.top_n,
+        max_calls=request.max_calls,
+        rate_per_minute=request.rate_per_minute
+    )
+    return {
+        "message": "Cache warming already in progress" if already_running else "Cache warming started",
+        "progress": progress
+    }
+
+@router.get("/cache/warm")
+async def get_cache_warming_progress(
+    current_user: User = Depends(require_admin)
+):
+    """Get progress of the current or last cache warming run (admin only)"""
+    return cache_warmer.get_progress()
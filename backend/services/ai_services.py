@@ -4,21 +4,144 @@ from typing import Dict, List, Any, Optional
 import openai
 import os
 from openai import AsyncOpenAI
-from together import Together
+from together import AsyncTogether
 from dotenv import load_dotenv
 import traceback
 load_dotenv()
 
+from services.http_transport import http_transport
+from services.mask_codec import compact_segments
+
+# Maximum number of in-flight upstream calls per provider. Requests beyond the
+# limit wait on the event loop instead of piling onto the provider. Every
+# upstream call currently goes through Together.
+PROVIDER_CONCURRENCY_LIMITS = {
+    "together": int(os.getenv("TOGETHER_MAX_CONCURRENCY", "8"))
+}
+
+
+class ProviderLimit:
+    """Semaphore capping in-flight calls to one provider, counting holders and waiters"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.waiting = 0
+
+    async def acquire(self):
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+
+class ChatTokenStream:
+    """Content deltas of a streaming chat completion, holding a provider slot until closed
+
+    aclose() is idempotent and works whether or not iteration ever started, so
+    a stream abandoned before its first token still releases the slot and the
+    upstream response.
+    """
+
+    def __init__(self, response, limit: ProviderLimit):
+        self._response = response
+        self._limit = limit
+        self._chunks = None
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        if self.closed:
+            raise StopAsyncIteration
+        if self._chunks is None:
+            self._chunks = self._response.__aiter__()
+        try:
+            while True:
+                chunk = await self._chunks.__anext__()
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content:
+                    return content
+        except BaseException:
+            # End of stream, upstream errors and cancellation all release the slot
+            await self.aclose()
+            raise
+
+    async def aclose(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await self._response.close()
+        finally:
+            self._limit.release()
+
+
+# Shared across every AIServiceManager instance so the limits are process-wide
+_provider_semaphores = {
+    provider: ProviderLimit(limit)
+    for provider, limit in PROVIDER_CONCURRENCY_LIMITS.items()
+}
+
+# Lower-cased fragments of provider error messages that mean the same input
+# will be rejected again, so the failure is safe to cache briefly
+POLICY_REJECTION_MARKERS = ("content policy", "content_policy", "safety system", "moderation", "nsfw", "flagged")
+UNSUPPORTED_INPUT_MARKERS = (
+    "unsupported image", "invalid image", "image format", "unsupported file",
+    "unsupported mime", "could not process image", "failed to decode"
+)
+
+def deterministic_error_code(error: Exception) -> Optional[str]:
+    """Classify a provider error the same input would always reproduce; None for transient errors
+
+    Only client errors (400, 415, 422) whose message names a policy
+    rejection or an unusable input qualify. Rate limits, timeouts,
+    connection and server errors are never classified.
+    """
+    if isinstance(error, openai.ContentFilterFinishReasonError):
+        return "policy_rejection"
+    status_code = getattr(error, "status_code", None)
+    if status_code not in (400, 415, 422):
+        return None
+    message = str(error).lower()
+    if any(marker in message for marker in POLICY_REJECTION_MARKERS):
+        return "policy_rejection"
+    if status_code == 415 or any(marker in message for marker in UNSUPPORTED_INPUT_MARKERS):
+        return "unsupported_format"
+    return None
+
 class AIServiceManager:
     """Manages all AI services including OpenAI and Hugging Face integrations"""
     
     def __init__(self):
+        # Both SDK clients ride on the shared keep-alive pools, so extra
+        # instances do not open their own connections
         self.openai_client = AsyncOpenAI(
-            api_key=os.getenv("OPENAI_API_KEY", "your-openai-api-key")
+            api_key=os.getenv("OPENAI_API_KEY", "your-openai-api-key"),
+            http_client=http_transport.get_client("openai")
         )
-        self.together_client = Together(
-            api_key=os.getenv("TOGETHER_API_KEY")
+        self.together_client = AsyncTogether(
+            api_key=os.getenv("TOGETHER_API_KEY"),
+            http_client=http_transport.get_client("together")
         )
+        self.provider_limits = _provider_semaphores
     
     def check_openai_connection(self) -> bool:
         """Check if OpenAI API is accessible"""
@@ -28,26 +151,38 @@ class AIServiceManager:
         except Exception:
             return False
 
+    def get_provider_stats(self) -> Dict[str, Any]:
+        """Get concurrency usage for each upstream provider"""
+        stats = {}
+        for provider, limit in self.provider_limits.items():
+            stats[provider] = {
+                "limit": limit.limit,
+                "in_flight": limit.in_flight,
+                "waiting": limit.waiting
+            }
+        return stats
+
     async def generate_image(self, prompt: str, parameters: Dict[str, Any] = {}) -> Dict[str, Any]:
         """Generate images using OpenAI DALL-E"""
         start_time = time.time()
         print("parameters", parameters)
         try:
-            response = self.together_client.images.generate(
-                model="black-forest-labs/FLUX.1-schnell-Free",
-                prompt=prompt,
-                n=1,
-                steps=parameters.get("steps", 4),
-                size=parameters.get("resolution", "1024x1024"),
-                quality=parameters.get("quality", "standard")
-            )
+            async with self.provider_limits["together"]:
+                response = await self.together_client.images.generate(
+                    model="black-forest-labs/FLUX.1-schnell-Free",
+                    prompt=prompt,
+                    n=1,
+                    steps=parameters.get("steps", 4),
+                    size=parameters.get("resolution", "1024x1024"),
+                    quality=parameters.get("quality", "standard")
+                )
             print("response", response)
             processing_time = (time.time() - start_time) * 1000
             
             return {
                 "success": True,
                 "data": {
-                    "url": response.data,
+                    "url": response.data[0].url,
                     "prompt": prompt
                 },
                 "processing_time": processing_time
@@ -60,10 +195,11 @@ class AIServiceManager:
             return {
                 "success": False,
                 "error": f"Image generation failed: {str(e)}",
+                "error_code": deterministic_error_code(e),
                 "processing_time": processing_time
             }
 
-    async def classify_image(self, base64_image: str, use_hugging_face: bool = False) -> Dict[str, Any]:
+    async def classify_image(self, image_url: str, use_hugging_face: bool = False) -> Dict[str, Any]:
         """Classify images using OpenAI Vision or Hugging Face models"""
         start_time = time.time()
         
@@ -83,31 +219,32 @@ class AIServiceManager:
                 }
             else:
                 # OpenAI Vision classification
-                response = await self.together_client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are an expert image classifier. Analyze the image and classify it into a specific category. Provide a confidence score between 0 and 1, and a brief description. Respond with JSON in this format: { 'class': string, 'confidence': number, 'description': string }"
-                        },
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": "Classify this image and provide confidence score and description."
-                                },
-                                {
-                                    "type": "image_url",
-                                    "image_url": {
-                                        "url": f"data:image/jpeg;base64,{base64_image}"
+                async with self.provider_limits["together"]:
+                    response = await self.together_client.chat.completions.create(
+                        model="gpt-4o",
+                        messages=[
+                            {
+                                "role": "system",
+                                "content": "You are an expert image classifier. Analyze the image and classify it into a specific category. Provide a confidence score between 0 and 1, and a brief description. Respond with JSON in this format: { 'class': string, 'confidence': number, 'description': string }"
+                            },
+                            {
+                                "role": "user",
+                                "content": [
+                                    {
+                                        "type": "text",
+                                        "text": "Classify this image and provide confidence score and description."
+                                    },
+                                    {
+                                        "type": "image_url",
+                                        "image_url": {
+                                            "url": image_url
+                                        }
                                     }
-                                }
-                            ]
-                        }
-                    ],
-                    response_format={"type": "json_object"}
-                )
+                                ]
+                            }
+                        ],
+                        response_format={"type": "json_object"}
+                    )
                 
                 import json
                 result = json.loads(response.choices[0].message.content)
@@ -130,10 +267,11 @@ class AIServiceManager:
             return {
                 "success": False,
                 "error": f"Image classification failed: {str(e)}",
+                "error_code": deterministic_error_code(e),
                 "processing_time": processing_time
             }
 
-    async def detect_objects(self, base64_image: str, use_hugging_face: bool = False) -> Dict[str, Any]:
+    async def detect_objects(self, image_url: str, use_hugging_face: bool = False) -> Dict[str, Any]:
         """Detect objects in images using OpenAI Vision or YOLO models"""
         start_time = time.time()
         
@@ -150,31 +288,32 @@ class AIServiceManager:
                 }
             else:
                 # OpenAI Vision object detection
-                response = await self.together_client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are an expert object detection system. Analyze the image and detect all objects present. For each object, provide the name, confidence score (0-1), and approximate bounding box coordinates as [x, y, width, height] in percentage of image dimensions. Respond with JSON in this format: { 'objects': [{ 'name': string, 'confidence': number, 'bbox': [number, number, number, number] }] }"
-                        },
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": "Detect and locate all objects in this image with bounding boxes."
-                                },
-                                {
-                                    "type": "image_url",
-                                    "image_url": {
-                                        "url": f"data:image/jpeg;base64,{base64_image}"
+                async with self.provider_limits["together"]:
+                    response = await self.together_client.chat.completions.create(
+                        model="gpt-4o",
+                        messages=[
+                            {
+                                "role": "system",
+                                "content": "You are an expert object detection system. Analyze the image and detect all objects present. For each object, provide the name, confidence score (0-1), and approximate bounding box coordinates as [x, y, width, height] in percentage of image dimensions. Respond with JSON in this format: { 'objects': [{ 'name': string, 'confidence': number, 'bbox': [number, number, number, number] }] }"
+                            },
+                            {
+                                "role": "user",
+                                "content": [
+                                    {
+                                        "type": "text",
+                                        "text": "Detect and locate all objects in this image with bounding boxes."
+                                    },
+                                    {
+                                        "type": "image_url",
+                                        "image_url": {
+                                            "url": image_url
+                                        }
                                     }
-                                }
-                            ]
-                        }
-                    ],
-                    response_format={"type": "json_object"}
-                )
+                                ]
+                            }
+                        ],
+                        response_format={"type": "json_object"}
+                    )
                 
                 import json
                 result = json.loads(response.choices[0].message.content)
@@ -192,10 +331,11 @@ class AIServiceManager:
             return {
                 "success": False,
                 "error": f"Object detection failed: {str(e)}",
+                "error_code": deterministic_error_code(e),
                 "processing_time": processing_time
             }
 
-    async def segment_image(self, base64_image: str, use_hugging_face: bool = False) -> Dict[str, Any]:
+    async def segment_image(self, image_url: str, use_hugging_face: bool = False) -> Dict[str, Any]:
         """Perform image segmentation using OpenAI Vision or SAM models"""
         start_time = time.time()
         
@@ -212,35 +352,38 @@ class AIServiceManager:
                 }
             else:
                 # OpenAI Vision segmentation
-                response = await self.together_client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are an expert image segmentation system. Analyze the image and identify distinct segments/regions. For each segment, provide a name, confidence score (0-1), and a description of the mask area. Respond with JSON in this format: { 'segments': [{ 'name': string, 'mask': string, 'confidence': number }] }"
-                        },
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": "Segment this image into distinct regions and describe each segment."
-                                },
-                                {
-                                    "type": "image_url",
-                                    "image_url": {
-                                        "url": f"data:image/jpeg;base64,{base64_image}"
+                async with self.provider_limits["together"]:
+                    response = await self.together_client.chat.completions.create(
+                        model="gpt-4o",
+                        messages=[
+                            {
+                                "role": "system",
+                                "content": "You are an expert image segmentation system. Analyze the image and identify distinct segments/regions. For each segment, provide a name, confidence score (0-1), and a description of the mask area. Respond with JSON in this format: { 'segments': [{ 'name': string, 'mask': string, 'confidence': number }] }"
+                            },
+                            {
+                                "role": "user",
+                                "content": [
+                                    {
+                                        "type": "text",
+                                        "text": "Segment this image into distinct regions and describe each segment."
+                                    },
+                                    {
+                                        "type": "image_url",
+                                        "image_url": {
+                                            "url": image_url
+                                        }
                                     }
-                                }
-                            ]
-                        }
-                    ],
-                    response_format={"type": "json_object"}
-                )
+                                ]
+                            }
+                        ],
+                        response_format={"type": "json_object"}
+                    )
                 
                 import json
                 result = json.loads(response.choices[0].message.content)
-            
+
+            # Array masks are stored as run-length encoding; polygon strings are kept
+            result["segments"] = compact_segments(result.get("segments", []))
             processing_time = (time.time() - start_time) * 1000
             
             return {
@@ -254,33 +397,48 @@ class AIServiceManager:
             return {
                 "success": False,
                 "error": f"Image segmentation failed: {str(e)}",
+                "error_code": deterministic_error_code(e),
                 "processing_time": processing_time
             }
 
-    async def chat_completion(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
-        """Generate chat responses using OpenAI GPT models"""
+    def _format_chat_messages(self, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Prepend the assistant system prompt to the conversation"""
+        formatted_messages = [
+            {
+                "role": "system",
+                "content": "You are an AI assistant specialized in computer vision and AI services. You help users understand and use various AI tools including image generation, classification, object detection, and segmentation. Provide helpful, accurate, and friendly responses."
+            }
+        ]
+        
+        for msg in messages:
+            formatted_messages.append({
+                "role": msg["role"],
+                "content": msg["content"]
+            })
+        
+        return formatted_messages
+
+    async def chat_completion(self, messages: List[Dict[str, str]], stream: bool = False) -> Dict[str, Any]:
+        """Generate chat responses using OpenAI GPT models
+
+        With stream=True the upstream request is opened eagerly and
+        result["data"]["stream"] is an async iterator of content deltas.
+        """
         start_time = time.time()
         
         try:
             # Format messages for OpenAI API
-            formatted_messages = [
-                {
-                    "role": "system",
-                    "content": "You are an AI assistant specialized in computer vision and AI services. You help users understand and use various AI tools including image generation, classification, object detection, and segmentation. Provide helpful, accurate, and friendly responses."
-                }
-            ]
+            formatted_messages = self._format_chat_messages(messages)
             
-            for msg in messages:
-                formatted_messages.append({
-                    "role": msg["role"],
-                    "content": msg["content"]
-                })
+            if stream:
+                return await self._open_chat_stream(formatted_messages, start_time)
             
-            response = self.together_client.chat.completions.create(
-                model="meta-llama/Llama-3.3-70B-Instruct-Turbo-Free",
-                messages=formatted_messages,
-                max_tokens=1000
-            )
+            async with self.provider_limits["together"]:
+                response = await self.together_client.chat.completions.create(
+                    model="meta-llama/Llama-3.3-70B-Instruct-Turbo-Free",
+                    messages=formatted_messages,
+                    max_tokens=1000
+                )
             # print("responsezz", response)
             processing_time = (time.time() - start_time) * 1000
             
@@ -297,5 +455,32 @@ class AIServiceManager:
             return {
                 "success": False,
                 "error": f"Chat completion failed: {str(e)}",
+                "error_code": deterministic_error_code(e),
                 "processing_time": processing_time
-            }
\ No newline at end of file
+            }
+
+    async def _open_chat_stream(self, formatted_messages: List[Dict[str, str]], start_time: float) -> Dict[str, Any]:
+        """Open a streaming chat completion, holding a provider slot until the stream is closed"""
+        limit = self.provider_limits["together"]
+        await limit.acquire()
+        try:
+            response = await self.together_client.chat.completions.create(
+                model="meta-llama/Llama-3.3-70B-Instruct-Turbo-Free",
+                messages=formatted_messages,
+                max_tokens=1000,
+                stream=True
+            )
+        except BaseException:
+            limit.release()
+            raise
+
+        return {
+            "success": True,
+            "data": {
+                "stream": ChatTokenStream(response, limit)
+            },
+            "processing_time": (time.time() - start_time) * 1000
+        }
+
+# Global AI service manager instance
+ai_service_manager = AIServiceManager()
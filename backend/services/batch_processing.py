@@ -11,7 +11,10 @@ from sqlalchemy.orm import Session
 from models.custom_models import BatchJob
 from models.database import User
 from services.mlflow_service import mlflow_service
-from services.ai_services import AIServiceManager
+from services.ai_services import AIServiceManager, ai_service_manager
+from services.uploads import open_file_upload
+from services.image_preprocessing import image_preprocessor
+from services.job_events import job_events
 
 class BatchProcessingService:
     """Service for handling batch AI processing jobs"""
@@ -116,6 +119,7 @@ class BatchProcessingService:
             job.started_at = datetime.utcnow()
             job.progress_percentage = 0.0
             db.commit()
+            self._publish_progress("batch.progress", job)
             
             # Start MLflow tracking
             mlflow_run_id = mlflow_service.start_run(
@@ -136,7 +140,8 @@ class BatchProcessingService:
             parameters = json.loads(job.parameters) if job.parameters else {}
             results = []
             
-            ai_service = AIServiceManager()
+            # Shared manager, so batch runs reuse the warm provider connection pools
+            ai_service = ai_service_manager
             
             for i, file_path in enumerate(input_files):
                 try:
@@ -168,6 +173,7 @@ class BatchProcessingService:
                 # Update progress
                 job.progress_percentage = (i + 1) / len(input_files) * 100
                 db.commit()
+                self._publish_progress("batch.progress", job)
                 
                 # Small delay to prevent overwhelming the system
                 await asyncio.sleep(0.1)
@@ -201,6 +207,7 @@ class BatchProcessingService:
                 mlflow_service.end_run()
             
             db.commit()
+            self._publish_progress("batch.completed", job)
             
         except Exception as e:
             # Handle job failure
@@ -212,6 +219,7 @@ class BatchProcessingService:
                 mlflow_service.end_run(status="FAILED")
             
             db.commit()
+            self._publish_progress("batch.failed", job)
     
     async def _process_single_file(
         self, 
@@ -223,19 +231,13 @@ class BatchProcessingService:
         """Process a single file based on job type"""
         
         if job_type == "bulk_classify":
-            with open(file_path, 'rb') as f:
-                file_content = f.read()
-            return await ai_service.classify_image(file_content, parameters)
+            return await self._run_vision("classify", file_path, lambda image_url: ai_service.classify_image(image_url, parameters))
         
         elif job_type == "bulk_detect":
-            with open(file_path, 'rb') as f:
-                file_content = f.read()
-            return await ai_service.detect_objects(file_content, parameters)
+            return await self._run_vision("detect", file_path, lambda image_url: ai_service.detect_objects(image_url, parameters))
         
         elif job_type == "bulk_segment":
-            with open(file_path, 'rb') as f:
-                file_content = f.read()
-            return await ai_service.segment_image(file_content, parameters)
+            return await self._run_vision("segment", file_path, lambda image_url: ai_service.segment_image(image_url, parameters))
         
         elif job_type == "bulk_generate":
             # For text-based generation
@@ -253,6 +255,28 @@ class BatchProcessingService:
         else:
             raise ValueError(f"Unsupported job type: {job_type}")
     
+    def _publish_progress(self, event_type: str, job: BatchJob):
+        """Push batch progress to clients subscribed to the user's batch events"""
+        job_events.publish(event_type, {
+            "id": job.id,
+            "user_id": job.user_id,
+            "job_type": job.job_type,
+            "status": job.status,
+            "progress_percentage": job.progress_percentage,
+            "processed_items": job.processed_items,
+            "failed_items": job.failed_items,
+            "total_items": job.total_items,
+            "error_message": job.error_message
+        })
+
+    async def _run_vision(self, service_type: str, file_path: str, call) -> Dict[str, Any]:
+        """Send an image file upstream through the same preprocessing as live requests"""
+        upload = open_file_upload(file_path)
+        try:
+            return await image_preprocessor.run(service_type, upload, call)
+        finally:
+            upload.close()
+
     def get_job_status(self, db: Session, job_id: int, user: User) -> Optional[BatchJob]:
         """Get the status of a batch job"""
         return db.query(BatchJob).filter(
@@ -0,0 +1,348 @@
+import asyncio
+import os
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from fnmatch import fnmatchcase
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import redis
+import redis.asyncio as aioredis
+
+from services.local_cache import LocalLRUCache
+
+# Async Redis pool; an operation slower than the timeout is treated as a cache miss
+CACHE_REDIS_MAX_CONNECTIONS = int(os.getenv("CACHE_REDIS_MAX_CONNECTIONS", "50"))
+CACHE_REDIS_TIMEOUT_SECONDS = float(os.getenv("CACHE_REDIS_TIMEOUT", "0.25"))
+
+# Tag sets index cache keys by service so invalidation only touches the
+# affected entries. They live outside the ai_cache: namespace.
+# Sorted sets of key -> expiry time; a new prefix, since the earlier plain sets under
+# "ai_cache_tags:" cannot take ZADD (they expire on their own)
+CACHE_TAG_PREFIX = "ai_cache_tag_index:"
+# Keys are unlinked in batches of this size during bulk invalidation
+CACHE_INVALIDATION_BATCH_SIZE = int(os.getenv("CACHE_INVALIDATION_BATCH_SIZE", "500"))
+
+# Size bound of the in-process backend used without Redis
+CACHE_MEMORY_MAX_BYTES = int(os.getenv("CACHE_MEMORY_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Hash of cache counters shared by every worker (see services.cache_metrics)
+CACHE_METRICS_KEY = "cache_metrics"
+
+# Deletes a lock only while it still holds the releasing worker's token, so a
+# holder that outlived its TTL cannot release a lock another worker now holds
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("UNLINK", KEYS[1])
+end
+return 0
+"""
+
+
+def _format_bytes(size: int) -> str:
+    """Human-readable size in the style of Redis used_memory_human"""
+    for unit in ("B", "K", "M", "G"):
+        if size < 1024 or unit == "G":
+            return f"{size:.2f}{unit}" if unit != "B" else f"{size}B"
+        size /= 1024
+
+
+class CacheBackend(ABC):
+    """Shared (L2) storage behind CacheService
+
+    Values are serialized entries with a TTL, indexed under tags, plus
+    batched cache counters and short-lived refresh locks. The async methods
+    default to the sync implementation, which suits in-process backends.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Whether a key is stored, without counting it as a lookup"""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl_seconds: int, tags: List[str], tag_ttl_seconds: int):
+        """Store a value indexed under its tags"""
+
+    @abstractmethod
+    def delete_pattern(self, match: str) -> int:
+        """Remove every key matching a glob pattern"""
+
+    @abstractmethod
+    def delete_tag(self, tag: str) -> int:
+        """Remove every key indexed under a tag"""
+
+    @abstractmethod
+    def incr_metrics(self, deltas: Dict[str, float]):
+        """Apply a batch of counter increments"""
+
+    @abstractmethod
+    def get_metrics(self) -> Tuple[Dict[str, float], str]:
+        """All counter totals, plus memory used"""
+
+    @abstractmethod
+    def reset_metrics(self):
+        ...
+
+    @abstractmethod
+    def acquire_lock(self, key: str, ttl_seconds: int) -> Optional[str]:
+        """A token identifying this holder, or None while another holds the lock"""
+
+    @abstractmethod
+    def release_lock(self, key: str, token: str):
+        """Release the lock if it is still held with token"""
+
+    async def aget(self, key: str) -> Optional[bytes]:
+        return self.get(key)
+
+    async def aexists(self, key: str) -> bool:
+        return self.exists(key)
+
+    async def aset(self, key: str, value: bytes, ttl_seconds: int, tags: List[str], tag_ttl_seconds: int):
+        self.set(key, value, ttl_seconds, tags, tag_ttl_seconds)
+
+    async def adelete_tag(self, tag: str) -> int:
+        return self.delete_tag(tag)
+
+    async def aincr_metrics(self, deltas: Dict[str, float]):
+        self.incr_metrics(deltas)
+
+    async def aget_metrics(self) -> Tuple[Dict[str, float], str]:
+        return self.get_metrics()
+
+    async def aacquire_lock(self, key: str, ttl_seconds: int) -> Optional[str]:
+        return self.acquire_lock(key, ttl_seconds)
+
+    async def arelease_lock(self, key: str, token: str):
+        self.release_lock(key, token)
+
+    async def aclose(self):
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process backend with TTL and byte bounds, for single-node and test deployments"""
+
+    name = "memory"
+
+    def __init__(self, max_bytes: int = CACHE_MEMORY_MAX_BYTES):
+        self.store = LocalLRUCache(max_bytes)
+        self._locks: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.metrics: Dict[str, float] = {}
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.store.get(key)
+
+    def exists(self, key: str) -> bool:
+        return self.store.peek(key) is not None
+
+    def set(self, key: str, value: bytes, ttl_seconds: int, tags: List[str], tag_ttl_seconds: int):
+        self.store.set(key, value, len(value), ttl_seconds, tags=tags)
+
+    def delete_pattern(self, match: str) -> int:
+        return self.store.delete_many([key for key in self.store.keys() if fnmatchcase(key, match)])
+
+    def delete_tag(self, tag: str) -> int:
+        return self.store.delete_tag(tag)
+
+    def incr_metrics(self, deltas: Dict[str, float]):
+        with self._lock:
+            for field, amount in deltas.items():
+                self.metrics[field] = self.metrics.get(field, 0) + amount
+
+    def get_metrics(self) -> Tuple[Dict[str, float], str]:
+        with self._lock:
+            metrics = dict(self.metrics)
+        return metrics, _format_bytes(self.store.get_stats()["bytes"])
+
+    def reset_metrics(self):
+        with self._lock:
+            self.metrics.clear()
+
+    def acquire_lock(self, key: str, ttl_seconds: int) -> Optional[str]:
+        now = time.monotonic()
+        with self._lock:
+            held = self._locks.get(key)
+            if held is not None and held[0] > now:
+                return None
+            token = secrets.token_hex(16)
+            self._locks[key] = (now + ttl_seconds, token)
+            return token
+
+    def release_lock(self, key: str, token: str):
+        with self._lock:
+            held = self._locks.get(key)
+            if held is not None and held[1] == token:
+                del self._locks[key]
+
+
+class RedisCacheBackend(CacheBackend):
+    """Redis backend shared by every worker; raises on construction if Redis is unreachable"""
+
+    name = "redis"
+
+    def __init__(self, redis_url: str):
+        # Values are binary (see cache_codec), so responses are not decoded
+        self.redis_client = redis.from_url(
+            redis_url,
+            socket_connect_timeout=CACHE_REDIS_TIMEOUT_SECONDS * 4
+        )
+        self.redis_client.ping()
+
+        # Asyncio client for request handlers; connections are opened lazily
+        self.async_pool = aioredis.ConnectionPool.from_url(
+            redis_url,
+            max_connections=CACHE_REDIS_MAX_CONNECTIONS,
+            socket_timeout=CACHE_REDIS_TIMEOUT_SECONDS,
+            socket_connect_timeout=CACHE_REDIS_TIMEOUT_SECONDS
+        )
+        self.async_client = aioredis.Redis(connection_pool=self.async_pool)
+        self._release_lock = self.redis_client.register_script(RELEASE_LOCK_SCRIPT)
+        self._arelease_lock = self.async_client.register_script(RELEASE_LOCK_SCRIPT)
+
+    def _queue_set(self, pipe, key: str, value: bytes, ttl_seconds: int, tags: Iterable[str], tag_ttl_seconds: int):
+        """Queue the value write and its tag index entries on a pipeline
+
+        Tag members are scored by when their entry expires, and members
+        already past it are pruned on every write, so a busy tag only ever
+        holds live keys.
+        """
+        now = time.time()
+        pipe.setex(key, ttl_seconds, value)
+        for tag in tags:
+            tag_key = f"{CACHE_TAG_PREFIX}{tag}"
+            pipe.zadd(tag_key, {key: now + ttl_seconds})
+            pipe.zremrangebyscore(tag_key, "-inf", now)
+            pipe.expire(tag_key, tag_ttl_seconds)
+
+    def _queue_incr_metrics(self, pipe, deltas: Dict[str, float]):
+        # Float increments throughout, since saved_ms and byte totals share the hash
+        for field, amount in deltas.items():
+            pipe.hincrbyfloat(CACHE_METRICS_KEY, field, amount)
+
+    @staticmethod
+    def _decode_metrics(raw: Dict[bytes, bytes]) -> Dict[str, float]:
+        return {field.decode(): float(value) for field, value in raw.items()}
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.redis_client.get(key)
+
+    def exists(self, key: str) -> bool:
+        return bool(self.redis_client.exists(key))
+
+    def set(self, key: str, value: bytes, ttl_seconds: int, tags: List[str], tag_ttl_seconds: int):
+        pipe = self.redis_client.pipeline(transaction=False)
+        self._queue_set(pipe, key, value, ttl_seconds, tags, tag_ttl_seconds)
+        pipe.execute()
+
+    def delete_pattern(self, match: str) -> int:
+        """Incremental SCAN/UNLINK so Redis is never blocked on a large keyspace"""
+        removed = 0
+        batch = []
+        for key in self.redis_client.scan_iter(match=match, count=CACHE_INVALIDATION_BATCH_SIZE):
+            batch.append(key)
+            if len(batch) >= CACHE_INVALIDATION_BATCH_SIZE:
+                removed += self.redis_client.unlink(*batch)
+                batch = []
+        if batch:
+            removed += self.redis_client.unlink(*batch)
+        return removed
+
+    def delete_tag(self, tag: str) -> int:
+        tag_key = f"{CACHE_TAG_PREFIX}{tag}"
+        removed = 0
+        batch = []
+        # Members are pruned as they expire, so the scan only visits live keys
+        self.redis_client.zremrangebyscore(tag_key, "-inf", time.time())
+        for key, _ in self.redis_client.zscan_iter(tag_key, count=CACHE_INVALIDATION_BATCH_SIZE):
+            batch.append(key)
+            if len(batch) >= CACHE_INVALIDATION_BATCH_SIZE:
+                removed += self.redis_client.unlink(*batch)
+                batch = []
+        if batch:
+            removed += self.redis_client.unlink(*batch)
+        self.redis_client.unlink(tag_key)
+        return removed
+
+    def incr_metrics(self, deltas: Dict[str, float]):
+        pipe = self.redis_client.pipeline(transaction=False)
+        self._queue_incr_metrics(pipe, deltas)
+        pipe.execute()
+
+    def get_metrics(self) -> Tuple[Dict[str, float], str]:
+        metrics = self._decode_metrics(self.redis_client.hgetall(CACHE_METRICS_KEY))
+        info = self.redis_client.info("memory")
+        return metrics, info.get("used_memory_human", "N/A")
+
+    def reset_metrics(self):
+        self.redis_client.delete(CACHE_METRICS_KEY)
+
+    def acquire_lock(self, key: str, ttl_seconds: int) -> Optional[str]:
+        token = secrets.token_hex(16)
+        return token if self.redis_client.set(key, token, nx=True, ex=ttl_seconds) else None
+
+    def release_lock(self, key: str, token: str):
+        self._release_lock(keys=[key], args=[token])
+
+    # Each async call is bounded by CACHE_REDIS_TIMEOUT_SECONDS
+
+    async def aget(self, key: str) -> Optional[bytes]:
+        return await asyncio.wait_for(self.async_client.get(key), CACHE_REDIS_TIMEOUT_SECONDS)
+
+    async def aexists(self, key: str) -> bool:
+        return bool(await asyncio.wait_for(self.async_client.exists(key), CACHE_REDIS_TIMEOUT_SECONDS))
+
+    async def aset(self, key: str, value: bytes, ttl_seconds: int, tags: List[str], tag_ttl_seconds: int):
+        pipe = self.async_client.pipeline(transaction=False)
+        self._queue_set(pipe, key, value, ttl_seconds, tags, tag_ttl_seconds)
+        await asyncio.wait_for(pipe.execute(), CACHE_REDIS_TIMEOUT_SECONDS)
+
+    async def adelete_tag(self, tag: str) -> int:
+        """ZSCAN/UNLINK in batches, yielding to the event loop between them"""
+        tag_key = f"{CACHE_TAG_PREFIX}{tag}"
+        removed = 0
+        batch = []
+        await self.async_client.zremrangebyscore(tag_key, "-inf", time.time())
+        async for key, _ in self.async_client.zscan_iter(tag_key, count=CACHE_INVALIDATION_BATCH_SIZE):
+            batch.append(key)
+            if len(batch) >= CACHE_INVALIDATION_BATCH_SIZE:
+                removed += await self.async_client.unlink(*batch)
+                batch = []
+        if batch:
+            removed += await self.async_client.unlink(*batch)
+        await self.async_client.unlink(tag_key)
+        return removed
+
+    async def aincr_metrics(self, deltas: Dict[str, float]):
+        pipe = self.async_client.pipeline(transaction=False)
+        self._queue_incr_metrics(pipe, deltas)
+        await asyncio.wait_for(pipe.execute(), CACHE_REDIS_TIMEOUT_SECONDS)
+
+    async def aget_metrics(self) -> Tuple[Dict[str, float], str]:
+        pipe = self.async_client.pipeline(transaction=False)
+        pipe.hgetall(CACHE_METRICS_KEY)
+        pipe.info("memory")
+        raw, info = await asyncio.wait_for(pipe.execute(), CACHE_REDIS_TIMEOUT_SECONDS)
+        return self._decode_metrics(raw), info.get("used_memory_human", "N/A")
+
+    async def aacquire_lock(self, key: str, ttl_seconds: int) -> Optional[str]:
+        token = secrets.token_hex(16)
+        acquired = await asyncio.wait_for(
+            self.async_client.set(key, token, nx=True, ex=ttl_seconds),
+            CACHE_REDIS_TIMEOUT_SECONDS
+        )
+        return token if acquired else None
+
+    async def arelease_lock(self, key: str, token: str):
+        await asyncio.wait_for(self._arelease_lock(keys=[key], args=[token]), CACHE_REDIS_TIMEOUT_SECONDS)
+
+    async def aclose(self):
+        await self.async_client.aclose()
+        self.redis_client.close()
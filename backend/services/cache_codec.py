@@ -0,0 +1,68 @@
+import json
+import os
+import zlib
+from typing import Any
+
+try:
+    import msgpack
+except ImportError:  # optional; compact JSON is used without it
+    msgpack = None
+
+# Wire format: [version][flags][body]. Bump the version when the layout changes;
+# decode() keeps reading older versions and legacy plain-JSON values.
+CODEC_VERSION = 1
+FLAG_COMPRESSED = 0x01
+FLAG_MSGPACK = 0x02
+
+# Bodies at least this large are zlib-compressed
+CACHE_COMPRESSION_THRESHOLD = int(os.getenv("CACHE_COMPRESSION_THRESHOLD", "1024"))
+CACHE_COMPRESSION_LEVEL = int(os.getenv("CACHE_COMPRESSION_LEVEL", "1"))
+
+
+def encode(value: Any) -> bytes:
+    """Serialize a cache entry to the compact binary format"""
+    flags = 0
+    if msgpack is not None:
+        body = msgpack.packb(value, default=str, use_bin_type=True)
+        flags |= FLAG_MSGPACK
+    else:
+        body = json.dumps(value, default=str, separators=(",", ":")).encode()
+
+    if len(body) >= CACHE_COMPRESSION_THRESHOLD:
+        compressed = zlib.compress(body, CACHE_COMPRESSION_LEVEL)
+        if len(compressed) < len(body):
+            body = compressed
+            flags |= FLAG_COMPRESSED
+
+    return bytes((CODEC_VERSION, flags)) + body
+
+
+def decode(data: bytes) -> Any:
+    """Deserialize a cache entry written by encode() or by the legacy JSON path"""
+    if isinstance(data, str):
+        return json.loads(data)
+    if data[:1] in (b"{", b"["):
+        return json.loads(data)
+
+    version, flags = data[0], data[1]
+    if version != CODEC_VERSION:
+        raise ValueError(f"Unsupported cache codec version: {version}")
+
+    body = memoryview(data)[2:]
+    if flags & FLAG_COMPRESSED:
+        body = zlib.decompress(body)
+    if flags & FLAG_MSGPACK:
+        if msgpack is None:
+            raise ValueError("Cache entry is msgpack-encoded but msgpack is not installed")
+        return msgpack.unpackb(body, raw=False)
+    return json.loads(bytes(body))
+
+
+def get_codec_info() -> dict:
+    """Describe the active encoding for the stats endpoint"""
+    return {
+        "version": CODEC_VERSION,
+        "format": "msgpack" if msgpack is not None else "json",
+        "compression": "zlib",
+        "compression_threshold": CACHE_COMPRESSION_THRESHOLD
+    }
@@ -0,0 +1,134 @@
+import os
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Tuple
+
+# Pending counter updates are pushed to the backend in one round trip once
+# this many events have accumulated, or every CACHE_METRICS_FLUSH_SECONDS
+CACHE_METRICS_FLUSH_EVENTS = int(os.getenv("CACHE_METRICS_FLUSH_EVENTS", "500"))
+CACHE_METRICS_FLUSH_SECONDS = float(os.getenv("CACHE_METRICS_FLUSH_SECONDS", "5"))
+
+# Upper bounds (bytes) of the cached payload size histogram buckets
+PAYLOAD_SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576)
+
+TIERS = ("l1", "l2")
+
+
+def _size_bucket(size: int) -> str:
+    for bound in PAYLOAD_SIZE_BUCKETS:
+        if size <= bound:
+            return str(bound)
+    return "inf"
+
+
+class CacheMetrics:
+    """Per-service, per-tier cache counters aggregated in-process between flushes
+
+    Counters are flat "service:group:name" fields so a flush is a single
+    batch of increments on the backend, whichever backend is active.
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, float] = defaultdict(float)
+        self._pending_events = 0
+        self._lock = threading.Lock()
+
+    def _add(self, fields: Iterable[Tuple[str, float]]) -> bool:
+        with self._lock:
+            for field, amount in fields:
+                self._pending[field] += amount
+            self._pending_events += 1
+            return self._pending_events >= CACHE_METRICS_FLUSH_EVENTS
+
+    def record_lookup(self, service_type: str, tier: str, hit: bool, saved_ms: float = 0, negative: bool = False) -> bool:
+        """Count a hit or miss on a tier; a hit also saves the result's upstream time"""
+        fields = [(f"{service_type}:{tier}:{'hits' if hit else 'misses'}", 1)]
+        if hit:
+            fields.append((f"{service_type}:{tier}:saved_ms", saved_ms))
+        if hit and negative:
+            # A cached failure is an upstream call that was not repeated
+            fields.append((f"{service_type}:negative:hits", 1))
+        return self._add(fields)
+
+    def record_set(self, service_type: str, tiers: Iterable[str], size: int, negative: bool = False) -> bool:
+        """Count a write to each tier and the serialized size of the payload"""
+        fields = [
+            *((f"{service_type}:{tier}:sets", 1) for tier in tiers),
+            (f"{service_type}:size:{_size_bucket(size)}", 1),
+            (f"{service_type}:size:bytes", size)
+        ]
+        if negative:
+            fields.append((f"{service_type}:negative:sets", 1))
+        return self._add(fields)
+
+    def take_pending(self) -> Dict[str, float]:
+        """Remove and return the updates accumulated since the last flush"""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(float)
+            self._pending_events = 0
+            return dict(pending)
+
+    def restore_pending(self, pending: Dict[str, float]):
+        """Put back updates whose flush failed so they go out with the next one"""
+        with self._lock:
+            for field, amount in pending.items():
+                self._pending[field] += amount
+
+    def peek_pending(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._pending)
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+            self._pending_events = 0
+
+    @staticmethod
+    def summarize(totals: Dict[str, float]) -> Dict[str, Any]:
+        """Turn flat counter fields into the per-service stats payload"""
+        raw: Dict[str, Dict[str, Dict[str, float]]] = defaultdict(lambda: defaultdict(dict))
+        for field, value in totals.items():
+            service_type, group, name = field.split(":", 2)
+            raw[service_type][group][name] = float(value)
+
+        services = {}
+        for service_type, groups in sorted(raw.items()):
+            tiers = {}
+            for tier in TIERS:
+                counters = groups.get(tier, {})
+                hits = int(counters.get("hits", 0))
+                misses = int(counters.get("misses", 0))
+                tiers[tier] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "sets": int(counters.get("sets", 0)),
+                    "hit_rate": round(hits / (hits + misses) * 100, 2) if hits + misses > 0 else 0,
+                    "saved_ms": round(counters.get("saved_ms", 0), 2)
+                }
+
+            sizes = groups.get("size", {})
+            stored = sum(int(sizes.get(str(bound), 0)) for bound in PAYLOAD_SIZE_BUCKETS) + int(sizes.get("inf", 0))
+            histogram = {f"<={bound}": int(sizes.get(str(bound), 0)) for bound in PAYLOAD_SIZE_BUCKETS}
+            histogram["+Inf"] = int(sizes.get("inf", 0))
+
+            # Every lookup goes through L1 first; L2 only sees the L1 misses
+            lookups = tiers["l1"]["hits"] + tiers["l1"]["misses"]
+            hits = tiers["l1"]["hits"] + tiers["l2"]["hits"]
+            services[service_type] = {
+                "hits": hits,
+                "misses": lookups - hits,
+                "hit_rate": round(hits / lookups * 100, 2) if lookups > 0 else 0,
+                "saved_ms": round(tiers["l1"]["saved_ms"] + tiers["l2"]["saved_ms"], 2),
+                "tiers": tiers,
+                "negative": {
+                    "hits": int(groups.get("negative", {}).get("hits", 0)),
+                    "sets": int(groups.get("negative", {}).get("sets", 0))
+                },
+                "payload_bytes": {
+                    "count": stored,
+                    "total": int(sizes.get("bytes", 0)),
+                    "avg": round(sizes.get("bytes", 0) / stored, 1) if stored else 0,
+                    "histogram": histogram
+                }
+            }
+        return services
@@ -1,27 +1,212 @@
 import redis
+import asyncio
 import json
 import hashlib
 import os
-from typing import Any, Optional
+from fnmatch import fnmatchcase
+from typing import Any, Awaitable, Callable, List, Optional
 from datetime import timedelta
 import time
 
+from services.local_cache import LocalLRUCache
+from services.cache_backends import CacheBackend, MemoryCacheBackend, RedisCacheBackend
+from services.cache_metrics import CacheMetrics, CACHE_METRICS_FLUSH_SECONDS
+from services import cache_codec
+
+# In-process L1 tier in front of the shared backend, sized per worker
+CACHE_L1_MAX_BYTES = int(os.getenv("CACHE_L1_MAX_BYTES", str(64 * 1024 * 1024)))
+# Upper bound on how long an L1 entry may outlive an invalidation on another worker
+CACHE_L1_TTL_SECONDS = float(os.getenv("CACHE_L1_TTL_SECONDS", "300"))
+
+# "redis" (falling back to the in-process backend while Redis is down) or "memory"
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "redis").lower()
+CACHE_MEMORY_FALLBACK = os.getenv("CACHE_MEMORY_FALLBACK", "true").lower() == "true"
+# While on the fallback, Redis is retried at this interval
+CACHE_REDIS_RECONNECT_SECONDS = float(os.getenv("CACHE_REDIS_RECONNECT_SECONDS", "5"))
+# Consecutive Redis connection errors before switching to the fallback
+CACHE_REDIS_FAILURE_THRESHOLD = int(os.getenv("CACHE_REDIS_FAILURE_THRESHOLD", "3"))
+
+# Deterministic provider failures (see ai_services.deterministic_error_code)
+# are cached this long so retries of the same input do not go upstream
+NEGATIVE_CACHE_TTL_SECONDS = int(os.getenv("NEGATIVE_CACHE_TTL_SECONDS", "300"))
+
+# Cross-worker lock that lets a single request refresh a stale entry
+CACHE_REFRESH_LOCK_PREFIX = "ai_cache_lock:"
+CACHE_REFRESH_LOCK_SECONDS = int(os.getenv("CACHE_REFRESH_LOCK_SECONDS", "60"))
+
 class CacheService:
-    """Redis-based caching service for AI responses"""
+    """Two-tier caching service for AI responses: in-process LRU (L1) in front of a shared backend (L2)
+
+    The L2 backend is Redis when it is reachable. Without it, an in-process
+    backend takes over and Redis is retried in the background until it
+    returns, so caching never switches off for the life of the process.
+    """
     
-    def __init__(self):
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        self.local_cache = LocalLRUCache(CACHE_L1_MAX_BYTES, CACHE_L1_TTL_SECONDS)
+        self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        # Stale-while-revalidate bookkeeping for this worker
+        self._refreshing = set()
+        self._refresh_tasks = set()
+        self.revalidation_stats = {
+            "stale_served": 0,
+            "refreshes_started": 0,
+            "refreshes_skipped": 0,
+            "refreshes_failed": 0
+        }
+        self._reconnect_task = None
+        self._redis_failures = 0
+        # Per-service counters, flushed to the backend in batches
+        self.metrics = CacheMetrics()
+        self._flush_task = None
+        self._flush_loop_task = None
+        self.backend_stats = {"fallbacks": 0, "reconnects": 0}
+        
+        if backend is None and CACHE_BACKEND == "memory":
+            backend = MemoryCacheBackend()
+        elif backend is None:
+            try:
+                backend = RedisCacheBackend(self.redis_url)
+            except Exception as e:
+                print(f"Redis connection failed: {e}")
+                if CACHE_MEMORY_FALLBACK:
+                    backend = MemoryCacheBackend()
+                    self.backend_stats["fallbacks"] += 1
+        self.backend = backend
+        self.is_available = backend is not None
+    
+    @property
+    def backend_name(self) -> str:
+        return self.backend.name if self.backend is not None else "none"
+    
+    def _wants_redis(self) -> bool:
+        """Whether Redis should be retried: it is configured but not the active backend"""
+        return CACHE_BACKEND == "redis" and not isinstance(self.backend, RedisCacheBackend)
+    
+    async def start(self):
+        """Start the periodic metrics flush, and reconnecting to Redis if the process started on the fallback"""
+        self._flush_loop_task = asyncio.create_task(self._flush_loop())
+        if self._wants_redis():
+            self._start_reconnect()
+    
+    def _start_reconnect(self):
+        if self._reconnect_task is not None and not self._reconnect_task.done():
+            return
         try:
-            # Redis connection
-            redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-            self.redis_client = redis.from_url(redis_url, decode_responses=True)
-            
-            # Test connection
-            self.redis_client.ping()
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Sync callers outside the event loop; the next async operation retries
+            return
+        self._reconnect_task = loop.create_task(self._reconnect_loop())
+    
+    async def _reconnect_loop(self):
+        """Poll Redis and move back to it once it answers"""
+        while self._wants_redis():
+            await asyncio.sleep(CACHE_REDIS_RECONNECT_SECONDS)
+            try:
+                backend = await asyncio.to_thread(RedisCacheBackend, self.redis_url)
+            except Exception:
+                continue
+            fallback, self.backend = self.backend, backend
             self.is_available = True
+            self._redis_failures = 0
+            self.backend_stats["reconnects"] += 1
+            print("Redis connection restored; cache backend switched back to Redis")
+            if fallback is not None:
+                await fallback.aclose()
+    
+    def _backend_ok(self):
+        self._redis_failures = 0
+    
+    def _backend_failed(self, operation: str, error: Exception):
+        """Log a backend error and move to the fallback after repeated Redis connection errors"""
+        print(f"Cache {operation} error: {error!r}")
+        if not isinstance(self.backend, RedisCacheBackend):
+            return
+        if not isinstance(error, (redis.exceptions.ConnectionError, ConnectionError)):
+            return
+        self._redis_failures += 1
+        if self._redis_failures < CACHE_REDIS_FAILURE_THRESHOLD or not CACHE_MEMORY_FALLBACK:
+            return
+        print("Redis unreachable; cache backend switched to in-process memory")
+        failed, self.backend = self.backend, MemoryCacheBackend()
+        self.backend_stats["fallbacks"] += 1
+        self._redis_failures = 0
+        self._start_reconnect()
+        try:
+            asyncio.get_running_loop().create_task(self._close_quietly(failed))
+        except RuntimeError:
+            pass
+    
+    async def _close_quietly(self, backend: CacheBackend):
+        try:
+            await backend.aclose()
+        except Exception:
+            pass
+    
+    def _saved_ms(self, cached: dict) -> float:
+        """Upstream time a hit avoided, as recorded with the cached result"""
+        result = cached.get("result")
+        return result.get("processing_time", 0) if isinstance(result, dict) else 0
+    
+    def _is_negative(self, cached: dict) -> bool:
+        result = cached.get("result")
+        return isinstance(result, dict) and result.get("success") is False
+    
+    def _record_lookup(self, service_type: str, tier: str, cached: Optional[dict]):
+        hit = cached is not None
+        if self.metrics.record_lookup(
+            service_type, tier, hit,
+            self._saved_ms(cached) if hit else 0,
+            negative=hit and self._is_negative(cached)
+        ):
+            self._schedule_flush()
+    
+    def _record_set(self, service_type: str, size: int, stored_l2: bool, negative: bool = False):
+        if self.metrics.record_set(service_type, ("l1", "l2") if stored_l2 else ("l1",), size, negative=negative):
+            self._schedule_flush()
+    
+    def _schedule_flush(self):
+        """Flush a full batch of counters; in the background when on the event loop"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_metrics()
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self.aflush_metrics())
+    
+    def flush_metrics(self):
+        """Push pending counter updates to the backend in one batch"""
+        if not self.is_available:
+            # Nowhere to send them; they keep accumulating locally
+            return
+        pending = self.metrics.take_pending()
+        if not pending:
+            return
+        try:
+            self.backend.incr_metrics(pending)
         except Exception as e:
-            print(f"Redis connection failed: {e}")
-            self.redis_client = None
-            self.is_available = False
+            self.metrics.restore_pending(pending)
+            self._backend_failed("metrics flush", e)
+    
+    async def aflush_metrics(self):
+        """Push pending counter updates to the backend in one batch without blocking the event loop"""
+        if not self.is_available:
+            return
+        pending = self.metrics.take_pending()
+        if not pending:
+            return
+        try:
+            await self.backend.aincr_metrics(pending)
+        except Exception as e:
+            self.metrics.restore_pending(pending)
+            self._backend_failed("metrics flush", e)
+    
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(CACHE_METRICS_FLUSH_SECONDS)
+            await self.aflush_metrics()
     
     def _generate_cache_key(self, service_type: str, input_data: Any, parameters: dict = None) -> str:
         """Generate a unique cache key based on service and inputs"""
@@ -34,141 +219,394 @@ class CacheService:
         
         return f"ai_cache:{service_type}:{cache_key}"
     
+    def _get_tags(self, service_type: str) -> List[str]:
+        """Tags an entry is indexed under
+
+        Entries are shared by every user who sends the same input, so they
+        are not tagged with, or cleared by, the user who wrote them.
+        """
+        return [f"service:{service_type}"]
+    
+    def _tag_ttl_seconds(self) -> int:
+        """Tag sets must outlive every entry they index"""
+        return int(max(
+            config["ttl_hours"] + config["stale_hours"] for config in CACHE_TTL_CONFIG.values()
+        ) * 3600)
+    
+    def _is_stale(self, cached: dict) -> bool:
+        """Whether an entry is past its fresh TTL and inside its staleness window"""
+        fresh_until = int(cached.get("cached_at", 0)) + cached.get("ttl_hours", 0) * 3600
+        return time.time() >= fresh_until
+    
+    def _promote_to_local(self, cache_key: str, cached_data: bytes) -> dict:
+        """Decode a backend value and keep it in L1 for the rest of the entry's lifetime"""
+        result = cache_codec.decode(cached_data)
+        lifetime_hours = result.get("ttl_hours", 0) + result.get("stale_hours", 0)
+        expires_at = int(result.get("cached_at", 0)) + lifetime_hours * 3600
+        self.local_cache.set(
+            cache_key, result, len(cached_data), expires_at - time.time(),
+            tags=result.get("tags", ())
+        )
+        return result
+    
+    def _store_local(self, cache_key: str, service_type: str, result: dict, ttl_hours: float, tags: List[str], stale_hours: float = 0):
+        """Wrap a result with its metadata, store it in L1 and return the serialized form and TTL
+
+        The entry is fresh for ttl_hours and may then be served stale for
+        stale_hours while it is refreshed, so it is kept for both.
+        """
+        # Add meta_data to cached result
+        cached_result = {
+            "result": result,
+            "cached_at": str(int(time.time())),
+            "service_type": service_type,
+            "ttl_hours": ttl_hours,
+            "stale_hours": stale_hours,
+            "tags": tags
+        }
+        serialized = cache_codec.encode(cached_result)
+        ttl_seconds = int((ttl_hours + stale_hours) * 3600)
+        self.local_cache.set(cache_key, cached_result, len(serialized), ttl_seconds, tags=tags)
+        return serialized, ttl_seconds
+    
     def get(self, service_type: str, input_data: Any, parameters: dict = None) -> Optional[dict]:
-        """Get cached result if available"""
+        """Get cached result if available, checking L1 before the backend"""
+        cache_key = self._generate_cache_key(service_type, input_data, parameters)
+        result = self.local_cache.get(cache_key)
+        self._record_lookup(service_type, "l1", result)
+        if result is not None:
+            return result
+        
         if not self.is_available:
             return None
         
         try:
-            cache_key = self._generate_cache_key(service_type, input_data, parameters)
-            cached_data = self.redis_client.get(cache_key)
-            
-            if cached_data:
-                result = json.loads(cached_data)
-                # Increment hit counter
-                self.redis_client.incr("cache_stats:hits")
-                return result
-            else:
-                # Increment miss counter
-                self.redis_client.incr("cache_stats:misses")
-                return None
-                
+            cached_data = self.backend.get(cache_key)
+            self._backend_ok()
+            result = self._promote_to_local(cache_key, cached_data) if cached_data else None
+            self._record_lookup(service_type, "l2", result)
+            return result
         except Exception as e:
-            print(f"Cache get error: {e}")
+            self._backend_failed("get", e)
             return None
     
-    def set(self, service_type: str, input_data: Any, result: dict, parameters: dict = None, ttl_hours: int = 24):
-        """Cache the result with TTL"""
+    def set(self, service_type: str, input_data: Any, result: dict, parameters: dict = None, ttl_hours: float = 24, stale_hours: float = 0):
+        """Cache the result with TTL in both tiers, indexed under the service tag"""
+        cache_key = self._generate_cache_key(service_type, input_data, parameters)
+        tags = self._get_tags(service_type)
+        serialized, ttl_seconds = self._store_local(cache_key, service_type, result, ttl_hours, tags, stale_hours)
+        
         if not self.is_available:
+            self._record_set(service_type, len(serialized), stored_l2=False)
             return False
         
         try:
-            cache_key = self._generate_cache_key(service_type, input_data, parameters)
-            
-            # Add meta_data to cached result
-            cached_result = {
-                "result": result,
-                "cached_at": str(int(time.time())),
-                "service_type": service_type,
-                "ttl_hours": ttl_hours
-            }
-            
-            # Set with expiration
-            ttl_seconds = ttl_hours * 3600
-            self.redis_client.setex(
-                cache_key, 
-                ttl_seconds, 
-                json.dumps(cached_result, default=str)
-            )
-            
-            # Increment cache set counter
-            self.redis_client.incr("cache_stats:sets")
+            self.backend.set(cache_key, serialized, ttl_seconds, tags, self._tag_ttl_seconds())
+            self._backend_ok()
+            self._record_set(service_type, len(serialized), stored_l2=True)
             return True
-            
         except Exception as e:
-            print(f"Cache set error: {e}")
+            self._backend_failed("set", e)
+            self._record_set(service_type, len(serialized), stored_l2=False)
             return False
     
     def invalidate_pattern(self, pattern: str):
-        """Invalidate cache entries matching a pattern"""
+        """Invalidate cache entries matching a pattern in both tiers"""
+        match = f"ai_cache:{pattern}*"
+        self.local_cache.delete_many([key for key in self.local_cache.keys() if fnmatchcase(key, match)])
         if not self.is_available:
             return False
         
         try:
-            keys = self.redis_client.keys(f"ai_cache:{pattern}*")
-            if keys:
-                self.redis_client.delete(*keys)
-                return len(keys)
-            return 0
+            return self.backend.delete_pattern(match)
         except Exception as e:
-            print(f"Cache invalidate error: {e}")
+            self._backend_failed("invalidate", e)
             return False
     
-    def clear_user_cache(self, user_id: int):
-        """Clear all cache entries for a specific user"""
-        # Note: This would require storing user_id in cache keys
-        # For now, we'll implement a simple pattern-based clear
-        return self.invalidate_pattern("*")
+    def invalidate_tag(self, tag: str):
+        """Invalidate only the entries indexed under a tag"""
+        self.local_cache.delete_tag(tag)
+        if not self.is_available:
+            return False
+        
+        try:
+            return self.backend.delete_tag(tag)
+        except Exception as e:
+            self._backend_failed("invalidate", e)
+            return False
+    
+    def clear_service_cache(self, service_type: str):
+        """Clear the cache entries for one AI service"""
+        return self.invalidate_tag(f"service:{service_type}")
+    
+    def _build_stats(self, totals: dict, memory_used: str, local_stats: dict, status: str = "available") -> dict:
+        """Assemble the stats payload from the per-service counters and the local L1 tier
+
+        totals are the flushed backend counters plus this worker's pending
+        updates, so the response includes requests since the last flush.
+        """
+        merged = dict(totals)
+        for field, amount in self.metrics.peek_pending().items():
+            merged[field] = merged.get(field, 0) + amount
+        services = CacheMetrics.summarize(merged)
+        
+        hits = sum(service["hits"] for service in services.values())
+        misses = sum(service["misses"] for service in services.values())
+        sets = sum(service["payload_bytes"]["count"] for service in services.values())
+        negative_hits = sum(service["negative"]["hits"] for service in services.values())
+        total_requests = hits + misses
+        hit_rate = (hits / total_requests * 100) if total_requests > 0 else 0
+        l2 = {
+            name: sum(service["tiers"]["l2"][name] for service in services.values())
+            for name in ("hits", "misses", "sets")
+        }
+        l2_lookups = l2["hits"] + l2["misses"]
+        
+        return {
+            "status": status,
+            "backend": self.backend_name,
+            "backend_events": dict(self.backend_stats),
+            "hits": hits,
+            "misses": misses,
+            "sets": sets,
+            "hit_rate": round(hit_rate, 2),
+            "memory_used": memory_used,
+            "total_requests": total_requests,
+            "saved_ms": round(sum(service["saved_ms"] for service in services.values()), 2),
+            # Upstream calls avoided by serving a cached deterministic failure
+            "negative_hits": negative_hits,
+            "services": services,
+            "encoding": cache_codec.get_codec_info(),
+            "revalidation": dict(self.revalidation_stats),
+            "tiers": {
+                # L1 entry counts are for this worker only; counters are shared when on Redis
+                "l1": local_stats,
+                "l2": {
+                    "backend": self.backend_name,
+                    **l2,
+                    "hit_rate": round(l2["hits"] / l2_lookups * 100, 2) if l2_lookups > 0 else 0,
+                    "memory_used": memory_used
+                }
+            }
+        }
+    
+    def _unavailable_stats(self, local_stats: dict) -> dict:
+        """Stats payload when there is no L2 backend; counters are this worker's only"""
+        return self._build_stats({}, "N/A", local_stats, status="unavailable")
+    
+    def _error_stats(self, error: Exception, local_stats: dict) -> dict:
+        return {
+            "status": "error",
+            "backend": self.backend_name,
+            "error": repr(error),
+            "tiers": {"l1": local_stats}
+        }
     
     def get_cache_stats(self) -> dict:
-        """Get cache hit/miss statistics"""
+        """Get cache hit/miss statistics, with a breakdown per tier"""
+        local_stats = self.local_cache.get_stats()
         if not self.is_available:
-            return {
-                "status": "unavailable",
-                "hits": 0,
-                "misses": 0,
-                "sets": 0,
-                "hit_rate": 0
-            }
+            return self._unavailable_stats(local_stats)
         
         try:
-            hits = int(self.redis_client.get("cache_stats:hits") or 0)
-            misses = int(self.redis_client.get("cache_stats:misses") or 0)
-            sets = int(self.redis_client.get("cache_stats:sets") or 0)
-            
-            total_requests = hits + misses
-            hit_rate = (hits / total_requests * 100) if total_requests > 0 else 0
-            
-            # Get memory usage info
-            info = self.redis_client.info("memory")
-            memory_used = info.get("used_memory_human", "N/A")
-            
-            return {
-                "status": "available",
-                "hits": hits,
-                "misses": misses,
-                "sets": sets,
-                "hit_rate": round(hit_rate, 2),
-                "memory_used": memory_used,
-                "total_requests": total_requests
-            }
+            totals, memory_used = self.backend.get_metrics()
+            return self._build_stats(totals, memory_used, local_stats)
         except Exception as e:
-            print(f"Cache stats error: {e}")
-            return {
-                "status": "error",
-                "error": str(e)
-            }
+            self._backend_failed("stats", e)
+            return self._error_stats(e, local_stats)
     
     def reset_stats(self):
         """Reset cache statistics"""
+        self.local_cache.reset_stats()
+        self.metrics.clear()
+        if not self.is_available:
+            return False
+        
+        try:
+            self.backend.reset_metrics()
+            return True
+        except Exception as e:
+            self._backend_failed("reset stats", e)
+            return False
+
+    # Asyncio API used by request handlers. Each call is bounded by the
+    # backend's timeout and degrades to a miss on any backend error.
+    
+    async def aget(
+        self,
+        service_type: str,
+        input_data: Any,
+        parameters: dict = None,
+        refresh: Optional[Callable[[], Awaitable[Any]]] = None
+    ) -> Optional[dict]:
+        """Get cached result without blocking the event loop, checking L1 before the backend
+
+        Entries past their fresh TTL are still returned (marked "stale": True)
+        until their staleness bound. When refresh is given, the first caller to
+        see a stale entry starts it in the background; everyone else keeps
+        getting the stale value until the refreshed one is written. refresh is
+        called before aget returns, so it can take hold of anything the
+        request owns that the background refresh will need.
+        """
+        cache_key = self._generate_cache_key(service_type, input_data, parameters)
+        cached = self.local_cache.get(cache_key)
+        self._record_lookup(service_type, "l1", cached)
+        
+        if cached is None and self.is_available:
+            try:
+                cached_data = await self.backend.aget(cache_key)
+                self._backend_ok()
+                if cached_data:
+                    cached = self._promote_to_local(cache_key, cached_data)
+                self._record_lookup(service_type, "l2", cached)
+            except Exception as e:
+                self._backend_failed("get", e)
+                return None
+        
+        if cached is None or not self._is_stale(cached):
+            return cached
+        
+        self.revalidation_stats["stale_served"] += 1
+        if refresh is not None:
+            await self._schedule_refresh(cache_key, refresh)
+        return {**cached, "stale": True}
+    
+    async def aexists(self, service_type: str, input_data: Any, parameters: dict = None) -> bool:
+        """Whether a result is cached, fresh or stale
+
+        Unlike aget this is not counted in the hit/miss analytics, does not
+        promote the entry or change its recency, and never starts a refresh.
+        """
+        cache_key = self._generate_cache_key(service_type, input_data, parameters)
+        if self.local_cache.peek(cache_key) is not None:
+            return True
+        if not self.is_available:
+            return False
+        try:
+            exists = await self.backend.aexists(cache_key)
+            self._backend_ok()
+            return exists
+        except Exception as e:
+            self._backend_failed("exists", e)
+            return False
+    
+    async def _schedule_refresh(self, cache_key: str, refresh: Callable[[], Awaitable[Any]]):
+        """Start one background refresh per key across all workers"""
+        if cache_key in self._refreshing:
+            self.revalidation_stats["refreshes_skipped"] += 1
+            return
+        self._refreshing.add(cache_key)
+        
+        lock_token = None
+        if self.is_available:
+            try:
+                lock_token = await self.backend.aacquire_lock(
+                    f"{CACHE_REFRESH_LOCK_PREFIX}{cache_key}", CACHE_REFRESH_LOCK_SECONDS
+                )
+            except Exception as e:
+                self._backend_failed("refresh lock", e)
+            if lock_token is None:
+                # Another worker is refreshing, or the backend is struggling; keep serving stale
+                self._refreshing.discard(cache_key)
+                self.revalidation_stats["refreshes_skipped"] += 1
+                return
+        
+        self.revalidation_stats["refreshes_started"] += 1
+        task = asyncio.create_task(self._run_refresh(cache_key, refresh(), lock_token))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+    
+    async def _run_refresh(self, cache_key: str, refresh: Awaitable[Any], lock_token: Optional[str]):
+        """Run a refresh, then release the refresh lock if it took one; it is expected to write the new value through aset"""
+        try:
+            await refresh
+        except Exception as e:
+            self.revalidation_stats["refreshes_failed"] += 1
+            print(f"Cache refresh error: {e!r}")
+        finally:
+            self._refreshing.discard(cache_key)
+            if lock_token is not None and self.is_available:
+                try:
+                    await self.backend.arelease_lock(f"{CACHE_REFRESH_LOCK_PREFIX}{cache_key}", lock_token)
+                except Exception:
+                    pass
+    
+    async def aset(self, service_type: str, input_data: Any, result: dict, parameters: dict = None, ttl_hours: float = 24, stale_hours: float = 0) -> bool:
+        """Cache the result in both tiers without blocking the event loop"""
+        cache_key = self._generate_cache_key(service_type, input_data, parameters)
+        tags = self._get_tags(service_type)
+        serialized, ttl_seconds = self._store_local(cache_key, service_type, result, ttl_hours, tags, stale_hours)
+        
+        negative = result.get("success") is False
         if not self.is_available:
+            self._record_set(service_type, len(serialized), stored_l2=False, negative=negative)
             return False
         
         try:
-            self.redis_client.delete("cache_stats:hits", "cache_stats:misses", "cache_stats:sets")
+            await self.backend.aset(cache_key, serialized, ttl_seconds, tags, self._tag_ttl_seconds())
+            self._backend_ok()
+            self._record_set(service_type, len(serialized), stored_l2=True, negative=negative)
             return True
         except Exception as e:
-            print(f"Cache reset stats error: {e}")
+            self._backend_failed("set", e)
+            self._record_set(service_type, len(serialized), stored_l2=False, negative=negative)
+            return False
+    
+    async def aset_negative(self, service_type: str, input_data: Any, result: dict, parameters: dict = None) -> bool:
+        """Briefly cache a deterministic provider failure; transient failures must not be passed here"""
+        return await self.aset(
+            service_type, input_data, result, parameters,
+            ttl_hours=NEGATIVE_CACHE_TTL_SECONDS / 3600
+        )
+    
+    async def ainvalidate_tag(self, tag: str):
+        """Invalidate the entries indexed under a tag without blocking the event loop"""
+        self.local_cache.delete_tag(tag)
+        if not self.is_available:
+            return False
+        
+        try:
+            return await self.backend.adelete_tag(tag)
+        except Exception as e:
+            self._backend_failed("invalidate", e)
             return False
+    
+    async def aclear_service_cache(self, service_type: str):
+        """Clear the cache entries for one AI service"""
+        return await self.ainvalidate_tag(f"service:{service_type}")
+    
+    async def aget_cache_stats(self) -> dict:
+        """Get cache statistics without blocking the event loop"""
+        local_stats = self.local_cache.get_stats()
+        if not self.is_available:
+            return self._unavailable_stats(local_stats)
+        
+        try:
+            totals, memory_used = await self.backend.aget_metrics()
+            return self._build_stats(totals, memory_used, local_stats)
+        except Exception as e:
+            self._backend_failed("stats", e)
+            return self._error_stats(e, local_stats)
+    
+    async def aclose(self):
+        """Flush pending counters, stop background tasks and release the backend's connections"""
+        for task in (self._reconnect_task, self._flush_loop_task):
+            if task is not None:
+                task.cancel()
+        await self.aflush_metrics()
+        if self.backend is not None:
+            await self.backend.aclose()
 
 # Global cache service instance
 cache_service = CacheService()
 
-# Cache TTL configurations for different services
+# Cache TTL configurations for different services. Entries are fresh for
+# ttl_hours; for stale_hours after that they are still served while a single
+# request refreshes them in the background.
 CACHE_TTL_CONFIG = {
-    "generate": 72,  # 72 hours for image generation
-    "classify": 168,  # 1 week for classification
-    "detect": 168,   # 1 week for object detection
-    "segment": 168,  # 1 week for segmentation
-    "chat": 24       # 24 hours for chat (shorter due to context sensitivity)
-}
\ No newline at end of file
+    "generate": {"ttl_hours": 72, "stale_hours": 24},   # 72 hours for image generation
+    "classify": {"ttl_hours": 168, "stale_hours": 24},  # 1 week for classification
+    "detect": {"ttl_hours": 168, "stale_hours": 24},    # 1 week for object detection
+    "segment": {"ttl_hours": 168, "stale_hours": 24},   # 1 week for segmentation
+    "chat": {"ttl_hours": 24, "stale_hours": 1}         # 24 hours for chat (shorter due to context sensitivity)
+}
@@ -0,0 +1,215 @@
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from services.ai_services import ai_service_manager
+from services.cache_service import cache_service, CACHE_TTL_CONFIG
+from services.request_coalescer import request_coalescer, content_hash
+
+CACHE_WARM_ON_STARTUP = os.getenv("CACHE_WARM_ON_STARTUP", "false").lower() == "true"
+# How much recent history is scanned, and how many of its most frequent inputs are warmed
+CACHE_WARM_HISTORY_LIMIT = int(os.getenv("CACHE_WARM_HISTORY_LIMIT", "5000"))
+CACHE_WARM_TOP_N = int(os.getenv("CACHE_WARM_TOP_N", "50"))
+# Upstream budget of a run: total calls, and calls per minute
+CACHE_WARM_MAX_CALLS = int(os.getenv("CACHE_WARM_MAX_CALLS", "50"))
+CACHE_WARM_RATE_PER_MINUTE = float(os.getenv("CACHE_WARM_RATE_PER_MINUTE", "30"))
+
+
+def _generate_input_hash(prompt: str) -> str:
+    # Must match the key the /api/v1/generate handler caches under
+    return content_hash(prompt.strip().encode())
+
+
+# Services whose requests can be replayed from history: (input hash, upstream call).
+# Vision uploads and chat conversations are not kept, so they cannot be warmed.
+WARMABLE_SERVICES: Dict[str, Tuple[Callable[[str], str], Callable[[str, dict], Awaitable[Dict[str, Any]]]]] = {
+    "generate": (_generate_input_hash, lambda prompt, parameters: ai_service_manager.generate_image(prompt, parameters))
+}
+
+
+class CacheWarmer:
+    """Pre-populates the cache with the most requested inputs from recent history"""
+
+    def __init__(self):
+        # MemoryStorage of the API process; attached by main at startup
+        self.storage = None
+        self._task: Optional[asyncio.Task] = None
+        self.progress: Dict[str, Any] = {"state": "idle"}
+
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _memory_history(self, limit: int) -> List[Dict[str, Any]]:
+        if self.storage is None:
+            return []
+        jobs = list(self.storage.ai_jobs.values())[-limit:]
+        return [job.to_dict() for job in jobs if job.status == "completed"]
+
+    def _database_history(self, limit: int) -> List[Dict[str, Any]]:
+        from database import SessionLocal
+        from models.database import AIRequest
+
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(AIRequest.service_type, AIRequest.prompt, AIRequest.parameters)
+                .filter(AIRequest.status == "completed", AIRequest.prompt.isnot(None))
+                .order_by(AIRequest.created_at.desc())
+                .limit(limit)
+                .all()
+            )
+        finally:
+            db.close()
+        return [
+            {
+                "service_type": getattr(service_type, "value", service_type),
+                "prompt": prompt,
+                "parameters": parameters or {}
+            }
+            for service_type, prompt, parameters in rows
+        ]
+
+    async def _load_history(self, source: str, limit: int) -> Tuple[str, List[Dict[str, Any]]]:
+        """Read recent requests; "auto" uses this process's jobs if it has any, else the AIRequest table"""
+        if source in ("memory", "auto"):
+            jobs = self._memory_history(limit)
+            if jobs or source == "memory":
+                return "memory", jobs
+        # Synchronous SQLAlchemy session; keep it off the event loop
+        return "database", await asyncio.to_thread(self._database_history, limit)
+
+    def _top_inputs(self, jobs: List[Dict[str, Any]], top_n: int) -> List[Tuple[str, str, dict, int]]:
+        """Most frequent (service, prompt, parameters) combinations among replayable jobs"""
+        counts = Counter()
+        for job in jobs:
+            if job.get("service_type") not in WARMABLE_SERVICES or not job.get("prompt"):
+                continue
+            parameters = json.dumps(job.get("parameters") or {}, sort_keys=True, default=str)
+            counts[(job["service_type"], job["prompt"], parameters)] += 1
+        return [
+            (service_type, prompt, json.loads(parameters), count)
+            for (service_type, prompt, parameters), count in counts.most_common(top_n)
+        ]
+
+    async def _is_cached(self, service_type: str, prompt: str, parameters: dict) -> bool:
+        input_hash_for, _ = WARMABLE_SERVICES[service_type]
+        # Not aget: a warming run must not count as cache traffic or trigger refreshes
+        return await cache_service.aexists(service_type, input_hash_for(prompt), parameters)
+
+    async def _warm_entry(self, service_type: str, prompt: str, parameters: dict) -> bool:
+        """Fill one entry through the upstream call; returns whether it succeeded"""
+        input_hash_for, call = WARMABLE_SERVICES[service_type]
+        input_hash = input_hash_for(prompt)
+        ttl_config = CACHE_TTL_CONFIG[service_type]
+
+        async def call_and_cache():
+            result = await call(prompt, parameters)
+            if result["success"]:
+                await cache_service.aset(
+                    service_type, input_hash, result, parameters,
+                    ttl_hours=ttl_config["ttl_hours"],
+                    stale_hours=ttl_config["stale_hours"]
+                )
+            return result
+
+        # Shares the call with a live request for the same input, if one is in flight
+        key = request_coalescer.make_key(service_type, input_hash, parameters)
+        result, _ = await request_coalescer.run(key, call_and_cache)
+        return result["success"]
+
+    async def _run(self, source: str, top_n: int, max_calls: int, rate_per_minute: float):
+        progress = self.progress
+        try:
+            progress["source"], jobs = await self._load_history(source, CACHE_WARM_HISTORY_LIMIT)
+            candidates = self._top_inputs(jobs, top_n)
+            progress.update({"history_scanned": len(jobs), "candidates": len(candidates)})
+
+            interval = 60.0 / rate_per_minute if rate_per_minute > 0 else 0
+            next_call_at = time.monotonic()
+            for service_type, prompt, parameters, count in candidates:
+                if await self._is_cached(service_type, prompt, parameters):
+                    progress["already_cached"] += 1
+                    continue
+                if progress["upstream_calls"] >= max_calls:
+                    progress["budget_exhausted"] = True
+                    break
+                # Space upstream calls out to stay inside the rate budget
+                delay = next_call_at - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                progress["current"] = {"service_type": service_type, "prompt": prompt[:80], "requests": count}
+                progress["upstream_calls"] += 1
+                try:
+                    succeeded = await self._warm_entry(service_type, prompt, parameters)
+                except Exception as e:
+                    print(f"Cache warm error: {e!r}")
+                    succeeded = False
+                progress["warmed" if succeeded else "failed"] += 1
+                next_call_at = time.monotonic() + interval
+
+            progress["state"] = "completed"
+        except asyncio.CancelledError:
+            progress["state"] = "cancelled"
+            raise
+        except Exception as e:
+            progress.update({"state": "failed", "error": repr(e)})
+        finally:
+            progress["current"] = None
+            progress["finished_at"] = datetime.utcnow().isoformat()
+
+    def start(
+        self,
+        source: str = "auto",
+        top_n: int = CACHE_WARM_TOP_N,
+        max_calls: int = CACHE_WARM_MAX_CALLS,
+        rate_per_minute: float = CACHE_WARM_RATE_PER_MINUTE
+    ) -> Dict[str, Any]:
+        """Start a warming run in the background; a run already in progress is left alone"""
+        if self.is_running():
+            return self.get_progress()
+
+        self.progress = {
+            "state": "running",
+            "source": source,
+            "started_at": datetime.utcnow().isoformat(),
+            "finished_at": None,
+            "budget": {"max_calls": max_calls, "rate_per_minute": rate_per_minute},
+            "history_scanned": 0,
+            "candidates": 0,
+            "already_cached": 0,
+            "warmed": 0,
+            "failed": 0,
+            "upstream_calls": 0,
+            "budget_exhausted": False,
+            "current": None
+        }
+        self._task = asyncio.create_task(self._run(source, top_n, max_calls, rate_per_minute))
+        return self.get_progress()
+
+    def cancel(self) -> bool:
+        if not self.is_running():
+            return False
+        self._task.cancel()
+        return True
+
+    def get_progress(self) -> Dict[str, Any]:
+        progress = dict(self.progress)
+        candidates = progress.get("candidates") or 0
+        done = sum(progress.get(name, 0) for name in ("already_cached", "warmed", "failed"))
+        progress["percent_complete"] = round(done / candidates * 100, 1) if candidates else (
+            100.0 if progress["state"] == "completed" else 0.0
+        )
+        return progress
+
+    async def wait(self):
+        """Wait for the current run to finish (used by tests and shutdown)"""
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+# Global cache warmer instance
+cache_warmer = CacheWarmer()
@@ -0,0 +1,165 @@
+import asyncio
+import importlib.util
+import os
+from typing import Any, Dict
+
+import httpcore
+import httpx
+
+# Upstream API hosts used by the AI providers
+PROVIDER_BASE_URLS = {
+    "together": os.getenv("TOGETHER_BASE_URL", "https://api.together.xyz"),
+    "openai": os.getenv("OPENAI_BASE_URL", "https://api.openai.com")
+}
+
+# Per-host connection pool limits, overridable with e.g. TOGETHER_MAX_CONNECTIONS
+DEFAULT_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "120"))
+PRECONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_PRECONNECT_TIMEOUT", "5"))
+
+
+class _CountingTransport(httpx.AsyncBaseTransport):
+    """Pooled transport that counts requests, including those waiting for a pooled connection"""
+
+    def __init__(self, **kwargs):
+        self.pool = httpx.AsyncHTTPTransport(**kwargs)
+        self.total_requests = 0
+        self.awaiting_response = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.total_requests += 1
+        self.awaiting_response += 1
+        try:
+            return await self.pool.handle_async_request(request)
+        finally:
+            self.awaiting_response -= 1
+
+    async def aclose(self):
+        await self.pool.aclose()
+
+
+class HTTPTransportService:
+    """Process-wide pooled HTTP transport shared by all AI provider clients"""
+
+    def __init__(self):
+        # HTTP/2 needs the optional h2 package; fall back to HTTP/1.1 keep-alive without it
+        self.http2_enabled = (
+            os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+            and importlib.util.find_spec("h2") is not None
+        )
+        self.timeout = httpx.Timeout(
+            float(os.getenv("HTTP_REQUEST_TIMEOUT", "600")),
+            connect=float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+        )
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._limits: Dict[str, httpx.Limits] = {}
+        self._transports: Dict[str, _CountingTransport] = {}
+        self._preconnect_status: Dict[str, str] = {}
+
+    def _get_limits(self, provider: str) -> httpx.Limits:
+        """Build connection pool limits for a provider host"""
+        prefix = provider.upper()
+        return httpx.Limits(
+            max_connections=int(os.getenv(f"{prefix}_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)),
+            max_keepalive_connections=int(
+                os.getenv(f"{prefix}_MAX_KEEPALIVE_CONNECTIONS", DEFAULT_MAX_KEEPALIVE_CONNECTIONS)
+            ),
+            keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS
+        )
+
+    def get_client(self, provider: str) -> httpx.AsyncClient:
+        """Get the shared keep-alive client for a provider, creating it on first use"""
+        client = self._clients.get(provider)
+        if client is None or client.is_closed:
+            limits = self._get_limits(provider)
+
+            transport = _CountingTransport(http2=self.http2_enabled, limits=limits)
+            client = httpx.AsyncClient(
+                transport=transport,
+                timeout=self.timeout,
+                follow_redirects=True
+            )
+            self._clients[provider] = client
+            self._limits[provider] = limits
+            self._transports[provider] = transport
+        return client
+
+    async def preconnect(self):
+        """Open a warm connection to every provider host so the first request skips the TLS handshake"""
+
+        async def warm(provider: str, base_url: str):
+            try:
+                client = self.get_client(provider)
+                await client.head(base_url, timeout=PRECONNECT_TIMEOUT_SECONDS)
+                self._preconnect_status[provider] = "connected"
+            except Exception as e:
+                print(f"Preconnect to {provider} failed: {e}")
+                self._preconnect_status[provider] = f"failed: {e}"
+
+        await asyncio.gather(*(
+            warm(provider, base_url) for provider, base_url in PROVIDER_BASE_URLS.items()
+        ))
+
+    async def close(self):
+        """Close all pooled connections"""
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+    def _get_connection_stats(self, transport: _CountingTransport) -> Dict[str, Any]:
+        """Open, idle and HTTP/2 connections in the pool, or {} if it cannot be inspected
+
+        httpx does not expose the httpcore pool behind its transport, so it is
+        looked up defensively; from there only httpcore's public connection
+        API is used (AsyncConnectionPool.connections, is_idle() and info()).
+        """
+        pool = getattr(transport.pool, "_pool", None)
+        if not isinstance(pool, httpcore.AsyncConnectionPool):
+            return {}
+        try:
+            connections = pool.connections
+            idle = sum(1 for connection in connections if connection.is_idle())
+            http2 = sum(1 for connection in connections if "HTTP/2" in connection.info())
+        except Exception:
+            return {}
+        return {
+            "open_connections": len(connections),
+            "active_connections": len(connections) - idle,
+            "idle_connections": idle,
+            "http2_connections": http2
+        }
+
+    def _get_pool_stats(self, provider: str, client: httpx.AsyncClient) -> Dict[str, Any]:
+        """Get connection pool utilisation for one provider client"""
+        limits = self._limits[provider]
+        transport = self._transports[provider]
+        connection_stats = self._get_connection_stats(transport)
+        active = connection_stats.get("active_connections")
+
+        return {
+            "base_url": PROVIDER_BASE_URLS.get(provider),
+            "max_connections": limits.max_connections,
+            "max_keepalive_connections": limits.max_keepalive_connections,
+            **(connection_stats or {"connections": "unavailable"}),
+            "awaiting_response": transport.awaiting_response,
+            "utilisation": round(active / limits.max_connections * 100, 2)
+                if active is not None and limits.max_connections else None,
+            "total_requests": transport.total_requests,
+            "preconnect": self._preconnect_status.get(provider, "not attempted")
+        }
+
+    def get_transport_stats(self) -> Dict[str, Any]:
+        """Get pool utilisation for every provider host"""
+        return {
+            "http2_enabled": self.http2_enabled,
+            "keepalive_expiry_seconds": KEEPALIVE_EXPIRY_SECONDS,
+            "pools": {
+                provider: self._get_pool_stats(provider, client)
+                for provider, client in self._clients.items()
+                if not client.is_closed
+            }
+        }
+
+# Global HTTP transport instance
+http_transport = HTTPTransportService()
@@ -0,0 +1,197 @@
+import asyncio
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from services.uploads import IngestedUpload
+
+IMAGE_PREPROCESS_ENABLED = os.getenv("IMAGE_PREPROCESS_ENABLED", "true").lower() == "true"
+# Decoding and resizing are CPU-bound; a dedicated pool keeps them from
+# starving the default executor used by the cache and database threads
+IMAGE_PREPROCESS_WORKERS = int(os.getenv("IMAGE_PREPROCESS_WORKERS", "4"))
+
+# Longest side (pixels) and JPEG quality of the image each vision task is sent.
+# Detection and segmentation answer in percentages of the image, so their
+# results do not depend on the resolution sent.
+IMAGE_PREPROCESS_CONFIG = {
+    "classify": {
+        "max_side": int(os.getenv("IMAGE_PREPROCESS_CLASSIFY_MAX_SIDE", "768")),
+        "quality": int(os.getenv("IMAGE_PREPROCESS_CLASSIFY_QUALITY", "85"))
+    },
+    "detect": {
+        "max_side": int(os.getenv("IMAGE_PREPROCESS_DETECT_MAX_SIDE", "1536")),
+        "quality": int(os.getenv("IMAGE_PREPROCESS_DETECT_QUALITY", "90"))
+    },
+    "segment": {
+        "max_side": int(os.getenv("IMAGE_PREPROCESS_SEGMENT_MAX_SIDE", "1024")),
+        "quality": int(os.getenv("IMAGE_PREPROCESS_SEGMENT_QUALITY", "90"))
+    }
+}
+
+_EXIF_ORIENTATION = 0x0112
+# Orientations 5-8 rotate by 90 degrees, swapping width and height
+_TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+def upright_size(source: BinaryIO) -> Tuple[int, int]:
+    """Displayed (width, height) of an encoded image, read from its header"""
+    with Image.open(source) as image:
+        width, height = image.size
+        if image.getexif().get(_EXIF_ORIENTATION, 1) in _TRANSPOSED_ORIENTATIONS:
+            return height, width
+        return width, height
+
+
+def preprocess_image(source: BinaryIO, max_side: int, quality: int, source_size: int) -> Optional[bytes]:
+    """Upright, downscaled JPEG of an encoded image; None if the original is already as small
+
+    EXIF orientation is applied to the pixels, since the tag is dropped on
+    re-encoding. An image that needs neither rotating nor resizing is only
+    re-encoded when that makes it smaller.
+    """
+    with Image.open(source) as image:
+        needs_transpose = image.getexif().get(_EXIF_ORIENTATION, 1) != 1
+        needs_resize = max(image.size) > max_side
+        if not needs_transpose and not needs_resize and image.format == "JPEG":
+            return None
+
+        # JPEG can decode straight to a reduced scale, which skips most of the work on large photos
+        image.draft("RGB", (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+        if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+            # JPEG has no alpha; flatten onto white as the vision models would see it
+            rgba = image.convert("RGBA")
+            image = Image.new("RGB", rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel("A"))
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=quality, optimize=True)
+
+    if not needs_transpose and not needs_resize and output.tell() >= source_size:
+        return None
+    return output.getvalue()
+
+
+class ImagePreprocessor:
+    """Shrinks vision uploads to the resolution each task needs before they go upstream"""
+
+    def __init__(self):
+        self.enabled = IMAGE_PREPROCESS_ENABLED
+        self._executor = ThreadPoolExecutor(max_workers=IMAGE_PREPROCESS_WORKERS, thread_name_prefix="preprocess")
+        self._lock = threading.Lock()
+        self.stats = {
+            service_type: {
+                "images": 0,
+                "resized": 0,
+                "unchanged": 0,
+                "errors": 0,
+                "bytes_in": 0,
+                "bytes_out": 0,
+                "preprocess_ms": 0.0,
+                # Upstream latency of calls sent the preprocessed image versus the original
+                "upstream": {
+                    "preprocessed": {"calls": 0, "total_ms": 0.0},
+                    "original": {"calls": 0, "total_ms": 0.0}
+                }
+            }
+            for service_type in IMAGE_PREPROCESS_CONFIG
+        }
+
+    def supports(self, service_type: str) -> bool:
+        return self.enabled and service_type in IMAGE_PREPROCESS_CONFIG
+
+    async def execute(self, func: Callable[..., Any], *args) -> Any:
+        """Run CPU-bound image work on the preprocessing pool"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def prepare(self, service_type: str, upload: IngestedUpload) -> IngestedUpload:
+        """The upload to send upstream: a preprocessed copy, or the original if that is not smaller
+
+        Images Pillow cannot decode are passed through untouched and left for
+        the provider to reject.
+        """
+        if not self.supports(service_type):
+            return upload
+
+        config = IMAGE_PREPROCESS_CONFIG[service_type]
+        start_time = time.time()
+        try:
+            processed = await self.execute(preprocess_image, upload.open(), config["max_side"], config["quality"], upload.size)
+        except Exception:
+            processed = None
+            error = True
+        else:
+            error = False
+        elapsed_ms = (time.time() - start_time) * 1000
+
+        prepared = upload if processed is None else IngestedUpload.from_bytes(processed, "image/jpeg", upload.digest)
+        with self._lock:
+            stats = self.stats[service_type]
+            stats["images"] += 1
+            stats["errors" if error else "unchanged" if prepared is upload else "resized"] += 1
+            stats["bytes_in"] += upload.size
+            stats["bytes_out"] += prepared.size
+            stats["preprocess_ms"] += elapsed_ms
+        return prepared
+
+    def record_upstream(self, service_type: str, preprocessed: bool, processing_time: float):
+        if service_type not in self.stats:
+            return
+        with self._lock:
+            latency = self.stats[service_type]["upstream"]["preprocessed" if preprocessed else "original"]
+            latency["calls"] += 1
+            latency["total_ms"] += processing_time
+
+    async def run(
+        self,
+        service_type: str,
+        upload: IngestedUpload,
+        call: Callable[[str], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Preprocess the upload, then make the upstream call with its data URL"""
+        prepared = await self.prepare(service_type, upload)
+        result = await call(prepared.data_url())
+        self.record_upstream(service_type, prepared is not upload, result.get("processing_time", 0))
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Bytes saved and upstream latency with and without preprocessing, per service"""
+        with self._lock:
+            services = {}
+            for service_type, stats in self.stats.items():
+                upstream = {}
+                for variant, latency in stats["upstream"].items():
+                    calls = latency["calls"]
+                    upstream[variant] = {
+                        "calls": calls,
+                        "avg_ms": round(latency["total_ms"] / calls, 2) if calls > 0 else None
+                    }
+                preprocessed_ms = upstream["preprocessed"]["avg_ms"]
+                original_ms = upstream["original"]["avg_ms"]
+                images = stats["images"]
+                services[service_type] = {
+                    **{name: stats[name] for name in ("images", "resized", "unchanged", "errors", "bytes_in", "bytes_out")},
+                    "bytes_saved": stats["bytes_in"] - stats["bytes_out"],
+                    "size_ratio": round(stats["bytes_out"] / stats["bytes_in"], 4) if stats["bytes_in"] > 0 else None,
+                    "avg_preprocess_ms": round(stats["preprocess_ms"] / images, 2) if images > 0 else None,
+                    "upstream": upstream,
+                    # Negative when calls with the preprocessed image come back faster
+                    "upstream_latency_delta_ms": (
+                        round(preprocessed_ms - original_ms, 2)
+                        if preprocessed_ms is not None and original_ms is not None else None
+                    ),
+                    **IMAGE_PREPROCESS_CONFIG[service_type]
+                }
+            return {"enabled": self.enabled, "workers": IMAGE_PREPROCESS_WORKERS, "services": services}
+
+# Global image preprocessor instance
+image_preprocessor = ImagePreprocessor()
@@ -0,0 +1,163 @@
+import asyncio
+import contextlib
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Set
+
+import redis.asyncio as aioredis
+
+# Fan-out across API workers goes through Redis pub/sub; "memory" keeps events in-process
+JOB_EVENTS_BACKEND = os.getenv("JOB_EVENTS_BACKEND", os.getenv("CACHE_BACKEND", "redis")).lower()
+JOB_EVENTS_CHANNEL = os.getenv("JOB_EVENTS_CHANNEL", "job_events")
+JOB_EVENTS_RECONNECT_SECONDS = float(os.getenv("JOB_EVENTS_RECONNECT_SECONDS", "5"))
+# Events buffered per connected client; a client that falls further behind loses the oldest
+JOB_EVENTS_SUBSCRIBER_BUFFER = int(os.getenv("JOB_EVENTS_SUBSCRIBER_BUFFER", "100"))
+# Events waiting to be published to Redis; while Redis is slow the oldest are dropped
+JOB_EVENTS_OUTBOX_SIZE = int(os.getenv("JOB_EVENTS_OUTBOX_SIZE", "1000"))
+# Comment frames sent on idle streams so proxies do not time them out
+JOB_EVENTS_HEARTBEAT_SECONDS = float(os.getenv("JOB_EVENTS_HEARTBEAT_SECONDS", "15"))
+
+
+def format_sse(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Format a server-sent event frame"""
+    frame = f"event: {event}\n" if event else ""
+    return frame + f"data: {json.dumps(data, default=str)}\n\n"
+
+
+class _Subscriber:
+    def __init__(self, predicate: Optional[Callable[[Dict[str, Any]], bool]]):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=JOB_EVENTS_SUBSCRIBER_BUFFER)
+        self.predicate = predicate
+
+
+class JobEventBus:
+    """Publishes job and batch lifecycle events to connected clients on every worker
+
+    Events are delivered to this process's subscribers straight away and
+    published to Redis for the other workers, which skip events carrying
+    their own origin. Without Redis, delivery stays in-process.
+    """
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self.redis_url = redis_url or os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        self.origin = uuid.uuid4().hex
+        self._subscribers: Set[_Subscriber] = set()
+        self._redis: Optional[aioredis.Redis] = None
+        self._outbox: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self.stats = {
+            "published": 0, "delivered": 0, "dropped": 0, "received_remote": 0, "redis_errors": 0,
+            "outbox_dropped": 0
+        }
+
+    def start(self):
+        if self._tasks or JOB_EVENTS_BACKEND != "redis":
+            return
+        self._outbox = asyncio.Queue(maxsize=JOB_EVENTS_OUTBOX_SIZE)
+        self._tasks = [asyncio.create_task(self._listen_loop()), asyncio.create_task(self._publish_loop())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._outbox = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    def publish(self, event_type: str, data: Dict[str, Any]):
+        """Send an event to every subscriber; never blocks the caller"""
+        event = {"type": event_type, "data": data, "origin": self.origin, "timestamp": datetime.utcnow().isoformat()}
+        self.stats["published"] += 1
+        self._deliver(event)
+        if self._redis is not None and self._outbox is not None:
+            if self._outbox.full():
+                self._outbox.get_nowait()
+                self.stats["outbox_dropped"] += 1
+            self._outbox.put_nowait(event)
+
+    def _deliver(self, event: Dict[str, Any]):
+        for subscriber in list(self._subscribers):
+            if subscriber.predicate is not None and not subscriber.predicate(event):
+                continue
+            if subscriber.queue.full():
+                subscriber.queue.get_nowait()
+                self.stats["dropped"] += 1
+            subscriber.queue.put_nowait(event)
+            self.stats["delivered"] += 1
+
+    @contextlib.contextmanager
+    def subscribe(self, predicate: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Iterator[asyncio.Queue]:
+        """Queue receiving the events that match predicate, for as long as the block runs"""
+        subscriber = _Subscriber(predicate)
+        self._subscribers.add(subscriber)
+        try:
+            yield subscriber.queue
+        finally:
+            self._subscribers.discard(subscriber)
+
+    async def stream(
+        self,
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        heartbeat_seconds: float = JOB_EVENTS_HEARTBEAT_SECONDS
+    ) -> AsyncIterator[str]:
+        """Server-sent event frames of matching events; ends when the client disconnects"""
+        with self.subscribe(predicate) as queue:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event["data"], event["type"])
+
+    async def _publish_loop(self):
+        while True:
+            event = await self._outbox.get()
+            client = self._redis
+            if client is None:
+                continue
+            try:
+                await client.publish(JOB_EVENTS_CHANNEL, json.dumps(event, default=str))
+            except Exception:
+                # The listener notices the broken connection and reconnects
+                self.stats["redis_errors"] += 1
+
+    async def _listen_loop(self):
+        """Relay other workers' events from Redis, reconnecting whenever the connection drops"""
+        while True:
+            client = aioredis.from_url(self.redis_url)
+            try:
+                pubsub = client.pubsub()
+                await pubsub.subscribe(JOB_EVENTS_CHANNEL)
+                self._redis = client
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    event = json.loads(message["data"])
+                    if event.get("origin") == self.origin:
+                        continue
+                    self.stats["received_remote"] += 1
+                    self._deliver(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.stats["redis_errors"] += 1
+            finally:
+                self._redis = None
+                await client.aclose()
+            await asyncio.sleep(JOB_EVENTS_RECONNECT_SECONDS)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "backend": "redis" if self._redis is not None else "memory",
+            "subscribers": len(self._subscribers)
+        }
+
+# Global job event bus instance
+job_events = JobEventBus()
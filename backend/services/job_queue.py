@@ -0,0 +1,83 @@
+import asyncio
+import os
+import traceback
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Async-mode jobs run on this many workers; more are queued, up to the max size
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_MAX_SIZE = int(os.getenv("JOB_QUEUE_MAX_SIZE", "1000"))
+# Longest a GET /api/v1/jobs/{job_id}?wait= request is held open
+JOB_LONG_POLL_MAX_SECONDS = float(os.getenv("JOB_LONG_POLL_MAX_SECONDS", "30"))
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    """Bounded queue of accepted AI jobs, drained by a fixed pool of worker tasks"""
+
+    def __init__(self, workers: int = JOB_WORKERS, max_size: int = JOB_QUEUE_MAX_SIZE):
+        self.worker_count = workers
+        self.max_size = max_size
+        # Created on start so it belongs to the running event loop
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self.running = 0
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0}
+
+    def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    def submit(self, run: Callable[[], Awaitable[Any]]):
+        """Queue a job; raises JobQueueFull instead of waiting when the queue is at capacity"""
+        # Started lazily as well, for apps run without the startup event
+        self.start()
+        try:
+            self._queue.put_nowait(run)
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise JobQueueFull(f"Job queue is full ({self.max_size} jobs waiting)")
+        self.stats["submitted"] += 1
+
+    async def _worker(self):
+        while True:
+            run = await self._queue.get()
+            self.running += 1
+            try:
+                await run()
+                self.stats["completed"] += 1
+            except Exception:
+                self.stats["failed"] += 1
+                traceback.print_exc()
+            finally:
+                self.running -= 1
+                self._queue.task_done()
+
+    async def join(self):
+        """Wait until every queued job has finished (used by tests)"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def stop(self):
+        """Cancel the workers; jobs still queued are dropped and stay pending"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "workers": self.worker_count,
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_size": self.max_size
+        }
+
+# Global job queue instance
+job_queue = JobQueue()
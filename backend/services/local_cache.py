@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class LocalLRUCache:
+    """Bounded in-process LRU cache, sized by bytes, with per-entry TTL"""
+
+    def __init__(self, max_bytes: int, max_ttl_seconds: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.max_ttl_seconds = max_ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tags: Dict[str, set] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0,
+            "expirations": 0
+        }
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a live entry and mark it most recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+            value, size, expires_at, _ = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Get a live entry without counting the lookup or changing its recency"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[2] is not None and entry[2] <= time.monotonic()):
+                return None
+            return entry[0]
+
+    def set(self, key: str, value: Any, size: int, ttl_seconds: Optional[float] = None, tags: Iterable[str] = ()) -> bool:
+        """Store an entry of the given size in bytes, evicting least recently used entries to fit"""
+        if size > self.max_bytes:
+            return False
+
+        if self.max_ttl_seconds is not None:
+            ttl_seconds = min(ttl_seconds, self.max_ttl_seconds) if ttl_seconds is not None else self.max_ttl_seconds
+        if ttl_seconds is not None and ttl_seconds <= 0:
+            return False
+        expires_at = time.monotonic() + ttl_seconds if ttl_seconds is not None else None
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            while self._entries and self._bytes + size > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.stats["evictions"] += 1
+
+            tags = tuple(tags)
+            self._entries[key] = (value, size, expires_at, tags)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            self.stats["sets"] += 1
+            return True
+
+    def delete(self, key: str) -> bool:
+        """Remove an entry if present"""
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            return True
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        """Remove every listed entry that is present"""
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+                    removed += 1
+            return removed
+
+    def delete_tag(self, tag: str) -> int:
+        """Remove every entry carrying a tag"""
+        with self._lock:
+            keys = list(self._tags.get(tag, ()))
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def keys(self) -> List[str]:
+        """Snapshot of the stored keys, least recently used first"""
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self) -> int:
+        """Remove every entry"""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+            return count
+
+    def _remove(self, key: str):
+        _, size, _, tags = self._entries.pop(key)
+        self._bytes -= size
+        for tag in tags:
+            tagged = self._tags.get(tag)
+            if tagged is not None:
+                tagged.discard(key)
+                if not tagged:
+                    del self._tags[tag]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get tier statistics"""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": round(self.stats["hits"] / lookups * 100, 2) if lookups > 0 else 0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "utilisation": round(self._bytes / self.max_bytes * 100, 2) if self.max_bytes else 0
+            }
+
+    def reset_stats(self):
+        """Reset tier counters"""
+        with self._lock:
+            for name in self.stats:
+                self.stats[name] = 0
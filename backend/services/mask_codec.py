@@ -0,0 +1,207 @@
+import base64
+import json
+import os
+import re
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+# How /api/v1/segment returns masks: the provider's polygon strings as-is,
+# inline run-length encoding, or RLE in a binary payload after a JSON header
+MASK_FORMATS = ("polygon", "rle", "binary")
+# Longest side of the grid polygons are rasterised onto for the rle and binary formats
+SEGMENT_MASK_MAX_SIDE = int(os.getenv("SEGMENT_MASK_MAX_SIDE", "1024"))
+
+BINARY_MASK_MEDIA_TYPE = "application/octet-stream"
+# Binary payload: [4-byte big-endian header length][JSON header][varint run counts of every mask]
+_HEADER_LENGTH = struct.Struct(">I")
+
+# Set on compacted segments whose array mask arrived as JSON text
+_MASK_TEXT = "mask_text"
+
+_POLYGON = re.compile(r"^\s*polygon\((.*)\)\s*$", re.IGNORECASE)
+_POINT = re.compile(r"(-?[\d.]+)%\s+(-?[\d.]+)%")
+
+# 7-bit groups of a uint32 run length, least significant first
+_VARINT_SHIFTS = np.arange(5, dtype=np.uint64) * 7
+
+
+def encode_rle(mask: np.ndarray) -> np.ndarray:
+    """Row-major run lengths of a 2-D boolean mask, alternating background and foreground, background first"""
+    flat = np.asarray(mask, dtype=bool).ravel()
+    if flat.size == 0:
+        return np.zeros(0, dtype=np.uint32)
+    boundaries = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    runs = np.diff(np.concatenate(([0], boundaries, [flat.size])))
+    if flat[0]:
+        runs = np.concatenate(([0], runs))
+    return runs.astype(np.uint32)
+
+
+def decode_rle(runs: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+    """Boolean mask of the given (height, width) from encode_rle run lengths"""
+    values = np.arange(len(runs)) % 2 == 1
+    return np.repeat(values, runs).reshape(size)
+
+
+def pack_runs(runs: np.ndarray) -> bytes:
+    """LEB128 varint bytes of the run lengths; most runs fit in one or two bytes"""
+    runs = np.asarray(runs, dtype=np.uint64)
+    groups = ((runs[:, None] >> _VARINT_SHIFTS) & 0x7F).astype(np.uint8)
+    lengths = 1 + (runs[:, None] >= (np.uint64(1) << _VARINT_SHIFTS[1:])).sum(axis=1)
+    position = np.arange(len(_VARINT_SHIFTS))
+    groups[position < (lengths - 1)[:, None]] |= 0x80
+    return groups[position < lengths[:, None]].tobytes()
+
+
+def unpack_runs(data: bytes) -> np.ndarray:
+    encoded = np.frombuffer(data, dtype=np.uint8)
+    if encoded.size == 0:
+        return np.zeros(0, dtype=np.uint32)
+    ends = np.flatnonzero(encoded < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    position = np.arange(encoded.size) - np.repeat(starts, ends - starts + 1)
+    values = (encoded & 0x7F).astype(np.uint64) << (position.astype(np.uint64) * 7)
+    return np.add.reduceat(values, starts).astype(np.uint32)
+
+
+def mask_to_rle(mask: np.ndarray) -> Dict[str, Any]:
+    """Inline JSON form of a mask: its size and base64 varint run lengths"""
+    height, width = mask.shape
+    return {"size": [height, width], "counts": base64.b64encode(pack_runs(encode_rle(mask))).decode("ascii")}
+
+
+def rle_to_mask(rle: Dict[str, Any]) -> np.ndarray:
+    return decode_rle(unpack_runs(base64.b64decode(rle["counts"])), tuple(rle["size"]))
+
+
+def _array_mask(mask: Any) -> Optional[np.ndarray]:
+    """A mask given as a 2-D 0/1 array, or a JSON string of one"""
+    if isinstance(mask, str):
+        if not mask.lstrip().startswith("["):
+            return None
+        try:
+            mask = json.loads(mask)
+        except ValueError:
+            return None
+    if not isinstance(mask, list):
+        return None
+    array = np.asarray(mask)
+    if array.ndim != 2 or array.dtype == object:
+        return None
+    return array.astype(bool)
+
+
+def polygon_to_mask(polygon: str, size: Tuple[int, int]) -> Optional[np.ndarray]:
+    """Rasterise a CSS-style "polygon(x% y%, ...)" mask onto a (height, width) grid"""
+    match = _POLYGON.match(polygon)
+    if not match:
+        return None
+    height, width = size
+    points = [(float(x) / 100 * width, float(y) / 100 * height) for x, y in _POINT.findall(match.group(1))]
+    if len(points) < 3:
+        return None
+    canvas = Image.new("1", (width, height))
+    ImageDraw.Draw(canvas).polygon(points, fill=1)
+    return np.asarray(canvas, dtype=bool)
+
+
+def mask_grid(width: int, height: int) -> Tuple[int, int]:
+    """(height, width) of the grid masks are rasterised onto for an image of the given size"""
+    scale = min(1.0, SEGMENT_MASK_MAX_SIDE / max(width, height))
+    return max(1, round(height * scale)), max(1, round(width * scale))
+
+
+def compact_segments(segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Replace array masks with RLE before a result is cached or stored
+
+    Polygon and descriptive masks are already short and stay as they are.
+    Masks the provider sent as JSON text are marked, so render_segments can
+    give them back in the same form.
+    """
+    compacted = []
+    for segment in segments:
+        mask = segment.get("mask")
+        array = _array_mask(mask)
+        if array is None:
+            compacted.append(segment)
+            continue
+        segment = {**{k: v for k, v in segment.items() if k != "mask"}, "rle": mask_to_rle(array)}
+        if isinstance(mask, str):
+            segment[_MASK_TEXT] = True
+        compacted.append(segment)
+    return compacted
+
+
+def _without(segment: Dict[str, Any], *keys: str) -> Dict[str, Any]:
+    return {k: v for k, v in segment.items() if k not in keys}
+
+
+def render_segments(segments: List[Dict[str, Any]], mask_format: str, grid: Optional[Tuple[int, int]] = None) -> List[Dict[str, Any]]:
+    """Segments shaped for the response format
+
+    For "polygon", the default, every segment has its mask as the provider
+    returned it: compacted array masks are expanded back into mask. For
+    "rle" and "binary", array masks stay as rle, polygons are rasterised
+    onto grid, and masks that are neither (free-text descriptions) are
+    kept as mask.
+    """
+    rendered = []
+    for segment in segments:
+        if mask_format == "polygon":
+            if "rle" in segment:
+                array = rle_to_mask(segment["rle"]).astype(np.uint8).tolist()
+                mask = json.dumps(array) if segment.get(_MASK_TEXT) else array
+                segment = {**_without(segment, "rle", _MASK_TEXT), "mask": mask}
+            rendered.append(segment)
+            continue
+
+        mask = segment.get("mask")
+        if "rle" not in segment and isinstance(mask, str) and grid is not None:
+            array = polygon_to_mask(mask, grid)
+            if array is not None:
+                segment = {**_without(segment, "mask"), "rle": mask_to_rle(array)}
+        rendered.append(_without(segment, _MASK_TEXT))
+    return rendered
+
+
+def pack_binary(header: Dict[str, Any], segments: List[Dict[str, Any]]) -> bytes:
+    """Binary segmentation payload: a JSON header describing each mask, then the raw run bytes
+
+    Each RLE segment in the header carries size, offset and length into the
+    run bytes instead of the base64 counts.
+    """
+    described, blobs, offset = [], [], 0
+    for segment in segments:
+        rle = segment.get("rle")
+        if rle is None:
+            described.append(segment)
+            continue
+        runs = base64.b64decode(rle["counts"])
+        described.append({
+            **{k: v for k, v in segment.items() if k != "rle"},
+            "rle": {"size": rle["size"], "offset": offset, "length": len(runs)}
+        })
+        blobs.append(runs)
+        offset += len(runs)
+
+    encoded_header = json.dumps({**header, "segments": described}, separators=(",", ":")).encode()
+    return b"".join([_HEADER_LENGTH.pack(len(encoded_header)), encoded_header, *blobs])
+
+
+def unpack_binary(payload: bytes) -> Tuple[Dict[str, Any], List[Optional[np.ndarray]]]:
+    """Header and decoded masks of a pack_binary payload; None for segments without RLE"""
+    (header_length,) = _HEADER_LENGTH.unpack_from(payload)
+    header = json.loads(payload[_HEADER_LENGTH.size:_HEADER_LENGTH.size + header_length])
+    body = memoryview(payload)[_HEADER_LENGTH.size + header_length:]
+    masks = []
+    for segment in header["segments"]:
+        rle = segment.get("rle")
+        if rle is None:
+            masks.append(None)
+            continue
+        runs = unpack_runs(body[rle["offset"]:rle["offset"] + rle["length"]])
+        masks.append(decode_rle(runs, tuple(rle["size"])))
+    return header, masks
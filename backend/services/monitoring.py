@@ -6,6 +6,8 @@ from datetime import datetime
 import threading
 import os
 
+from services.http_transport import http_transport
+
 class PerformanceMonitor:
     """Performance monitoring service for tracking system and request metrics"""
     
@@ -114,7 +116,8 @@ class PerformanceMonitor:
                         self.metrics["error_count"] / self.metrics["request_count"] * 100
                         if self.metrics["request_count"] > 0 else 0
                     )
-                }
+                },
+                "transport": http_transport.get_transport_stats()
             }
         except Exception as e:
             return {
@@ -0,0 +1,161 @@
+import io
+import os
+import time
+from typing import Any, BinaryIO, Dict, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from services.image_preprocessing import image_preprocessor
+from services.similarity_index import RingIndex, SimilarityCache, estimate_entry_bytes, namespace_id
+
+# Near-duplicate tier: recompressed, resized or EXIF-stripped re-uploads reuse a cached result
+PERCEPTUAL_CACHE_ENABLED = os.getenv("PERCEPTUAL_CACHE_ENABLED", "true").lower() == "true"
+PERCEPTUAL_CACHE_MAX_ENTRIES = int(os.getenv("PERCEPTUAL_CACHE_MAX_ENTRIES", "10000"))
+# Budget for the cached results held per service, estimated as serialised JSON; 0 disables it
+PERCEPTUAL_CACHE_MAX_BYTES = int(os.getenv("PERCEPTUAL_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Largest Hamming distance (out of 64 bits) at which two images count as the same
+PERCEPTUAL_CACHE_MAX_DISTANCE = int(os.getenv("PERCEPTUAL_CACHE_MAX_DISTANCE", "4"))
+
+PERCEPTUAL_CACHE_SERVICES = ("classify", "detect", "segment")
+
+PHASH_SIZE = 32
+PHASH_LOW_FREQUENCIES = 8
+DHASH_SIZE = 8
+
+# Set-bit count of every byte value, for vectorised popcount
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """Orthonormal DCT-II basis; M @ x @ M.T is the 2-D transform of x"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+_DCT = _dct_matrix(PHASH_SIZE)
+
+
+def _pack_bits(bits: np.ndarray) -> int:
+    return int(np.packbits(bits.astype(np.uint8).ravel()).view(">u8")[0])
+
+
+def image_fingerprint(image_data: Union[bytes, BinaryIO]) -> Tuple[int, int]:
+    """Return the (pHash, dHash) of an encoded image, given as bytes or a file, as 64-bit integers"""
+    source = io.BytesIO(image_data) if isinstance(image_data, (bytes, bytearray)) else image_data
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image).convert("L")
+
+        # pHash: signs of the low-frequency DCT coefficients against their median
+        small = np.asarray(image.resize((PHASH_SIZE, PHASH_SIZE), Image.LANCZOS), dtype=np.float64)
+        low = (_DCT @ small @ _DCT.T)[:PHASH_LOW_FREQUENCIES, :PHASH_LOW_FREQUENCIES]
+        phash = _pack_bits(low > np.median(low.ravel()[1:]))
+
+        # dHash: horizontal brightness gradient of a 9x8 thumbnail
+        small = np.asarray(image.resize((DHASH_SIZE + 1, DHASH_SIZE), Image.LANCZOS), dtype=np.int16)
+        dhash = _pack_bits(small[:, 1:] > small[:, :-1])
+
+    return phash, dhash
+
+
+def hamming_distances(hashes: np.ndarray, value: int) -> np.ndarray:
+    """Hamming distance from value to every 64-bit hash in the array"""
+    xored = np.bitwise_xor(hashes, np.uint64(value))
+    return _POPCOUNT[xored.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+class _HashIndex(RingIndex):
+    """Fixed-capacity arrays of image hashes scanned with vectorised XOR/popcount"""
+
+    def __init__(self, capacity: int, max_bytes: int = 0):
+        super().__init__(capacity, max_bytes)
+        self.phashes = np.zeros(capacity, dtype=np.uint64)
+        self.dhashes = np.zeros(capacity, dtype=np.uint64)
+
+    def add(self, fingerprint: Tuple[int, int], namespace: int, entry: dict, expires_at: float, entry_bytes: int) -> bool:
+        slot = self.add_entry(namespace, entry, expires_at, entry_bytes)
+        if slot is None:
+            return False
+        self.phashes[slot], self.dhashes[slot] = fingerprint
+        return True
+
+    def search(self, fingerprint: Tuple[int, int], namespace: int, now: float, max_distance: int):
+        if self.size == 0:
+            return None, None
+        phash, dhash = fingerprint
+        # Both hashes must agree, which keeps unrelated flat or low-detail images apart
+        distances = np.maximum(
+            hamming_distances(self.phashes[:self.size], phash),
+            hamming_distances(self.dhashes[:self.size], dhash)
+        ).astype(np.int16)
+        distances[~self.valid(namespace, now)] = 64 + 1
+        best = int(np.argmin(distances))
+        if distances[best] > max_distance:
+            return None, None
+        return self.entries[best], int(distances[best])
+
+
+class PerceptualHashCache(SimilarityCache):
+    """Near-duplicate image cache tier for the classify, detect and segment services"""
+
+    def __init__(self):
+        super().__init__(PERCEPTUAL_CACHE_ENABLED, PERCEPTUAL_CACHE_SERVICES)
+        self.max_distance = PERCEPTUAL_CACHE_MAX_DISTANCE
+        self.hash_errors = 0
+
+    async def fingerprint(self, image_data: Union[bytes, BinaryIO]) -> Optional[Tuple[int, int]]:
+        """Hash an upload on the preprocessing pool; None if Pillow cannot decode it"""
+        try:
+            return await image_preprocessor.execute(image_fingerprint, image_data)
+        except Exception:
+            self.hash_errors += 1
+            return None
+
+    def get(self, service_type: str, fingerprint: Tuple[int, int], namespace: str = "") -> Optional[Dict[str, Any]]:
+        """Return the cached result of the closest image within the configured distance"""
+        if not self.supports(service_type) or fingerprint is None:
+            return None
+
+        with self._lock:
+            self.stats[service_type]["lookups"] += 1
+            index = self._indexes.get(service_type)
+            if index is None:
+                return None
+            entry, distance = index.search(fingerprint, namespace_id(namespace), time.time(), self.max_distance)
+            if entry is None:
+                return None
+            self._record_hit(service_type, entry)
+
+        return {**entry, "distance": distance}
+
+    def add(self, service_type: str, fingerprint: Tuple[int, int], result: Dict[str, Any], ttl_hours: float, namespace: str = ""):
+        """Index a fresh upstream result under the image fingerprint"""
+        if not self.supports(service_type) or fingerprint is None:
+            return
+
+        entry = {"result": result}
+        entry_bytes = estimate_entry_bytes(entry)
+        with self._lock:
+            index = self._indexes.get(service_type)
+            if index is None:
+                index = _HashIndex(PERCEPTUAL_CACHE_MAX_ENTRIES, PERCEPTUAL_CACHE_MAX_BYTES)
+                self._indexes[service_type] = index
+            if index.add(fingerprint, namespace_id(namespace), entry, time.time() + ttl_hours * 3600, entry_bytes):
+                self.stats[service_type]["adds"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit rate and upstream latency saved, per service"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "max_distance": self.max_distance,
+                "hash_errors": self.hash_errors,
+                "services": self._service_stats()
+            }
+
+# Global perceptual hash cache instance
+perceptual_cache = PerceptualHashCache()
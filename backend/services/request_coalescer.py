@@ -0,0 +1,64 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+def content_hash(data: bytes) -> str:
+    """Fast fingerprint of raw request content (upload bytes or prompt text)"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class RequestCoalescer:
+    """Single-flight coalescing of identical in-flight AI requests
+
+    Concurrent callers with the same key share one upstream call. The call runs
+    in its own task, so a caller that disconnects does not cancel the request
+    for everyone else waiting on it.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.stats = {
+            "requests": 0,
+            "upstream_calls": 0,
+            "coalesced": 0
+        }
+
+    def make_key(self, service_type: str, input_hash: str, parameters: dict = None) -> str:
+        """Build a coalescing key from the service, input content hash and parameters"""
+        params_str = json.dumps(parameters or {}, sort_keys=True, default=str)
+        return f"{service_type}:{input_hash}:{params_str}"
+
+    async def run(self, key: str, call: Callable[[], Awaitable[Dict[str, Any]]]) -> Tuple[Dict[str, Any], bool]:
+        """Run call once per key; returns the shared result and whether this caller was coalesced"""
+        self.stats["requests"] += 1
+
+        task = self._in_flight.get(key)
+        coalesced = task is not None
+        if coalesced:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["upstream_calls"] += 1
+            task = asyncio.ensure_future(call())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._release(key, done))
+
+        return await asyncio.shield(task), coalesced
+
+    def _release(self, key: str, task: asyncio.Task):
+        """Forget a finished call so the next request goes upstream again"""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing counters"""
+        requests = self.stats["requests"]
+        return {
+            **self.stats,
+            "in_flight": len(self._in_flight),
+            "coalesce_rate": round(self.stats["coalesced"] / requests * 100, 2) if requests > 0 else 0
+        }
+
+# Global request coalescer instance
+request_coalescer = RequestCoalescer()
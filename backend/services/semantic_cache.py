@@ -0,0 +1,171 @@
+import asyncio
+import hashlib
+import os
+import re
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from services.similarity_index import RingIndex, SimilarityCache, estimate_entry_bytes, namespace_id
+
+# Optional tier: near-identical prompts ("a cat", "A cat.") reuse a cached response
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_MODEL = os.getenv("SEMANTIC_CACHE_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "10000"))
+# Budget for the cached results held per service, estimated as serialised JSON; 0 disables it
+SEMANTIC_CACHE_MAX_BYTES = int(os.getenv("SEMANTIC_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Minimum cosine similarity for a hit, per service
+SEMANTIC_CACHE_THRESHOLDS = {
+    "generate": float(os.getenv("SEMANTIC_CACHE_THRESHOLD_GENERATE", "0.90")),
+    "chat": float(os.getenv("SEMANTIC_CACHE_THRESHOLD_CHAT", "0.95"))
+}
+
+HASHING_EMBEDDING_DIM = 512
+
+
+class HashingEmbedder:
+    """Dependency-free CPU embedder: hashed word and character trigram counts"""
+
+    name = "hashing-ngram"
+
+    def __init__(self, dim: int = HASHING_EMBEDDING_DIM):
+        self.dim = dim
+
+    def _features(self, text: str):
+        text = re.sub(r"[^\w\s]", " ", text.lower())
+        words = text.split()
+        for word in words:
+            yield "w:" + word
+            padded = f" {word} "
+            for i in range(len(padded) - 2):
+                yield "c:" + padded[i:i + 3]
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dim] += 1.0 if (value >> 63) else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SentenceTransformerEmbedder:
+    """Local sentence-transformers model pinned to the CPU"""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.name = model_name
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.model.encode(text, normalize_embeddings=True).astype(np.float32)
+
+
+def _load_embedder():
+    """Use sentence-transformers when installed, otherwise the hashing embedder"""
+    try:
+        return SentenceTransformerEmbedder(SEMANTIC_CACHE_MODEL)
+    except Exception as e:
+        print(f"Semantic cache using hashing embedder ({e.__class__.__name__}: {e})")
+        return HashingEmbedder()
+
+
+class _VectorIndex(RingIndex):
+    """Fixed-capacity matrix of normalised embeddings searched by dot product"""
+
+    def __init__(self, dim: int, capacity: int, max_bytes: int = 0):
+        super().__init__(capacity, max_bytes)
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+
+    def add(self, vector: np.ndarray, namespace: int, entry: dict, expires_at: float, entry_bytes: int) -> bool:
+        slot = self.add_entry(namespace, entry, expires_at, entry_bytes)
+        if slot is None:
+            return False
+        self.vectors[slot] = vector
+        return True
+
+    def search(self, vector: np.ndarray, namespace: int, now: float):
+        if self.size == 0:
+            return None, 0.0
+        similarities = self.vectors[:self.size] @ vector
+        similarities[~self.valid(namespace, now)] = -1.0
+        best = int(np.argmax(similarities))
+        return self.entries[best], float(similarities[best])
+
+
+class SemanticCache(SimilarityCache):
+    """Embedding-similarity cache tier for chat and image-generation prompts"""
+
+    def __init__(self):
+        super().__init__(SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_THRESHOLDS)
+        self.thresholds = SEMANTIC_CACHE_THRESHOLDS
+        self._embedder = None
+
+    async def load(self):
+        """Load the embedding model off the event loop; called at startup"""
+        if self.enabled and self._embedder is None:
+            self._embedder = await asyncio.to_thread(_load_embedder)
+
+    def _get_embedder(self):
+        if self._embedder is None:
+            self._embedder = _load_embedder()
+        return self._embedder
+
+    async def _embed(self, text: str) -> np.ndarray:
+        embedder = self._get_embedder()
+        if isinstance(embedder, HashingEmbedder):
+            return embedder.embed(text)
+        # Model inference is CPU-bound; keep it off the event loop
+        return await asyncio.to_thread(embedder.embed, text)
+
+    async def get(self, service_type: str, text: str, namespace: str = "") -> Optional[Dict[str, Any]]:
+        """Return the cached result of the most similar prompt above the service threshold"""
+        if not self.supports(service_type):
+            return None
+
+        vector = await self._embed(text)
+        with self._lock:
+            self.stats[service_type]["lookups"] += 1
+            index = self._indexes.get(service_type)
+            if index is None:
+                return None
+            entry, similarity = index.search(vector, namespace_id(namespace), time.time())
+            if entry is None or similarity < self.thresholds[service_type]:
+                return None
+            self._record_hit(service_type, entry)
+
+        return {**entry, "similarity": similarity}
+
+    async def add(self, service_type: str, text: str, result: Dict[str, Any], ttl_hours: float, namespace: str = ""):
+        """Index a fresh upstream result under its prompt embedding"""
+        if not self.supports(service_type):
+            return
+
+        vector = await self._embed(text)
+        entry = {"result": result, "prompt": text}
+        entry_bytes = estimate_entry_bytes(entry)
+        with self._lock:
+            index = self._indexes.get(service_type)
+            if index is None:
+                index = _VectorIndex(len(vector), SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_CACHE_MAX_BYTES)
+                self._indexes[service_type] = index
+            if index.add(vector, namespace_id(namespace), entry, time.time() + ttl_hours * 3600, entry_bytes):
+                self.stats[service_type]["adds"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit rate and upstream latency saved, per service"""
+        with self._lock:
+            services = self._service_stats()
+            for service_type, stats in services.items():
+                stats["threshold"] = self.thresholds[service_type]
+            return {
+                "enabled": self.enabled,
+                "embedder": self._embedder.name if self._embedder else None,
+                "services": services
+            }
+
+# Global semantic cache instance
+semantic_cache = SemanticCache()
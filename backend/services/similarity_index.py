@@ -0,0 +1,117 @@
+import hashlib
+import json
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+
+def namespace_id(namespace: str) -> int:
+    """64-bit id of a namespace, stored with each entry so lookups only match within it"""
+    digest = hashlib.blake2b(namespace.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def estimate_entry_bytes(entry: Dict[str, Any]) -> int:
+    """Serialised size of a cached entry, for the byte budget"""
+    return len(json.dumps(entry, default=str))
+
+
+class RingIndex:
+    """Fixed-capacity ring buffer of cache entries with namespaces, expiry and a byte budget
+
+    Subclasses keep the lookup keys (embeddings, image hashes) in arrays of
+    the same capacity, written at the slot add_entry returns, and search
+    the first `size` slots masked by valid(). Live entries are the slots
+    from oldest up to next_slot; once the ring is full, or the entries
+    exceed max_bytes (0 for no limit), the oldest are dropped first.
+    """
+
+    def __init__(self, capacity: int, max_bytes: int = 0):
+        self.namespaces = np.zeros(capacity, dtype=np.int64)
+        self.expires_at = np.zeros(capacity, dtype=np.float64)
+        self.entry_bytes = np.zeros(capacity, dtype=np.int64)
+        self.entries = [None] * capacity
+        self.max_bytes = max_bytes
+        # Slots written at least once; searches scan these
+        self.size = 0
+        self.next_slot = 0
+        self.oldest = 0
+        self.live = 0
+        self.bytes = 0
+        self.evicted = 0
+
+    def add_entry(self, namespace: int, entry: Dict[str, Any], expires_at: float, entry_bytes: int) -> Optional[int]:
+        """Store an entry of estimate_entry_bytes size, dropping the oldest to make room
+
+        Returns its slot, or None if the entry alone exceeds the budget.
+        """
+        if self.max_bytes and entry_bytes > self.max_bytes:
+            return None
+        if self.live == len(self.entries):
+            self._drop_oldest()
+        while self.max_bytes and self.live and self.bytes + entry_bytes > self.max_bytes:
+            self._drop_oldest()
+
+        slot = self.next_slot
+        self.namespaces[slot] = namespace
+        self.expires_at[slot] = expires_at
+        self.entry_bytes[slot] = entry_bytes
+        self.entries[slot] = entry
+        self.bytes += entry_bytes
+        self.live += 1
+        self.next_slot = (slot + 1) % len(self.entries)
+        self.size = max(self.size, slot + 1)
+        return slot
+
+    def _drop_oldest(self):
+        slot = self.oldest
+        self.bytes -= int(self.entry_bytes[slot])
+        self.entry_bytes[slot] = 0
+        # An expiry in the past keeps the slot out of searches until it is reused
+        self.expires_at[slot] = 0
+        self.entries[slot] = None
+        self.oldest = (slot + 1) % len(self.entries)
+        self.live -= 1
+        self.evicted += 1
+
+    def valid(self, namespace: int, now: float) -> np.ndarray:
+        """Mask over the searched slots of live, unexpired entries in the namespace"""
+        return (self.namespaces[:self.size] == namespace) & (self.expires_at[:self.size] > now)
+
+
+class SimilarityCache:
+    """Bookkeeping shared by the similarity cache tiers: a RingIndex per service, a lock and hit counters"""
+
+    def __init__(self, enabled: bool, service_types: Iterable[str]):
+        self.enabled = enabled
+        self._indexes: Dict[str, RingIndex] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            service_type: {"lookups": 0, "hits": 0, "adds": 0, "saved_ms": 0.0}
+            for service_type in service_types
+        }
+
+    def supports(self, service_type: str) -> bool:
+        return self.enabled and service_type in self.stats
+
+    def _record_hit(self, service_type: str, entry: Dict[str, Any]):
+        stats = self.stats[service_type]
+        stats["hits"] += 1
+        stats["saved_ms"] += entry["result"].get("processing_time", 0)
+
+    def _service_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hit rate, upstream latency saved and index usage per service; call with the lock held"""
+        services = {}
+        for service_type, stats in self.stats.items():
+            index = self._indexes.get(service_type)
+            lookups = stats["lookups"]
+            services[service_type] = {
+                **stats,
+                "saved_ms": round(stats["saved_ms"], 2),
+                "hit_rate": round(stats["hits"] / lookups * 100, 2) if lookups > 0 else 0,
+                "entries": index.live if index else 0,
+                "bytes": index.bytes if index else 0,
+                "evicted": index.evicted if index else 0
+            }
+        return services
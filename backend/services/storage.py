@@ -1,17 +1,217 @@
-from typing import Dict, List, Optional, Any
-from datetime import datetime
+from typing import Deque, Dict, List, Optional, Any, Tuple
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from itertools import islice
 import asyncio
+import heapq
+import json
+import os
+import secrets
+import sys
+import traceback
+
+from models.database import JobStatus, ServiceType
+
+# Retention of the in-memory job and chat stores; 0 disables a limit.
+# Oldest records go first; jobs still pending or processing are never evicted.
+STORAGE_MAX_JOBS = int(os.getenv("STORAGE_MAX_JOBS", "10000"))
+STORAGE_MAX_MESSAGES = int(os.getenv("STORAGE_MAX_MESSAGES", "10000"))
+STORAGE_MAX_AGE_HOURS = float(os.getenv("STORAGE_MAX_AGE_HOURS", "24"))
+# Budget for jobs and messages together, measured by their serialised size
+STORAGE_MAX_BYTES = int(os.getenv("STORAGE_MAX_BYTES", "268435456"))
+STORAGE_SWEEP_INTERVAL_SECONDS = float(os.getenv("STORAGE_SWEEP_INTERVAL_SECONDS", "60"))
+# Write evicted jobs to the AIRequest table instead of discarding them
+STORAGE_SPILL_TO_DATABASE = os.getenv("STORAGE_SPILL_TO_DATABASE", "false").lower() == "true"
+
+TERMINAL_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED)
+
+# Job ids are a per-worker prefix followed by a sequence number, so jobs created
+# on different API workers do not share ids in relayed events. Both parts fit
+# below 2**53, where browsers still read the id exactly.
+JOB_ID_SEQUENCE_BITS = 32
+JOB_ID_WORKER_BITS = 20
+
+# Job fields that can carry large payloads; they are only re-serialised to
+# re-estimate a job's size when an update changes one of them
+JOB_PAYLOAD_FIELDS = ("prompt", "image_url", "result", "parameters")
+
+
+@dataclass(slots=True)
+class JobRecord:
+    """A stored AI job; reads straight into AIJobResponse.model_validate"""
+    id: int
+    user_id: int
+    service_type: ServiceType
+    prompt: Optional[str]
+    image_url: Optional[str]
+    status: JobStatus
+    result: Optional[Dict[str, Any]]
+    parameters: Optional[Dict[str, Any]]
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+    # Estimated bytes held, for the retention byte budget
+    size: int = field(default=0, repr=False)
+    # The part of size taken by JOB_PAYLOAD_FIELDS
+    payload_size: int = field(default=0, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "service_type": self.service_type.value,
+            "prompt": self.prompt,
+            "image_url": self.image_url,
+            "status": self.status.value,
+            "result": self.result,
+            "parameters": self.parameters,
+            "created_at": self.created_at,
+            "completed_at": self.completed_at
+        }
+
+
+@dataclass(slots=True)
+class MessageRecord:
+    """A stored chat message"""
+    id: int
+    user_id: int
+    role: str
+    content: str
+    timestamp: datetime
+    size: int = field(default=0, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "user_id": self.user_id, "role": self.role, "content": self.content, "timestamp": self.timestamp}
+
+
+def _estimate_bytes(record) -> int:
+    return len(json.dumps(record.to_dict(), default=str))
+
+
+def _estimate_payload_bytes(job: JobRecord) -> int:
+    return sum(len(json.dumps(getattr(job, name), default=str)) for name in JOB_PAYLOAD_FIELDS)
+
+
+def _estimate_job_bytes(job: JobRecord) -> int:
+    """Serialised size of a job, from its small fields and its stored payload_size"""
+    fields = job.to_dict()
+    for name in JOB_PAYLOAD_FIELDS:
+        fields[name] = None
+    # Each payload field serialised above as null, 4 characters
+    return len(json.dumps(fields, default=str)) - 4 * len(JOB_PAYLOAD_FIELDS) + job.payload_size
+
+
+def _index_discard(index: Deque[int], records: Dict[int, Any]):
+    """Drop evicted ids from the front of a per-user index
+
+    Eviction goes oldest first, so an evicted id is normally at the front. One
+    left behind an older record that is kept, such as a job in progress,
+    stays until it reaches the front; readers skip ids no longer stored.
+    """
+    while index and index[0] not in records:
+        index.popleft()
+
+
+def _newest(index: Deque[int], records: Dict[int, Any], limit: Optional[int]) -> List[Any]:
+    """Up to limit of the stored records in a per-user index, newest first (all of them without a limit)"""
+    stored = (records[record_id] for record_id in reversed(index) if record_id in records)
+    return list(islice(stored, limit or None))
+
+
+def _eviction_reason(excess_count: int, excess_bytes: int, timestamp: datetime, cutoff: Optional[datetime]) -> Optional[str]:
+    """Why the oldest remaining record goes, or None once every limit holds"""
+    if excess_count > 0:
+        return "count"
+    if excess_bytes > 0:
+        return "bytes"
+    if cutoff is not None and timestamp < cutoff:
+        return "age"
+    return None
+
+
+def _select_evictions(
+    records: Dict[int, Any],
+    timestamp_attr: str,
+    max_count: int,
+    cutoff: Optional[datetime],
+    excess_bytes: int
+) -> List[Tuple[int, str]]:
+    """Oldest-first (id, reason) pairs to evict until the count, byte and age limits all hold"""
+    excess_count = len(records) - max_count if max_count else 0
+    evictions = []
+    for record_id, record in records.items():
+        reason = _eviction_reason(excess_count, excess_bytes, getattr(record, timestamp_attr), cutoff)
+        if reason is None:
+            # Records are in time order, so every later one is within the limits too
+            break
+        evictions.append((record_id, reason))
+        excess_count -= 1
+        excess_bytes -= record.size
+    return evictions
 
 class MemoryStorage:
-    """In-memory storage implementation for AI jobs and chat messages"""
+    """In-memory storage implementation for AI jobs and chat messages
+
+    Ids are assigned in creation order, so ascending id order is time order.
+    Job ids start from a prefix for worker_id, random unless given, so they
+    are unique across API workers that each keep their own storage.
+    The ai_jobs and chat_messages dicts keep insertion order and serve as the global time index;
+    per-user id deques, appended on create and trimmed from the front on
+    eviction, serve the per-user queries without scanning or sorting every
+    record.
+
+    Retention limits are enforced when a write exceeds the count or byte
+    limit, and by a background sweeper, which also expires records by age.
+    Only finished jobs can be evicted; they are kept in a heap of ids, so a
+    sweep visits just the jobs it evicts, however many are still running.
+    """
     
-    def __init__(self):
-        self.ai_jobs: Dict[int, Dict[str, Any]] = {}
-        self.chat_messages: Dict[int, Dict[str, Any]] = {}
+    def __init__(
+        self,
+        event_bus=None,
+        max_jobs: int = STORAGE_MAX_JOBS,
+        max_messages: int = STORAGE_MAX_MESSAGES,
+        max_age_hours: float = STORAGE_MAX_AGE_HOURS,
+        max_bytes: int = STORAGE_MAX_BYTES,
+        spill_to_database: bool = STORAGE_SPILL_TO_DATABASE,
+        worker_id: Optional[int] = None
+    ):
+        # Optional JobEventBus notified of job lifecycle changes
+        self.event_bus = event_bus
+        self.ai_jobs: Dict[int, JobRecord] = {}
+        self.chat_messages: Dict[int, MessageRecord] = {}
         self.users: Dict[int, Dict[str, Any]] = {}
-        self.current_job_id = 1
+        # user_id -> ascending ids of that user's jobs and messages
+        self._jobs_by_user: Dict[int, Deque[int]] = {}
+        self._messages_by_user: Dict[int, Deque[int]] = {}
+        self.max_jobs = max_jobs
+        self.max_messages = max_messages
+        self.max_age_hours = max_age_hours
+        self.max_bytes = max_bytes
+        self.spill_to_database = spill_to_database
+        # Running totals of the records' estimated sizes
+        self.job_bytes = 0
+        self.message_bytes = 0
+        # Evicted jobs waiting to be written to the AIRequest table
+        self._spill_buffer: List[JobRecord] = []
+        self._sweeper: Optional[asyncio.Task] = None
+        self.retention_stats = {
+            "evicted_jobs": 0, "evicted_messages": 0,
+            "evicted_by_count": 0, "evicted_by_age": 0, "evicted_by_bytes": 0,
+            "spilled_jobs": 0, "spill_errors": 0, "sweeps": 0
+        }
+        if worker_id is None:
+            worker_id = secrets.randbits(JOB_ID_WORKER_BITS)
+        self.current_job_id = (worker_id << JOB_ID_SEQUENCE_BITS) + 1
         self.current_message_id = 1
         self.current_user_id = 1
+        # Long-poll waiters, woken when their job completes or fails
+        self._job_events: Dict[int, asyncio.Event] = {}
+        # Min-heap of the ids of completed and failed jobs, oldest first
+        self._finished_job_ids: List[int] = []
+        # Set when a write-triggered sweep could evict nothing; cleared once
+        # a job finishes or a message is added, as only then can one succeed
+        self._write_sweep_idle = False
         
         # Create demo user
         self.users[1] = {
@@ -20,96 +220,293 @@ class MemoryStorage:
             "created_at": datetime.utcnow()
         }
 
-    async def create_ai_job(self, job_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def create_ai_job(self, job_data: Dict[str, Any]) -> JobRecord:
         """Create a new AI job record"""
         job_id = self.current_job_id
         self.current_job_id += 1
         
-        job = {
-            "id": job_id,
-            "user_id": job_data.get("user_id", 1),
-            "service_type": job_data["service_type"],
-            "prompt": job_data.get("prompt"),
-            "image_url": job_data.get("image_url"),
-            "status": job_data.get("status", "pending"),
-            "result": job_data.get("result"),
-            "parameters": job_data.get("parameters", {}),
-            "created_at": datetime.utcnow(),
-            "completed_at": None
-        }
+        job = JobRecord(
+            id=job_id,
+            user_id=job_data.get("user_id", 1),
+            service_type=ServiceType(job_data["service_type"]),
+            prompt=job_data.get("prompt"),
+            image_url=job_data.get("image_url"),
+            status=JobStatus(job_data.get("status", "pending")),
+            result=job_data.get("result"),
+            parameters=job_data.get("parameters", {}),
+            created_at=datetime.utcnow()
+        )
         
         self.ai_jobs[job_id] = job
+        self._jobs_by_user.setdefault(job.user_id, deque()).append(job_id)
+        if job.status in TERMINAL_STATUSES:
+            self._job_finished(job_id)
+        job.payload_size = _estimate_payload_bytes(job)
+        self._resize_job(job)
+        self._publish_job("job.created", job)
+        self._enforce_limits(keep_job_id=job_id)
         return job
 
-    async def get_ai_job(self, job_id: int) -> Optional[Dict[str, Any]]:
+    def _publish_job(self, event_type: str, job: JobRecord):
+        if self.event_bus is not None:
+            # A summary rather than the job: results and prompts stay off the
+            # event stream and the Redis relay, and clients fetch the job itself
+            self.event_bus.publish(event_type, {
+                "id": job.id,
+                "user_id": job.user_id,
+                "service_type": job.service_type.value,
+                "status": job.status.value
+            })
+
+    async def get_ai_job(self, job_id: int) -> Optional[JobRecord]:
         """Get AI job by ID"""
         return self.ai_jobs.get(job_id)
 
-    async def update_ai_job(self, job_id: int, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    async def update_ai_job(self, job_id: int, updates: Dict[str, Any]) -> Optional[JobRecord]:
         """Update AI job with new data"""
         if job_id not in self.ai_jobs:
             return None
             
         job = self.ai_jobs[job_id]
-        job.update(updates)
+        was_finished = job.status in TERMINAL_STATUSES
+        for key, value in updates.items():
+            setattr(job, key, JobStatus(value) if key == "status" else value)
         
-        if updates.get("status") in ["completed", "failed"]:
-            job["completed_at"] = datetime.utcnow()
+        finished = updates.get("status") in TERMINAL_STATUSES
+        if finished:
+            job.completed_at = datetime.utcnow()
+            if not was_finished:
+                self._job_finished(job_id)
+            event = self._job_events.pop(job_id, None)
+            if event is not None:
+                event.set()
             
-        self.ai_jobs[job_id] = job
+        if any(name in updates for name in JOB_PAYLOAD_FIELDS):
+            job.payload_size = _estimate_payload_bytes(job)
+        self._resize_job(job)
+        self._publish_job(f"job.{job.status.value}" if finished else "job.progress", job)
+        # The caller, or a long poll woken above, reads this job next
+        self._enforce_limits(keep_job_id=job_id)
+        return job
+
+    async def wait_for_ai_job(self, job_id: int, timeout: float) -> Optional[JobRecord]:
+        """Get AI job by ID, first waiting up to timeout seconds for it to complete or fail"""
+        job = self.ai_jobs.get(job_id)
+        if job is None or job.status in TERMINAL_STATUSES or timeout <= 0:
+            return job
+
+        event = self._job_events.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        # The record is updated in place, so it is current even if it has since been evicted
         return job
 
-    async def get_ai_jobs_by_user(self, user_id: int) -> List[Dict[str, Any]]:
-        """Get all AI jobs for a specific user"""
-        user_jobs = [
-            job for job in self.ai_jobs.values() 
-            if job["user_id"] == user_id
-        ]
-        return sorted(user_jobs, key=lambda x: x["created_at"], reverse=True)
+    async def get_ai_jobs_by_user(self, user_id: int, limit: Optional[int] = None) -> List[JobRecord]:
+        """Get AI jobs for a specific user, newest first (all of them unless limit is given)"""
+        return _newest(self._jobs_by_user.get(user_id, ()), self.ai_jobs, limit)
 
-    async def get_recent_ai_jobs(self, limit: int = 10) -> List[Dict[str, Any]]:
+    async def get_recent_ai_jobs(self, limit: int = 10) -> List[JobRecord]:
         """Get recent AI jobs across all users"""
-        all_jobs = list(self.ai_jobs.values())
-        sorted_jobs = sorted(all_jobs, key=lambda x: x["created_at"], reverse=True)
-        return sorted_jobs[:limit]
+        return list(islice(reversed(self.ai_jobs.values()), limit))
 
-    async def create_chat_message(self, message_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def create_chat_message(self, message_data: Dict[str, Any]) -> MessageRecord:
         """Create a new chat message"""
         message_id = self.current_message_id
         self.current_message_id += 1
         
-        message = {
-            "id": message_id,
-            "user_id": message_data.get("user_id", 1),
-            "role": message_data["role"],
-            "content": message_data["content"],
-            "timestamp": datetime.utcnow()
-        }
+        message = MessageRecord(
+            id=message_id,
+            user_id=message_data.get("user_id", 1),
+            # A handful of distinct roles, shared rather than copied per message
+            role=sys.intern(message_data["role"]),
+            content=message_data["content"],
+            timestamp=datetime.utcnow()
+        )
+        message.size = _estimate_bytes(message)
         
         self.chat_messages[message_id] = message
+        self._write_sweep_idle = False
+        self._messages_by_user.setdefault(message.user_id, deque()).append(message_id)
+        self.message_bytes += message.size
+        self._enforce_limits()
         return message
 
-    async def get_chat_history(self, user_id: int, limit: int = 50) -> List[Dict[str, Any]]:
+    async def get_chat_history(self, user_id: int, limit: int = 50) -> List[MessageRecord]:
         """Get chat history for a specific user"""
-        user_messages = [
-            msg for msg in self.chat_messages.values() 
-            if msg["user_id"] == user_id
-        ]
-        sorted_messages = sorted(user_messages, key=lambda x: x["timestamp"])
-        return sorted_messages[-limit:] if limit else sorted_messages
+        history = _newest(self._messages_by_user.get(user_id, ()), self.chat_messages, limit)
+        history.reverse()
+        return history
 
     async def clear_chat_history(self, user_id: int) -> bool:
         """Clear chat history for a specific user"""
-        messages_to_remove = [
-            msg_id for msg_id, msg in self.chat_messages.items()
-            if msg["user_id"] == user_id
-        ]
-        
-        for msg_id in messages_to_remove:
-            del self.chat_messages[msg_id]
+        for msg_id in self._messages_by_user.pop(user_id, ()):
+            message = self.chat_messages.pop(msg_id, None)
+            if message is not None:
+                self.message_bytes -= message.size
             
         return True
 
+    def _resize_job(self, job: JobRecord):
+        size = _estimate_job_bytes(job)
+        self.job_bytes += size - job.size
+        job.size = size
+
+    def _job_finished(self, job_id: int):
+        heapq.heappush(self._finished_job_ids, job_id)
+        self._write_sweep_idle = False
+
+    def _enforce_limits(self, keep_job_id: Optional[int] = None):
+        """Sweep straight away once a write takes the store over its count or byte limit
+
+        While running jobs alone keep the store over a limit, sweeping on
+        every write would evict nothing, so after one such sweep the next
+        waits until a job finishes or a message is added.
+        """
+        if self._write_sweep_idle:
+            return
+        if (
+            (self.max_jobs and len(self.ai_jobs) > self.max_jobs)
+            or (self.max_messages and len(self.chat_messages) > self.max_messages)
+            or (self.max_bytes and self.job_bytes + self.message_bytes > self.max_bytes)
+        ):
+            kept = self.ai_jobs.get(keep_job_id)
+            evicted = self.sweep(keep_job_id)
+            # A finished job held back for this write can go on the next one
+            self._write_sweep_idle = evicted == 0 and (kept is None or kept.status not in TERMINAL_STATUSES)
+
+    def sweep(self, keep_job_id: Optional[int] = None) -> int:
+        """Evict records beyond the retention limits; returns how many were evicted
+
+        Jobs, which carry the large result payloads, are evicted before chat
+        messages when the byte budget is exceeded. keep_job_id, the job just
+        written, is never evicted by the sweep its own write triggers.
+        """
+        cutoff = datetime.utcnow() - timedelta(hours=self.max_age_hours) if self.max_age_hours else None
+        evicted_jobs = self._evict_finished_jobs(cutoff, keep_job_id)
+
+        excess_bytes = self.job_bytes + self.message_bytes - self.max_bytes if self.max_bytes else 0
+        message_evictions = _select_evictions(
+            self.chat_messages, "timestamp", self.max_messages, cutoff, excess_bytes
+        )
+        for message_id, reason in message_evictions:
+            self._evict_message(message_id, reason)
+
+        self.retention_stats["sweeps"] += 1
+        return evicted_jobs + len(message_evictions)
+
+    def _evict_finished_jobs(self, cutoff: Optional[datetime], keep_job_id: Optional[int]) -> int:
+        """Evict finished jobs, oldest first, until the job count, byte and age limits hold"""
+        heap = self._finished_job_ids
+        excess_count = len(self.ai_jobs) - self.max_jobs if self.max_jobs else 0
+        held_back = []
+        evicted = 0
+        while heap:
+            job = self.ai_jobs.get(heap[0])
+            if job is None or job.status not in TERMINAL_STATUSES:
+                # Set running again; it is pushed back when it next finishes
+                heapq.heappop(heap)
+                continue
+            excess_bytes = self.job_bytes + self.message_bytes - self.max_bytes if self.max_bytes else 0
+            reason = _eviction_reason(excess_count, excess_bytes, job.created_at, cutoff)
+            if reason is None:
+                break
+            heapq.heappop(heap)
+            if job.id == keep_job_id:
+                held_back.append(job.id)
+                continue
+            self._evict_job(job.id, reason)
+            excess_count -= 1
+            evicted += 1
+        for job_id in held_back:
+            heapq.heappush(heap, job_id)
+        return evicted
+
+    def _evict_job(self, job_id: int, reason: str):
+        job = self.ai_jobs.pop(job_id)
+        self.job_bytes -= job.size
+        self._job_events.pop(job_id, None)
+        user_jobs = self._jobs_by_user.get(job.user_id, deque())
+        _index_discard(user_jobs, self.ai_jobs)
+        if not user_jobs:
+            self._jobs_by_user.pop(job.user_id, None)
+        if self.spill_to_database:
+            self._spill_buffer.append(job)
+        self.retention_stats["evicted_jobs"] += 1
+        self.retention_stats[f"evicted_by_{reason}"] += 1
+
+    def _evict_message(self, message_id: int, reason: str):
+        message = self.chat_messages.pop(message_id)
+        self.message_bytes -= message.size
+        user_messages = self._messages_by_user.get(message.user_id, deque())
+        _index_discard(user_messages, self.chat_messages)
+        if not user_messages:
+            self._messages_by_user.pop(message.user_id, None)
+        self.retention_stats["evicted_messages"] += 1
+        self.retention_stats[f"evicted_by_{reason}"] += 1
+
+    def _write_spill(self, jobs: List[JobRecord]):
+        from database import SessionLocal
+        from models.database import AIRequest
+
+        db = SessionLocal()
+        try:
+            for job in jobs:
+                db.add(AIRequest(
+                    user_id=job.user_id,
+                    service_type=job.service_type,
+                    prompt=job.prompt,
+                    parameters=job.parameters,
+                    result=job.result,
+                    status=job.status.value,
+                    error_message=job.result.get("error") if job.status == JobStatus.FAILED and isinstance(job.result, dict) else None,
+                    # Uploads are inlined as data URLs, which do not fit the column
+                    input_file_url=job.image_url if job.image_url and len(job.image_url) <= 500 else None,
+                    created_at=job.created_at,
+                    completed_at=job.completed_at
+                ))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def flush_spill(self):
+        """Write evicted jobs to the AIRequest table; on failure they are dropped and counted"""
+        if not self._spill_buffer:
+            return
+        jobs, self._spill_buffer = self._spill_buffer, []
+        try:
+            # Synchronous SQLAlchemy session; keep it off the event loop
+            await asyncio.to_thread(self._write_spill, jobs)
+            self.retention_stats["spilled_jobs"] += len(jobs)
+        except Exception:
+            self.retention_stats["spill_errors"] += len(jobs)
+            traceback.print_exc()
+
+    async def _sweep_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.sweep()
+                await self.flush_spill()
+            except Exception:
+                traceback.print_exc()
+
+    def start(self, interval: float = STORAGE_SWEEP_INTERVAL_SECONDS):
+        """Start the background retention sweeper"""
+        if self._sweeper is None and interval > 0:
+            self._sweeper = asyncio.create_task(self._sweep_loop(interval))
+
+    async def stop(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+        await self.flush_spill()
+
     async def get_storage_stats(self) -> Dict[str, Any]:
         """Get storage statistics"""
         return {
@@ -117,14 +514,27 @@ class MemoryStorage:
             "total_messages": len(self.chat_messages),
             "total_users": len(self.users),
             "jobs_by_status": self._count_jobs_by_status(),
-            "jobs_by_service": self._count_jobs_by_service()
+            "jobs_by_service": self._count_jobs_by_service(),
+            "memory": {
+                "estimated_job_bytes": self.job_bytes,
+                "estimated_message_bytes": self.message_bytes,
+                "max_bytes": self.max_bytes
+            },
+            "retention": {
+                "max_jobs": self.max_jobs,
+                "max_messages": self.max_messages,
+                "max_age_hours": self.max_age_hours,
+                "spill_to_database": self.spill_to_database,
+                "pending_spill": len(self._spill_buffer),
+                **self.retention_stats
+            }
         }
 
     def _count_jobs_by_status(self) -> Dict[str, int]:
         """Count jobs by status"""
         status_counts = {}
         for job in self.ai_jobs.values():
-            status = job["status"]
+            status = job.status.value
             status_counts[status] = status_counts.get(status, 0) + 1
         return status_counts
 
@@ -132,6 +542,6 @@ class MemoryStorage:
         """Count jobs by service type"""
         service_counts = {}
         for job in self.ai_jobs.values():
-            service = job["service_type"]
+            service = job.service_type.value
             service_counts[service] = service_counts.get(service, 0) + 1
         return service_counts
\ No newline at end of file
@@ -0,0 +1,240 @@
+import asyncio
+import io
+import math
+import os
+import time
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, List, Tuple
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from services.image_preprocessing import IMAGE_PREPROCESS_CONFIG, image_preprocessor, upright_size
+from services.uploads import IngestedUpload
+
+# Upstream calls one tiled request may have in flight; the provider-wide limit still applies on top
+DETECT_TILE_MAX_CONCURRENCY = int(os.getenv("DETECT_TILE_MAX_CONCURRENCY", "4"))
+# Requests that would need more tiles than this are refused rather than fanned out
+DETECT_TILE_MAX_TILES = int(os.getenv("DETECT_TILE_MAX_TILES", "36"))
+# Same-label boxes overlapping more than this (IoU) are treated as one object
+DETECT_NMS_IOU_THRESHOLD = float(os.getenv("DETECT_NMS_IOU_THRESHOLD", "0.5"))
+
+# error_code of tiled requests refused before any upstream call; like deterministic
+# provider failures they are negatively cached, and the API answers them with 400
+TILING_ERROR_CODES = ("unreadable_image", "too_many_tiles")
+
+DEFAULT_TILE_SIZE = 1024
+DEFAULT_TILE_OVERLAP = 0.2
+
+
+def _tile_starts(length: int, tile_size: int, stride: int) -> np.ndarray:
+    if length <= tile_size:
+        return np.array([0])
+    starts = np.arange(0, length - tile_size + 1, stride)
+    if starts[-1] != length - tile_size:
+        # Last tile is shifted back to end on the image edge rather than overhang it
+        starts = np.append(starts, length - tile_size)
+    return starts
+
+
+def plan_tiles(width: int, height: int, tile_size: int, overlap: float) -> np.ndarray:
+    """Tile rectangles (x0, y0, x1, y1) in pixels covering the image, adjacent tiles sharing overlap of their side"""
+    stride = max(1, int(round(tile_size * (1 - overlap))))
+    xs = _tile_starts(width, tile_size, stride)
+    ys = _tile_starts(height, tile_size, stride)
+    x0, y0 = np.meshgrid(xs, ys)
+    x0, y0 = x0.ravel(), y0.ravel()
+    return np.stack([x0, y0, np.minimum(x0 + tile_size, width), np.minimum(y0 + tile_size, height)], axis=1)
+
+
+def crop_tiles(source: BinaryIO, tiles: np.ndarray, quality: int) -> List[bytes]:
+    """JPEG-encode each tile of the upright image"""
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        encoded = []
+        for x0, y0, x1, y1 in tiles.tolist():
+            output = io.BytesIO()
+            image.crop((x0, y0, x1, y1)).save(output, format="JPEG", quality=quality)
+            encoded.append(output.getvalue())
+        return encoded
+
+
+def non_max_suppression(boxes: np.ndarray, scores: np.ndarray, labels: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """Indices of the boxes (x0, y0, x1, y1) kept by greedy per-label NMS, highest score first"""
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # Shifting each label into its own coordinate range lets one pass handle every label
+    # without boxes of different labels ever overlapping
+    _, label_ids = np.unique(labels, return_inverse=True)
+    shifted = boxes + (label_ids * (boxes.max() + 1))[:, None]
+    x0, y0, x1, y1 = shifted.T
+    areas = (x1 - x0) * (y1 - y0)
+
+    order = np.argsort(-scores, kind="stable")
+    keep = []
+    while order.size > 0:
+        best, rest = order[0], order[1:]
+        keep.append(best)
+        width = np.clip(np.minimum(x1[best], x1[rest]) - np.maximum(x0[best], x0[rest]), 0, None)
+        height = np.clip(np.minimum(y1[best], y1[rest]) - np.maximum(y0[best], y0[rest]), 0, None)
+        intersection = width * height
+        iou = intersection / np.maximum(areas[best] + areas[rest] - intersection, 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def _confidence(value: Any) -> float:
+    """A detection's confidence as a finite float; missing or malformed values count as 0"""
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return score if math.isfinite(score) else 0.0
+
+
+def merge_tile_detections(
+    tile_objects: List[List[Dict[str, Any]]],
+    tiles: np.ndarray,
+    width: int,
+    height: int,
+    iou_threshold: float = DETECT_NMS_IOU_THRESHOLD
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Map per-tile [x, y, w, h] percentage boxes to the whole image and merge duplicates
+
+    Returns the merged objects, highest confidence first, and the number of
+    well-formed detections before merging.
+    """
+    names, scores, local_boxes, tile_index = [], [], [], []
+    for index, objects in enumerate(tile_objects):
+        for obj in objects:
+            bbox = obj.get("bbox")
+            if not isinstance(bbox, (list, tuple)) or len(bbox) != 4:
+                continue
+            try:
+                bbox = [float(v) for v in bbox]
+            except (TypeError, ValueError):
+                continue
+            names.append(str(obj.get("name", "object")))
+            scores.append(_confidence(obj.get("confidence")))
+            local_boxes.append(bbox)
+            tile_index.append(index)
+    if not names:
+        return [], 0
+
+    # Tile-relative percentages -> global pixels (x0, y0, x1, y1)
+    local = np.asarray(local_boxes, dtype=np.float64) / 100
+    tile = tiles[np.asarray(tile_index)].astype(np.float64)
+    tile_width = (tile[:, 2] - tile[:, 0])[:, None]
+    tile_height = (tile[:, 3] - tile[:, 1])[:, None]
+    origin = tile[:, :2]
+    top_left = origin + local[:, :2] * np.hstack([tile_width, tile_height])
+    size = local[:, 2:] * np.hstack([tile_width, tile_height])
+    boxes = np.hstack([top_left, top_left + size])
+    boxes = np.clip(boxes, 0, [width, height, width, height])
+
+    labels = np.asarray([name.lower() for name in names])
+    scores = np.asarray(scores)
+    keep = non_max_suppression(boxes, scores, labels, iou_threshold)
+
+    # Global pixels -> [x, y, w, h] as percentages of the whole image
+    scale = np.array([width, height, width, height], dtype=np.float64)
+    kept = boxes[keep]
+    percent = np.hstack([kept[:, :2], kept[:, 2:] - kept[:, :2]]) / scale * 100
+    merged = [
+        {"name": names[i], "confidence": float(scores[i]), "bbox": [round(v, 2) for v in box]}
+        for i, box in zip(keep.tolist(), percent.tolist())
+    ]
+    return merged, len(names)
+
+
+async def plan_upload_tiles(upload: IngestedUpload, tile_size: int, overlap: float) -> Tuple[int, int, np.ndarray]:
+    """Image size and tile layout of an upload; raises ValueError if Pillow cannot read it"""
+    try:
+        width, height = await image_preprocessor.execute(upright_size, upload.open())
+    except Exception as e:
+        raise ValueError(f"Could not read image: {e}") from e
+    return width, height, plan_tiles(width, height, tile_size, overlap)
+
+
+def _refused(error: str, error_code: str, start_time: float) -> Dict[str, Any]:
+    return {
+        "success": False,
+        "error": error,
+        "error_code": error_code,
+        "processing_time": (time.time() - start_time) * 1000
+    }
+
+
+async def detect_tiled(
+    upload: IngestedUpload,
+    call: Callable[[str], Awaitable[Dict[str, Any]]],
+    tile_size: int = DEFAULT_TILE_SIZE,
+    overlap: float = DEFAULT_TILE_OVERLAP,
+    max_concurrency: int = DETECT_TILE_MAX_CONCURRENCY,
+    max_tiles: int = DETECT_TILE_MAX_TILES
+) -> Dict[str, Any]:
+    """Run object detection tile by tile and merge the results into one detection result
+
+    Images that fit in a single tile take the usual preprocessed single-call
+    path. An image Pillow cannot read, or one needing more than max_tiles
+    tiles, is refused with an error_code from TILING_ERROR_CODES. A failed
+    tile fails the whole request, since a result missing part of the image
+    must not be cached; tiles not yet started are then skipped.
+    """
+    start_time = time.time()
+    try:
+        width, height, tiles = await plan_upload_tiles(upload, tile_size, overlap)
+    except ValueError as e:
+        return _refused(str(e), "unreadable_image", start_time)
+    if len(tiles) > max_tiles:
+        return _refused(
+            f"Image needs {len(tiles)} tiles at tile_size {tile_size}; the maximum is {max_tiles}",
+            "too_many_tiles", start_time
+        )
+    if len(tiles) == 1:
+        return await image_preprocessor.run("detect", upload, call)
+
+    quality = IMAGE_PREPROCESS_CONFIG["detect"]["quality"]
+    encoded_tiles = await image_preprocessor.execute(crop_tiles, upload.open(), tiles, quality)
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    failures: List[Dict[str, Any]] = []
+
+    async def detect_tile(data: bytes):
+        async with semaphore:
+            if failures:
+                return None
+            result = await call(IngestedUpload.from_bytes(data, "image/jpeg").data_url())
+            if not result["success"]:
+                failures.append(result)
+                return None
+            return result["data"].get("objects") or []
+
+    tile_objects = await asyncio.gather(*(detect_tile(data) for data in encoded_tiles))
+    processing_time = (time.time() - start_time) * 1000
+
+    if failures:
+        error_codes = {failure.get("error_code") for failure in failures}
+        return {
+            "success": False,
+            "error": f"Tiled detection failed on {len(failures)} of {len(tiles)} tiles: {failures[0]['error']}",
+            # Deterministic only if every failed tile was rejected for the same reason
+            "error_code": error_codes.pop() if len(error_codes) == 1 else None,
+            "processing_time": processing_time
+        }
+
+    objects, raw_detections = merge_tile_detections(tile_objects, tiles, width, height)
+    return {
+        "success": True,
+        "data": {
+            "objects": objects,
+            "tiling": {
+                "tiles": len(tiles),
+                "tile_size": tile_size,
+                "overlap": overlap,
+                "image_size": [width, height],
+                "raw_detections": raw_detections
+            }
+        },
+        "processing_time": processing_time
+    }
@@ -0,0 +1,242 @@
+import binascii
+import hashlib
+import io
+import mimetypes
+import os
+import threading
+from typing import Awaitable, BinaryIO, Iterable, Optional, TypeVar
+
+from fastapi import HTTPException, UploadFile
+from starlette.responses import JSONResponse
+
+from config.settings import settings
+
+# Uploads are copied in chunks of this size; a multiple of 3 so each chunk
+# base64-encodes without padding and chunks can be concatenated
+UPLOAD_CHUNK_SIZE = 3 * 256 * 1024
+# Smaller chunks for building data URLs, so each chunk and its base64 text stay
+# small next to the full-size encoded buffer; also a multiple of 3
+UPLOAD_ENCODE_CHUNK_SIZE = 3 * 64 * 1024
+# Image types passed to providers as given; any other declared type is sent as JPEG
+UPLOAD_IMAGE_TYPES = frozenset({"image/jpeg", "image/png", "image/gif", "image/webp", "image/bmp", "image/tiff"})
+# Allowance for multipart boundaries and form fields on top of the file itself
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+T = TypeVar("T")
+
+
+class UploadTooLarge(HTTPException):
+    def __init__(self, max_size: int):
+        super().__init__(
+            status_code=413,
+            detail=f"File too large. Maximum size is {max_size // (1024 * 1024)}MB"
+        )
+
+
+class IngestedUpload:
+    """An upload read within the size limit, owned independently of the request
+
+    The content is kept in a SpooledTemporaryFile, so small images stay in
+    memory and large ones go to disk. The request is done with the image
+    when the response is sent, while a queued job or a background cache
+    refresh may still need it, so the spool is reference
+    counted: the request holds the first reference, anything that outlives
+    it takes another with retain(), and the spool is closed when the last
+    holder calls close().
+    """
+
+    def __init__(self, spool: BinaryIO, size: int, digest: str, content_type: str):
+        self.spool = spool
+        self.size = size
+        self.digest = digest
+        self.content_type = content_type
+        # Readers run on the event loop and in preprocessing threads at once
+        self._lock = threading.Lock()
+        self._references = 1
+
+    @classmethod
+    def from_bytes(cls, data: bytes, content_type: str, digest: str = "") -> "IngestedUpload":
+        """Wrap content already in memory, such as a re-encoded image"""
+        return cls(io.BytesIO(data), len(data), digest, content_type)
+
+    def open(self) -> BinaryIO:
+        """A reader over the content with its own position, for readers such as Pillow that take a file"""
+        return io.BufferedReader(_SpoolReader(self))
+
+    def chunks(self, chunk_size: int = UPLOAD_CHUNK_SIZE) -> Iterable[bytes]:
+        position = 0
+        while True:
+            chunk = self._read_at(position, chunk_size)
+            if not chunk:
+                return
+            position += len(chunk)
+            yield chunk
+
+    def _read_at(self, position: int, size: int) -> bytes:
+        with self._lock:
+            self.spool.seek(position)
+            return self.spool.read(size)
+
+    def data_url(self) -> str:
+        """data: URL for the provider payload, built with a single full-size intermediate
+
+        The base64 text is written chunk by chunk into a preallocated buffer
+        after the header and decoded to str once. The raw bytes, a separate
+        base64 bytes object and an f-string copy are never all held at once.
+        """
+        header = f"data:{self.content_type};base64,".encode("ascii")
+        encoded_size = 4 * ((self.size + 2) // 3)
+        buffer = bytearray(len(header) + encoded_size)
+        buffer[:len(header)] = header
+        position = len(header)
+        for chunk in self.chunks(UPLOAD_ENCODE_CHUNK_SIZE):
+            encoded = binascii.b2a_base64(chunk, newline=False)
+            buffer[position:position + len(encoded)] = encoded
+            position += len(encoded)
+        return buffer.decode("ascii")
+
+    def retain(self) -> "IngestedUpload":
+        """Take another reference; the holder calls close() when it is done"""
+        with self._lock:
+            if self._references == 0:
+                raise ValueError("Upload is already closed")
+            self._references += 1
+        return self
+
+    def close(self):
+        """Drop a reference, closing the spool with the last one"""
+        with self._lock:
+            if self._references == 0:
+                return
+            self._references -= 1
+            if self._references == 0:
+                self.spool.close()
+
+
+class _SpoolReader(io.RawIOBase):
+    """Read-only view of an upload's spool with its own position"""
+
+    def __init__(self, upload: IngestedUpload):
+        self._upload = upload
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._upload._read_at(self._position, len(buffer))
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._upload.size
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        self._position = offset
+        return offset
+
+    def tell(self) -> int:
+        return self._position
+
+
+async def release_after(upload: Optional[IngestedUpload], awaitable: Awaitable[T]) -> T:
+    """Await, then drop a reference to upload taken beforehand with retain()"""
+    try:
+        return await awaitable
+    finally:
+        if upload is not None:
+            upload.close()
+
+
+def upload_image_type(content_type: Optional[str]) -> str:
+    """The declared image type if it is one providers accept, otherwise image/jpeg
+
+    The type comes from the client and ends up in the data URL, so anything
+    else, including non-ASCII text, is not passed on.
+    """
+    media_type = (content_type or "").split(";", 1)[0].strip().lower()
+    return media_type if media_type in UPLOAD_IMAGE_TYPES else "image/jpeg"
+
+
+async def ingest_upload(upload: UploadFile, max_size: Optional[int] = None) -> IngestedUpload:
+    """Take over an upload's spool, hashing it and enforcing the size limit as it is read
+
+    Starlette has already spooled the file part, in memory or on disk by
+    size, so it is kept rather than copied. The UploadFile is left holding
+    an empty buffer in its place, which is what gets closed with the
+    request form.
+    """
+    max_size = max_size or settings.max_file_size
+    hasher = hashlib.blake2b(digest_size=16)
+    size = 0
+    await upload.seek(0)
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_size:
+            raise UploadTooLarge(max_size)
+        hasher.update(chunk)
+
+    spool, upload.file = upload.file, io.BytesIO()
+    # Same digest as request_coalescer.content_hash over the whole upload
+    return IngestedUpload(spool, size, hasher.hexdigest(), upload_image_type(upload.content_type))
+
+
+def open_file_upload(path: str, content_type: Optional[str] = None) -> IngestedUpload:
+    """An image on disk as an IngestedUpload, e.g. for batch jobs; the caller closes it"""
+    content_type = content_type or mimetypes.guess_type(path)[0] or "image/jpeg"
+    f = open(path, "rb")
+    return IngestedUpload(f, os.fstat(f.fileno()).st_size, "", content_type)
+
+
+class UploadSizeLimitMiddleware:
+    """Reject oversized upload bodies while they stream in, before they are spooled
+
+    A declared Content-Length over the limit is refused straight away, and a
+    malformed one with 400; otherwise the body is counted as it is received and parsing stops with
+    413 once it exceeds the limit.
+    """
+
+    def __init__(self, app, paths: Iterable[str], max_body_size: Optional[int] = None):
+        self.app = app
+        self.paths = set(paths)
+        self.max_body_size = max_body_size or settings.max_file_size + UPLOAD_FORM_OVERHEAD
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and not content_length.isdigit():
+            response = JSONResponse({"detail": "Invalid Content-Length header"}, status_code=400)
+            await response(scope, receive, send)
+            return
+        if content_length is not None and int(content_length) > self.max_body_size:
+            error = UploadTooLarge(settings.max_file_size)
+            response = JSONResponse({"detail": error.detail}, status_code=error.status_code)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    # Raised inside form parsing; FastAPI passes HTTPExceptions through as-is
+                    raise UploadTooLarge(settings.max_file_size)
+            return message
+
+        await self.app(scope, limited_receive, send)
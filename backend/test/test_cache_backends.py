@@ -0,0 +1,151 @@
+import asyncio
+
+from services import cache_service as cache_module
+from services.cache_backends import MemoryCacheBackend
+from services.cache_service import CacheService
+
+
+def test_memory_backend_serves_entries_beyond_l1():
+    cache = CacheService(backend=MemoryCacheBackend())
+
+    async def run():
+        await cache.aset("detect", "hash", {"data": "boxes"}, ttl_hours=1)
+        # Simulate another worker: its L1 is empty, so the read reaches the backend
+        cache.local_cache.clear()
+        cached = await cache.aget("detect", "hash")
+        removed = await cache.aclear_service_cache("detect")
+        cache.local_cache.clear()
+        return cached, removed, await cache.aget("detect", "hash"), await cache.aget_cache_stats()
+
+    cached, removed, after_clear, stats = asyncio.run(run())
+
+    assert cached["result"] == {"data": "boxes"}
+    assert removed == 1
+    assert after_clear is None
+    assert stats["backend"] == "memory"
+    assert stats["tiers"]["l2"]["hits"] == 1
+    assert stats["tiers"]["l2"]["sets"] == 1
+
+
+def test_reconnects_to_redis_when_it_returns(monkeypatch):
+    attempts = []
+
+    class FlakyRedisBackend(MemoryCacheBackend):
+        name = "redis"
+
+        def __init__(self, redis_url):
+            attempts.append(redis_url)
+            if len(attempts) < 2:
+                raise ConnectionError("redis is down")
+            super().__init__()
+
+    monkeypatch.setattr(cache_module, "RedisCacheBackend", FlakyRedisBackend)
+    monkeypatch.setattr(cache_module, "CACHE_BACKEND", "redis")
+    monkeypatch.setattr(cache_module, "CACHE_REDIS_RECONNECT_SECONDS", 0.01)
+
+    cache = CacheService()
+    assert cache.backend_name == "memory"
+    assert cache.backend_stats["fallbacks"] == 1
+
+    async def run():
+        await cache.start()
+        await asyncio.wait_for(cache._reconnect_task, 1)
+
+    asyncio.run(run())
+
+    assert isinstance(cache.backend, FlakyRedisBackend)
+    assert cache.backend_stats["reconnects"] == 1
+
+
+def test_per_service_counters_are_batched_and_report_saved_time():
+    backend = MemoryCacheBackend()
+    cache = CacheService(backend=backend)
+
+    async def run():
+        result = {"success": True, "data": {"class": "cat"}, "processing_time": 1200.0}
+        await cache.aset("classify", "img", result, ttl_hours=1)
+        await cache.aget("classify", "img")
+        await cache.aget("chat", "unseen")
+        # Nothing has been flushed yet, but the stats include pending updates
+        assert backend.metrics == {}
+        pending_stats = await cache.aget_cache_stats()
+        await cache.aflush_metrics()
+        return pending_stats, await cache.aget_cache_stats()
+
+    pending_stats, flushed_stats = asyncio.run(run())
+
+    for stats in (pending_stats, flushed_stats):
+        classify = stats["services"]["classify"]
+        assert classify["tiers"]["l1"]["hits"] == 1
+        assert classify["saved_ms"] == 1200.0
+        assert classify["payload_bytes"]["count"] == 1
+        assert stats["services"]["chat"]["misses"] == 1
+        assert stats["hits"] == 1 and stats["misses"] == 1
+    assert backend.metrics["classify:l1:hits"] == 1
+
+
+def test_redis_tag_index_prunes_expired_members(monkeypatch):
+    import fakeredis
+    from services import cache_backends
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(cache_backends.redis, "from_url", lambda url, **kwargs: fakeredis.FakeRedis(server=server))
+    monkeypatch.setattr(
+        cache_backends.aioredis, "Redis",
+        lambda connection_pool: fakeredis.aioredis.FakeRedis(server=server)
+    )
+    backend = cache_backends.RedisCacheBackend("redis://fake")
+    clock = [1000.0]
+    monkeypatch.setattr(cache_backends.time, "time", lambda: clock[0])
+    tag_key = f"{cache_backends.CACHE_TAG_PREFIX}service:detect"
+
+    backend.set("short", b"1", 10, ["service:detect"], 3600)
+    backend.set("long", b"2", 100, ["service:detect"], 3600)
+    clock[0] += 50
+    backend.set("new", b"3", 100, ["service:detect"], 3600)
+    # "short" expired before the last write, so the index dropped it
+    assert {member for member, _ in backend.redis_client.zscan_iter(tag_key)} == {b"long", b"new"}
+
+    async def invalidate():
+        return await backend.adelete_tag("service:detect")
+
+    assert asyncio.run(invalidate()) == 2
+    assert backend.redis_client.exists(tag_key) == 0
+
+
+def test_expired_lock_holder_cannot_release_the_next_holders_lock(monkeypatch):
+    import fakeredis
+    from services import cache_backends
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(cache_backends.redis, "from_url", lambda url, **kwargs: fakeredis.FakeRedis(server=server))
+    monkeypatch.setattr(
+        cache_backends.aioredis, "Redis",
+        lambda connection_pool: fakeredis.aioredis.FakeRedis(server=server)
+    )
+    redis_backend = cache_backends.RedisCacheBackend("redis://fake")
+    memory_backend = MemoryCacheBackend()
+
+    def expire_memory_lock():
+        _, token = memory_backend._locks["refresh:key"]
+        memory_backend._locks["refresh:key"] = (0, token)
+
+    async def scenario(backend, expire):
+        first = await backend.aacquire_lock("refresh:key", 30)
+        blocked = await backend.aacquire_lock("refresh:key", 30)
+        # The first holder's refresh outlives the TTL and another worker takes over
+        expire()
+        second = await backend.aacquire_lock("refresh:key", 30)
+        await backend.arelease_lock("refresh:key", first)
+        still_held = await backend.aacquire_lock("refresh:key", 30) is None
+        await backend.arelease_lock("refresh:key", second)
+        return first, blocked, second, still_held, await backend.aacquire_lock("refresh:key", 30)
+
+    for backend, expire in (
+        (redis_backend, lambda: redis_backend.redis_client.delete("refresh:key")),
+        (memory_backend, expire_memory_lock)
+    ):
+        first, blocked, second, still_held, after_release = asyncio.run(scenario(backend, expire))
+        assert first and blocked is None and second and first != second
+        assert still_held
+        assert after_release is not None
@@ -0,0 +1,26 @@
+import json
+
+from services import cache_codec
+
+
+def test_round_trip_small_entry_is_not_compressed():
+    value = {"result": {"class": "cat", "confidence": 0.9}, "ttl_hours": 24}
+    data = cache_codec.encode(value)
+
+    assert data[0] == cache_codec.CODEC_VERSION
+    assert not data[1] & cache_codec.FLAG_COMPRESSED
+    assert cache_codec.decode(data) == value
+
+
+def test_large_entry_is_compressed_and_smaller_than_json():
+    value = {"segments": [{"name": "background", "mask": "polygon(0% 0%, 100% 0%)", "confidence": 0.95}] * 200}
+    data = cache_codec.encode(value)
+
+    assert data[1] & cache_codec.FLAG_COMPRESSED
+    assert len(data) < len(json.dumps(value))
+    assert cache_codec.decode(data) == value
+
+
+def test_decodes_legacy_json_entries():
+    legacy = json.dumps({"result": {"response": "hi"}, "cached_at": "0"}).encode()
+    assert cache_codec.decode(legacy)["result"] == {"response": "hi"}
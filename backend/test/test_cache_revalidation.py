@@ -0,0 +1,52 @@
+import asyncio
+
+from services.cache_service import CacheService
+
+
+def make_cache():
+    cache = CacheService()
+    # Exercise the in-process tier only
+    cache.is_available = False
+    return cache
+
+
+def test_stale_entry_is_served_while_one_refresh_runs():
+    cache = make_cache()
+    refreshes = []
+
+    async def run():
+        # Fresh for 0 hours, so the entry is immediately inside its staleness window
+        await cache.aset("classify", "hash", {"data": "old"}, ttl_hours=0, stale_hours=1)
+
+        async def refresh():
+            refreshes.append(1)
+            await asyncio.sleep(0.01)
+            await cache.aset("classify", "hash", {"data": "new"}, ttl_hours=1, stale_hours=1)
+
+        results = await asyncio.gather(*(
+            cache.aget("classify", "hash", refresh=refresh) for _ in range(5)
+        ))
+        await asyncio.sleep(0.02)
+        return results, await cache.aget("classify", "hash", refresh=refresh)
+
+    stale_results, refreshed = asyncio.run(run())
+
+    assert len(refreshes) == 1
+    assert all(result["stale"] and result["result"] == {"data": "old"} for result in stale_results)
+    assert refreshed["result"] == {"data": "new"}
+    assert "stale" not in refreshed
+    assert cache.revalidation_stats["stale_served"] == 5
+    assert cache.revalidation_stats["refreshes_started"] == 1
+
+
+def test_fresh_entry_does_not_trigger_refresh():
+    cache = make_cache()
+
+    async def refresh():
+        raise AssertionError("fresh entries must not be refreshed")
+
+    async def run():
+        await cache.aset("chat", "hash", {"data": "hi"}, ttl_hours=1, stale_hours=1)
+        return await cache.aget("chat", "hash", refresh=refresh)
+
+    assert asyncio.run(run())["result"] == {"data": "hi"}
@@ -0,0 +1,57 @@
+import asyncio
+import os
+
+os.environ.setdefault("TOGETHER_API_KEY", "test-key")
+
+from services import cache_warmer as warmer_module
+from services.cache_backends import MemoryCacheBackend
+from services.cache_service import CacheService
+from services.cache_warmer import CacheWarmer
+from services.storage import MemoryStorage
+
+
+def test_warms_most_frequent_prompts_within_budget(monkeypatch):
+    cache = CacheService(backend=MemoryCacheBackend())
+    monkeypatch.setattr(warmer_module, "cache_service", cache)
+    calls = []
+
+    async def generate(prompt, parameters):
+        calls.append(prompt)
+        return {"success": True, "data": {"url": f"https://img/{prompt}"}, "processing_time": 10.0}
+
+    monkeypatch.setitem(
+        warmer_module.WARMABLE_SERVICES, "generate",
+        (warmer_module._generate_input_hash, generate)
+    )
+
+    storage = MemoryStorage()
+    warmer = CacheWarmer()
+    warmer.storage = storage
+
+    async def run():
+        for prompt, times in (("a cat", 3), ("a dog", 2), ("a fish", 1)):
+            for _ in range(times):
+                job = await storage.create_ai_job({"service_type": "generate", "prompt": prompt, "parameters": {}})
+                await storage.update_ai_job(job.id, {"status": "completed"})
+        # Already cached, so it must not cost an upstream call
+        await cache.aset("generate", warmer_module._generate_input_hash("a dog"), {"success": True}, {})
+
+        # Probing the cache for candidates must not show up in the hit/miss analytics
+        monkeypatch.setattr(cache, "_record_lookup", lambda *args, **kwargs: lookups.append(args))
+        warmer.start(source="memory", top_n=3, max_calls=1, rate_per_minute=600)
+        await warmer.wait()
+        recorded = len(lookups)
+        return recorded, await cache.aget("generate", warmer_module._generate_input_hash("a cat"), {})
+
+    lookups = []
+    recorded, cached = asyncio.run(run())
+
+    progress = warmer.get_progress()
+    assert calls == ["a cat"]
+    assert recorded == 0
+    assert cached["result"]["data"]["url"] == "https://img/a cat"
+    assert progress["state"] == "completed"
+    assert progress["candidates"] == 3
+    assert progress["warmed"] == 1
+    assert progress["already_cached"] == 1
+    assert progress["budget_exhausted"] is True
@@ -0,0 +1,120 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+os.environ.setdefault("TOGETHER_API_KEY", "test-key")
+
+from services.ai_services import AIServiceManager, ProviderLimit
+
+
+class FakeStream:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for token in self.tokens:
+            await asyncio.sleep(0)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
+    async def close(self):
+        self.closed = True
+
+
+def make_service(stream):
+    async def create(**kwargs):
+        assert kwargs["stream"] is True
+        return stream
+
+    service = AIServiceManager()
+    service.together_client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+    return service
+
+
+def test_stream_relays_tokens_and_closes_upstream():
+    stream = FakeStream(["Hel", "lo", None, "!"])
+    service = make_service(stream)
+
+    async def run():
+        result = await service.chat_completion([{"role": "user", "content": "hi"}], stream=True)
+        return [token async for token in result["data"]["stream"]]
+
+    assert asyncio.run(run()) == ["Hel", "lo", "!"]
+    assert stream.closed
+    assert service.get_provider_stats()["together"]["in_flight"] == 0
+
+
+def test_cancelled_stream_closes_upstream_and_releases_slot():
+    stream = FakeStream(["a", "b", "c"])
+    service = make_service(stream)
+
+    async def run():
+        result = await service.chat_completion([{"role": "user", "content": "hi"}], stream=True)
+        tokens = result["data"]["stream"]
+        assert await tokens.__anext__() == "a"
+        await tokens.aclose()
+
+    asyncio.run(run())
+    assert stream.closed
+    assert service.get_provider_stats()["together"]["in_flight"] == 0
+
+
+def test_chat_holds_one_provider_slot_and_counts_waiters():
+    limit = ProviderLimit(1)
+
+    async def create(**kwargs):
+        await asyncio.sleep(0.01)
+        stats = service.get_provider_stats()["together"]
+        seen.append((stats["in_flight"], stats["waiting"]))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))])
+
+    seen = []
+    service = AIServiceManager()
+    service.provider_limits = {"together": limit}
+    service.together_client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+
+    async def run():
+        messages = [{"role": "user", "content": "hi"}]
+        # With a limit of 1 a second nested acquire would deadlock here
+        return await asyncio.wait_for(
+            asyncio.gather(service.chat_completion(messages), service.chat_completion(messages)), 1
+        )
+
+    results = asyncio.run(run())
+    assert [result["data"]["response"] for result in results] == ["ok", "ok"]
+    assert seen == [(1, 1), (1, 0)]
+    assert (limit.in_flight, limit.waiting) == (0, 0)
+
+
+def test_stream_closed_before_first_token_releases_slot():
+    class FailingStream(FakeStream):
+        async def _iterate(self):
+            raise RuntimeError("upstream reset")
+            yield
+
+    abandoned, failing = FakeStream(["a"]), FailingStream([])
+    service = make_service(abandoned)
+
+    async def run():
+        # A client that disconnects before the response starts never iterates
+        result = await service.chat_completion([{"role": "user", "content": "hi"}], stream=True)
+        await result["data"]["stream"].aclose()
+        await result["data"]["stream"].aclose()
+
+        service.together_client.chat.completions.create = lambda **kwargs: asyncio.sleep(0, failing)
+        result = await service.chat_completion([{"role": "user", "content": "hi"}], stream=True)
+        try:
+            await result["data"]["stream"].__anext__()
+        except RuntimeError:
+            pass
+
+    asyncio.run(run())
+    assert abandoned.closed and failing.closed
+    assert service.get_provider_stats()["together"]["in_flight"] == 0
@@ -0,0 +1,45 @@
+import asyncio
+
+import httpx
+
+from services.http_transport import HTTPTransportService
+
+
+def test_stats_count_requests_and_survive_an_uninspectable_pool():
+    async def scenario():
+        transport = HTTPTransportService()
+        client = transport.get_client("together")
+        # A pool without httpcore internals, as a future httpx might have
+        transport._transports["together"].pool = httpx.MockTransport(lambda request: httpx.Response(200))
+        await client.get("https://api.together.xyz/")
+
+        failing = transport.get_client("openai")
+        transport._transports["openai"].pool = httpx.MockTransport(
+            lambda request: (_ for _ in ()).throw(httpx.ConnectError("refused"))
+        )
+        try:
+            await failing.get("https://api.openai.com/")
+        except httpx.ConnectError:
+            pass
+        stats = transport.get_transport_stats()["pools"]
+        await transport.close()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["together"]["total_requests"] == 1
+    assert stats["together"]["connections"] == "unavailable"
+    # A failed request no longer counts as waiting for a response
+    assert (stats["openai"]["total_requests"], stats["openai"]["awaiting_response"]) == (1, 0)
+
+
+def test_stats_read_connections_from_the_httpcore_pool():
+    async def scenario():
+        transport = HTTPTransportService()
+        transport.get_client("together")
+        stats = transport.get_transport_stats()["pools"]["together"]
+        await transport.close()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["open_connections"] == stats["idle_connections"] == 0
+    assert stats["utilisation"] == 0
@@ -0,0 +1,65 @@
+import asyncio
+import io
+
+import numpy as np
+from PIL import Image
+
+from services.image_preprocessing import ImagePreprocessor
+from services.uploads import IngestedUpload
+
+
+def photo(width: int, height: int, orientation: int = 1, format: str = "JPEG") -> IngestedUpload:
+    rng = np.random.default_rng(0)
+    blocks = rng.integers(0, 255, size=(12, 16, 3), dtype=np.uint8)
+    image = Image.fromarray(blocks).resize((width, height), Image.BILINEAR)
+    exif = Image.Exif()
+    if orientation != 1:
+        exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, format=format, quality=95, exif=exif.tobytes())
+    return IngestedUpload.from_bytes(buffer.getvalue(), f"image/{format.lower()}", "digest")
+
+
+def test_large_upload_is_upright_and_downscaled_for_the_task():
+    preprocessor = ImagePreprocessor()
+    preprocessor.enabled = True
+    # Orientation 6: stored landscape, displayed rotated to portrait
+    upload = photo(3000, 2000, orientation=6)
+
+    async def scenario():
+        calls = []
+
+        async def call(image_url):
+            calls.append(image_url)
+            return {"success": True, "data": {}, "processing_time": 120.0}
+
+        await preprocessor.run("classify", upload, call)
+        return calls
+
+    calls = asyncio.run(scenario())
+    prepared = asyncio.run(preprocessor.prepare("classify", upload))
+
+    assert calls[0].startswith("data:image/jpeg;base64,")
+    with Image.open(prepared.open()) as image:
+        assert image.size == (512, 768)
+        assert image.getexif().get(0x0112, 1) == 1
+    assert prepared.size < upload.size
+    assert prepared.digest == upload.digest
+
+    stats = preprocessor.get_stats()["services"]["classify"]
+    assert stats["resized"] == 2
+    assert stats["bytes_saved"] == 2 * (upload.size - prepared.size)
+    assert stats["upstream"]["preprocessed"] == {"calls": 1, "avg_ms": 120.0}
+
+
+def test_small_jpeg_is_sent_unchanged_and_undecodable_input_passes_through():
+    preprocessor = ImagePreprocessor()
+    preprocessor.enabled = True
+    small = photo(400, 300)
+    garbage = IngestedUpload.from_bytes(b"not an image", "image/jpeg")
+
+    assert asyncio.run(preprocessor.prepare("detect", small)) is small
+    assert asyncio.run(preprocessor.prepare("detect", garbage)) is garbage
+
+    stats = preprocessor.get_stats()["services"]["detect"]
+    assert (stats["unchanged"], stats["errors"], stats["bytes_saved"]) == (1, 1, 0)
@@ -0,0 +1,149 @@
+import asyncio
+
+import fakeredis
+
+from services import job_events as job_events_module
+from services.job_events import JobEventBus
+from services.storage import MemoryStorage
+
+
+def test_storage_publishes_job_lifecycle_to_matching_subscribers():
+    async def scenario():
+        bus = JobEventBus()
+        storage = MemoryStorage(event_bus=bus)
+        with bus.subscribe(lambda event: event["type"].startswith("job.")) as queue:
+            job = await storage.create_ai_job({"service_type": "classify", "status": "pending"})
+            await storage.update_ai_job(job.id, {"status": "processing"})
+            await storage.update_ai_job(job.id, {"status": "completed", "result": {"class": "cat"}})
+            bus.publish("batch.progress", {"id": 1, "user_id": 1})
+            events = [queue.get_nowait() for _ in range(queue.qsize())]
+        return job, events, bus.get_stats()
+
+    job, events, stats = asyncio.run(scenario())
+    assert [event["type"] for event in events] == ["job.created", "job.progress", "job.completed"]
+    # Each event is a summary of the job at the time it was published; the result is fetched separately
+    assert [event["data"]["status"] for event in events] == ["pending", "processing", "completed"]
+    assert events[2]["data"] == {"id": job.id, "user_id": 1, "service_type": "classify", "status": "completed"}
+    assert stats["subscribers"] == 0
+
+
+def test_slow_subscriber_loses_oldest_events_and_stream_formats_frames(monkeypatch):
+    monkeypatch.setattr(job_events_module, "JOB_EVENTS_SUBSCRIBER_BUFFER", 2)
+
+    async def scenario():
+        bus = JobEventBus()
+        with bus.subscribe() as queue:
+            for i in range(3):
+                bus.publish("job.created", {"id": i})
+            kept = [queue.get_nowait()["data"]["id"] for _ in range(2)]
+
+        frames = bus.stream(heartbeat_seconds=0.01)
+        assert await frames.__anext__() == "retry: 3000\n\n"
+        assert await frames.__anext__() == ": keep-alive\n\n"
+        bus.publish("job.failed", {"id": 9})
+        frame = await frames.__anext__()
+        await frames.aclose()
+        return kept, bus.stats["dropped"], frame
+
+    kept, dropped, frame = asyncio.run(scenario())
+    assert kept == [1, 2]
+    assert dropped == 1
+    assert frame == 'event: job.failed\ndata: {"id": 9}\n\n'
+
+
+def test_events_fan_out_to_other_workers_through_redis(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(job_events_module, "JOB_EVENTS_BACKEND", "redis")
+    monkeypatch.setattr(
+        job_events_module.aioredis, "from_url",
+        lambda url: fakeredis.aioredis.FakeRedis(server=server)
+    )
+
+    async def scenario():
+        worker_a, worker_b = JobEventBus(), JobEventBus()
+        worker_a.start()
+        worker_b.start()
+        while worker_a._redis is None or worker_b._redis is None:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+
+        with worker_a.subscribe() as queue_a, worker_b.subscribe() as queue_b:
+            worker_a.publish("job.completed", {"id": 5})
+            received_b = await asyncio.wait_for(queue_b.get(), 2)
+            await asyncio.sleep(0.1)
+            # The publishing worker delivers locally once and ignores its own echo from Redis
+            received_a = [queue_a.get_nowait() for _ in range(queue_a.qsize())]
+
+        await worker_a.stop()
+        await worker_b.stop()
+        return received_a, received_b
+
+    received_a, received_b = asyncio.run(scenario())
+    assert [event["data"] for event in received_a] == [{"id": 5}]
+    assert received_b["type"] == "job.completed" and received_b["data"] == {"id": 5}
+
+
+def test_events_waiting_for_redis_are_bounded(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(job_events_module, "JOB_EVENTS_BACKEND", "redis")
+    monkeypatch.setattr(job_events_module, "JOB_EVENTS_OUTBOX_SIZE", 2)
+    monkeypatch.setattr(
+        job_events_module.aioredis, "from_url",
+        lambda url: fakeredis.aioredis.FakeRedis(server=server)
+    )
+
+    async def scenario():
+        worker_a, worker_b = JobEventBus(), JobEventBus()
+        worker_a.start()
+        worker_b.start()
+        while worker_a._redis is None or worker_b._redis is None:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+
+        with worker_b.subscribe() as queue:
+            # Published without yielding, so nothing leaves the outbox in between
+            for i in range(5):
+                worker_a.publish("job.created", {"id": i})
+            received = [(await asyncio.wait_for(queue.get(), 2))["data"]["id"] for _ in range(2)]
+
+        await worker_a.stop()
+        await worker_b.stop()
+        return received, worker_a.stats["outbox_dropped"]
+
+    received, dropped = asyncio.run(scenario())
+    assert received == [3, 4]
+    assert dropped == 3
+
+
+def test_jobs_relayed_between_workers_keep_distinct_ids(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(job_events_module, "JOB_EVENTS_BACKEND", "redis")
+    monkeypatch.setattr(
+        job_events_module.aioredis, "from_url",
+        lambda url: fakeredis.aioredis.FakeRedis(server=server)
+    )
+
+    async def scenario():
+        bus_a, bus_b = JobEventBus(), JobEventBus()
+        storage_a, storage_b = MemoryStorage(event_bus=bus_a), MemoryStorage(event_bus=bus_b)
+        bus_a.start()
+        bus_b.start()
+        while bus_a._redis is None or bus_b._redis is None:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+
+        with bus_b.subscribe() as queue:
+            # Each worker's first job; with per-worker counters both would be job 1
+            job_a = await storage_a.create_ai_job({"service_type": "classify", "status": "pending"})
+            job_b = await storage_b.create_ai_job({"service_type": "detect", "status": "pending"})
+            events = [await asyncio.wait_for(queue.get(), 2) for _ in range(2)]
+
+        await bus_a.stop()
+        await bus_b.stop()
+        return job_a, job_b, events
+
+    job_a, job_b, events = asyncio.run(scenario())
+    assert job_a.id != job_b.id
+    assert sorted(event["data"]["id"] for event in events) == sorted([job_a.id, job_b.id])
+    assert {event["data"]["id"]: event["data"]["service_type"] for event in events} == {job_a.id: "classify", job_b.id: "detect"}
+    assert max(job_a.id, job_b.id) < 2 ** 53
@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+import pytest
+
+from services.job_queue import JobQueue, JobQueueFull
+from services.storage import MemoryStorage
+
+
+def test_workers_cap_concurrency_and_full_queue_rejects():
+    async def scenario():
+        queue = JobQueue(workers=2, max_size=3)
+        in_flight = {"now": 0, "peak": 0}
+
+        async def job():
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+            await asyncio.sleep(0.01)
+            in_flight["now"] -= 1
+
+        async def broken():
+            raise RuntimeError("boom")
+
+        for run in (job, job, broken):
+            queue.submit(run)
+        with pytest.raises(JobQueueFull):
+            queue.submit(job)
+
+        await queue.join()
+        stats = queue.get_stats()
+        await queue.stop()
+        return in_flight["peak"], stats
+
+    peak, stats = asyncio.run(scenario())
+    assert peak == 2
+    assert (stats["submitted"], stats["completed"], stats["failed"], stats["rejected"]) == (3, 2, 1, 1)
+
+
+def test_long_poll_returns_when_the_job_finishes_or_times_out():
+    async def scenario():
+        storage = MemoryStorage()
+        job = await storage.create_ai_job({"service_type": "generate", "status": "pending"})
+
+        async def finish():
+            await asyncio.sleep(0.05)
+            await storage.update_ai_job(job.id, {"status": "completed", "result": {"url": "x"}})
+
+        start = time.monotonic()
+        asyncio.create_task(finish())
+        completed = await storage.wait_for_ai_job(job.id, timeout=5)
+        waited = time.monotonic() - start
+
+        other = await storage.create_ai_job({"service_type": "generate", "status": "pending"})
+        timed_out = await storage.wait_for_ai_job(other.id, timeout=0.05)
+        return completed, waited, timed_out
+
+    completed, waited, timed_out = asyncio.run(scenario())
+    assert completed.status == "completed"
+    assert waited < 1
+    assert timed_out.status == "pending"
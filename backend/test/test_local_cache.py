@@ -0,0 +1,49 @@
+import time
+
+from services.local_cache import LocalLRUCache
+
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = LocalLRUCache(max_bytes=100)
+    cache.set("a", {"v": 1}, 40)
+    cache.set("b", {"v": 2}, 40)
+    assert cache.get("a") == {"v": 1}
+
+    # "b" is now least recently used and must make room
+    cache.set("c", {"v": 3}, 40)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    assert cache.get("c") == {"v": 3}
+    stats = cache.get_stats()
+    assert stats["bytes"] == 80
+    assert stats["evictions"] == 1
+
+
+def test_rejects_entries_larger_than_the_tier():
+    cache = LocalLRUCache(max_bytes=10)
+    assert not cache.set("big", "x" * 20, 20)
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_entries_expire_after_ttl():
+    cache = LocalLRUCache(max_bytes=100, max_ttl_seconds=0.01)
+    cache.set("a", "value", 5, ttl_seconds=3600)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    stats = cache.get_stats()
+    assert stats["expirations"] == 1
+    assert stats["bytes"] == 0
+
+
+def test_delete_tag_only_removes_tagged_entries():
+    cache = LocalLRUCache(max_bytes=100)
+    cache.set("a", 1, 10, tags=["user:1", "service:chat"])
+    cache.set("b", 2, 10, tags=["user:2", "service:chat"])
+
+    assert cache.delete_tag("user:1") == 1
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.delete_tag("service:chat") == 1
+    assert cache.get_stats()["bytes"] == 0
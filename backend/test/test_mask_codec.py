@@ -0,0 +1,84 @@
+import numpy as np
+
+from services.mask_codec import (
+    compact_segments,
+    decode_rle,
+    encode_rle,
+    pack_binary,
+    pack_runs,
+    render_segments,
+    rle_to_mask,
+    unpack_binary,
+    unpack_runs
+)
+
+
+def test_rle_round_trips_masks_including_edge_cases():
+    rng = np.random.default_rng(3)
+    masks = [
+        rng.random((37, 53)) > 0.7,
+        np.ones((4, 5), dtype=bool),
+        np.zeros((4, 5), dtype=bool)
+    ]
+    for mask in masks:
+        runs = encode_rle(mask)
+        assert runs.sum() == mask.size
+        assert np.array_equal(decode_rle(unpack_runs(pack_runs(runs)), mask.shape), mask)
+
+    # A mask starting in the foreground leads with an empty background run
+    assert encode_rle(np.array([[1, 1, 0]])).tolist() == [0, 2, 1]
+    runs = np.array([0, 1, 127, 128, 16383, 16384, 2 ** 32 - 1], dtype=np.uint32)
+    assert unpack_runs(pack_runs(runs)).tolist() == runs.tolist()
+
+
+def test_array_masks_are_compacted_and_polygons_rasterised_on_request():
+    array = [[0, 1, 1, 0], [0, 1, 1, 0]]
+    segments = compact_segments([
+        {"name": "cup", "mask": array, "confidence": 0.9},
+        {"name": "sky", "mask": "polygon(0% 0%, 100% 0%, 100% 50%, 0% 50%)", "confidence": 0.8},
+        {"name": "floor", "mask": "lower third of the image", "confidence": 0.7}
+    ])
+
+    assert "mask" not in segments[0]
+    assert np.array_equal(rle_to_mask(segments[0]["rle"]), np.array(array, dtype=bool))
+
+    rendered = render_segments(segments, "rle", grid=(10, 20))
+    sky = rle_to_mask(rendered[1]["rle"])
+    assert sky.shape == (10, 20)
+    assert sky[:4].all() and not sky[6:].any()
+    assert rendered[2]["mask"] == "lower third of the image"
+
+
+def test_default_format_returns_masks_as_the_provider_gave_them():
+    provider_segments = [
+        {"name": "cup", "mask": [[0, 1, 1, 0], [0, 1, 1, 0]], "confidence": 0.9},
+        {"name": "lid", "mask": "[[1, 0], [0, 1]]", "confidence": 0.85},
+        {"name": "sky", "mask": "polygon(0% 0%, 100% 0%, 100% 50%, 0% 50%)", "confidence": 0.8},
+        {"name": "floor", "mask": "lower third of the image", "confidence": 0.7}
+    ]
+
+    rendered = render_segments(compact_segments(provider_segments), "polygon", grid=(10, 20))
+
+    assert rendered[0] == provider_segments[0]
+    assert rendered[1]["mask"] == "[[1, 0], [0, 1]]"
+    assert rendered[2:] == provider_segments[2:]
+    assert all(set(segment) == {"name", "mask", "confidence"} for segment in rendered)
+    # Requesting rle drops the text marker too
+    assert set(render_segments(compact_segments(provider_segments), "rle")[1]) == {"name", "rle", "confidence"}
+
+
+def test_binary_payload_round_trips():
+    mask = np.zeros((8, 8), dtype=bool)
+    mask[2:5, 3:7] = True
+    segments = render_segments(
+        compact_segments([{"name": "box", "mask": mask.astype(int).tolist(), "confidence": 0.5},
+                          {"name": "note", "mask": "unparsed", "confidence": 0.4}]),
+        "binary"
+    )
+
+    header, masks = unpack_binary(pack_binary({"job_id": 7}, segments))
+
+    assert header["job_id"] == 7
+    assert header["segments"][0]["rle"]["size"] == [8, 8]
+    assert np.array_equal(masks[0], mask)
+    assert masks[1] is None and header["segments"][1]["mask"] == "unparsed"
@@ -0,0 +1,54 @@
+import asyncio
+import os
+
+import httpx
+import openai
+
+os.environ.setdefault("TOGETHER_API_KEY", "test-key")
+
+from services.ai_services import deterministic_error_code
+from services.cache_backends import MemoryCacheBackend
+from services.cache_service import CacheService
+
+
+def provider_error(error_class, status_code: int, message: str):
+    request = httpx.Request("POST", "https://api.together.xyz/v1/chat/completions")
+    return error_class(message, response=httpx.Response(status_code, request=request), body=None)
+
+
+def test_only_deterministic_provider_errors_are_classified():
+    assert deterministic_error_code(
+        provider_error(openai.BadRequestError, 400, "Your request was rejected by our safety system")
+    ) == "policy_rejection"
+    assert deterministic_error_code(
+        provider_error(openai.BadRequestError, 400, "Unsupported image format: image/tiff")
+    ) == "unsupported_format"
+    assert deterministic_error_code(
+        provider_error(openai.RateLimitError, 429, "Rate limit exceeded")
+    ) is None
+    assert deterministic_error_code(
+        provider_error(openai.InternalServerError, 503, "invalid image")
+    ) is None
+    assert deterministic_error_code(provider_error(openai.BadRequestError, 400, "model not found")) is None
+    assert deterministic_error_code(TimeoutError()) is None
+
+
+def test_negative_hits_count_avoided_upstream_calls():
+    cache = CacheService(backend=MemoryCacheBackend())
+    failure = {
+        "success": False,
+        "error": "Image classification failed: Unsupported image format",
+        "error_code": "unsupported_format",
+        "processing_time": 80.0
+    }
+
+    async def run():
+        await cache.aset_negative("classify", "img", failure)
+        hits = [await cache.aget("classify", "img") for _ in range(3)]
+        return hits, await cache.aget_cache_stats()
+
+    hits, stats = asyncio.run(run())
+
+    assert all(hit["result"] == failure for hit in hits)
+    assert stats["negative_hits"] == 3
+    assert stats["services"]["classify"]["negative"] == {"hits": 3, "sets": 1}
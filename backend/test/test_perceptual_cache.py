@@ -0,0 +1,85 @@
+import asyncio
+import io
+
+import numpy as np
+from PIL import Image
+
+from services import perceptual_cache as perceptual_module
+from services.perceptual_cache import PerceptualHashCache, hamming_distances
+from services.similarity_index import estimate_entry_bytes
+
+
+def encode(image: Image.Image, size=None, quality=95) -> bytes:
+    if size:
+        image = image.resize(size)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def gradient_image(seed: int) -> Image.Image:
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, 255, size=(8, 8, 3), dtype=np.uint8)
+    return Image.fromarray(blocks).resize((256, 256), Image.BILINEAR)
+
+
+def test_hamming_distances_counts_differing_bits():
+    hashes = np.array([0, 0xFF, 2 ** 64 - 1], dtype=np.uint64)
+    assert hamming_distances(hashes, 0).tolist() == [0, 8, 64]
+
+
+def test_recompressed_resized_upload_reuses_result():
+    cache = PerceptualHashCache()
+    cache.enabled = True
+    result = {"success": True, "data": {"class": "cat"}, "processing_time": 900.0}
+    original = gradient_image(1)
+
+    async def scenario():
+        fingerprint = await cache.fingerprint(encode(original))
+        cache.add("classify", fingerprint, result, ttl_hours=1, namespace="hf=0")
+
+        reupload = await cache.fingerprint(encode(original, size=(180, 180), quality=60))
+        other = await cache.fingerprint(encode(gradient_image(2)))
+        return (
+            cache.get("classify", reupload, namespace="hf=0"),
+            cache.get("classify", reupload, namespace="hf=1"),
+            cache.get("classify", other, namespace="hf=0")
+        )
+
+    hit, other_params, unrelated = asyncio.run(scenario())
+
+    assert hit["result"] == result
+    assert hit["distance"] <= cache.max_distance
+    assert other_params is None
+    assert unrelated is None
+    assert cache.get_stats()["services"]["classify"]["saved_ms"] == 900.0
+
+
+def test_undecodable_upload_skips_the_tier():
+    cache = PerceptualHashCache()
+    assert asyncio.run(cache.fingerprint(b"not an image")) is None
+    assert cache.get("detect", None) is None
+    assert cache.get_stats()["hash_errors"] == 1
+
+
+
+def test_byte_budget_drops_the_oldest_results(monkeypatch):
+    entry_bytes = estimate_entry_bytes({"result": {"success": True, "data": "0" * 100}})
+    monkeypatch.setattr(perceptual_module, "PERCEPTUAL_CACHE_MAX_BYTES", 2 * entry_bytes + 10)
+    cache = PerceptualHashCache()
+    cache.enabled = True
+
+    async def scenario():
+        fingerprints = [await cache.fingerprint(encode(gradient_image(seed))) for seed in range(4)]
+        for i, fingerprint in enumerate(fingerprints):
+            cache.add("classify", fingerprint, {"success": True, "data": str(i) * 100}, ttl_hours=1)
+        # A result bigger than the whole budget is not cached
+        cache.add("classify", fingerprints[0], {"success": True, "data": "x" * 1000}, ttl_hours=1)
+        return fingerprints
+
+    fingerprints = asyncio.run(scenario())
+
+    assert [cache.get("classify", fingerprint) is not None for fingerprint in fingerprints] == [False, False, True, True]
+    stats = cache.get_stats()["services"]["classify"]
+    assert stats["entries"] == 2 and stats["adds"] == 4 and stats["evicted"] == 2
+    assert stats["bytes"] == 2 * entry_bytes
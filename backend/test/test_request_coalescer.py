@@ -0,0 +1,65 @@
+import asyncio
+
+from services.request_coalescer import RequestCoalescer, content_hash
+
+
+def test_identical_requests_share_one_upstream_call():
+    coalescer = RequestCoalescer()
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"success": True, "data": {"class": "cat"}}
+
+    async def run():
+        key = coalescer.make_key("classify", content_hash(b"image"), {"use_hugging_face": False})
+        return await asyncio.gather(*(coalescer.run(key, upstream) for _ in range(5)))
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert all(result["data"]["class"] == "cat" for result, _ in results)
+    assert [coalesced for _, coalesced in results].count(False) == 1
+    stats = coalescer.get_stats()
+    assert stats["upstream_calls"] == 1
+    assert stats["coalesced"] == 4
+    assert stats["in_flight"] == 0
+
+
+def test_different_parameters_are_not_coalesced():
+    coalescer = RequestCoalescer()
+
+    async def upstream():
+        await asyncio.sleep(0)
+        return {"success": True}
+
+    async def run():
+        image_hash = content_hash(b"image")
+        await asyncio.gather(
+            coalescer.run(coalescer.make_key("detect", image_hash, {"use_hugging_face": True}), upstream),
+            coalescer.run(coalescer.make_key("detect", image_hash, {"use_hugging_face": False}), upstream)
+        )
+
+    asyncio.run(run())
+    assert coalescer.get_stats()["upstream_calls"] == 2
+
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+    coalescer = RequestCoalescer()
+
+    async def upstream():
+        await asyncio.sleep(0.02)
+        return {"success": True}
+
+    async def run():
+        key = coalescer.make_key("segment", content_hash(b"image"))
+        first = asyncio.ensure_future(coalescer.run(key, upstream))
+        second = asyncio.ensure_future(coalescer.run(key, upstream))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    result, coalesced = asyncio.run(run())
+    assert result == {"success": True}
+    assert coalesced
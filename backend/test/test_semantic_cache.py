@@ -0,0 +1,46 @@
+import asyncio
+
+from services.semantic_cache import HashingEmbedder, SemanticCache
+
+
+def make_cache() -> SemanticCache:
+    cache = SemanticCache()
+    cache.enabled = True
+    cache._embedder = HashingEmbedder()
+    return cache
+
+
+def test_near_identical_prompt_hits_within_namespace():
+    cache = make_cache()
+    result = {"success": True, "data": {"url": "https://img/1"}, "processing_time": 1500.0}
+
+    async def scenario():
+        await cache.add("generate", "a cat", result, ttl_hours=1, namespace="params-a")
+        hit = await cache.get("generate", "A cat.", namespace="params-a")
+        other_params = await cache.get("generate", "A cat.", namespace="params-b")
+        unrelated = await cache.get("generate", "a red sports car", namespace="params-a")
+        return hit, other_params, unrelated
+
+    hit, other_params, unrelated = asyncio.run(scenario())
+
+    assert hit["result"] == result
+    assert hit["similarity"] > 0.99
+    assert other_params is None
+    assert unrelated is None
+
+    stats = cache.get_stats()["services"]["generate"]
+    assert stats["lookups"] == 3
+    assert stats["hits"] == 1
+    assert stats["saved_ms"] == 1500.0
+
+
+def test_disabled_cache_is_a_no_op():
+    cache = SemanticCache()
+    cache.enabled = False
+
+    async def scenario():
+        await cache.add("chat", "hello", {"success": True}, ttl_hours=1)
+        return await cache.get("chat", "hello")
+
+    assert asyncio.run(scenario()) is None
+    assert cache.get_stats()["services"]["chat"]["adds"] == 0
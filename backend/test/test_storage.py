@@ -0,0 +1,176 @@
+import asyncio
+import json
+from datetime import timedelta
+
+from services.storage import MemoryStorage
+
+
+def test_indexed_queries_return_each_users_records_in_time_order():
+    async def scenario():
+        storage = MemoryStorage()
+        for i in range(9):
+            user_id = i % 3 + 1
+            await storage.create_ai_job({"user_id": user_id, "service_type": "generate", "prompt": str(i)})
+            await storage.create_chat_message({"user_id": user_id, "role": "user", "content": str(i)})
+
+        recent = await storage.get_recent_ai_jobs(4)
+        by_user = await storage.get_ai_jobs_by_user(2)
+        latest_for_user = await storage.get_ai_jobs_by_user(2, limit=2)
+        history = await storage.get_chat_history(3, limit=2)
+        await storage.clear_chat_history(3)
+        cleared = await storage.get_chat_history(3)
+        return recent, by_user, latest_for_user, history, cleared, len(storage.chat_messages)
+
+    recent, by_user, latest_for_user, history, cleared, remaining = asyncio.run(scenario())
+    assert [job.prompt for job in recent] == ["8", "7", "6", "5"]
+    assert [job.prompt for job in by_user] == ["7", "4", "1"]
+    assert [job.prompt for job in latest_for_user] == ["7", "4"]
+    # Chat history reads oldest first, as the provider expects the conversation
+    assert [msg.content for msg in history] == ["5", "8"]
+    assert cleared == []
+    assert remaining == 6
+
+
+def test_retention_evicts_oldest_finished_jobs_and_spills_them(monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    import database
+    from models.database import AIRequest, Base
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=engine))
+
+    async def scenario():
+        storage = MemoryStorage(max_jobs=3, max_messages=2, max_age_hours=0, max_bytes=0, spill_to_database=True)
+        in_flight = await storage.create_ai_job({"service_type": "generate", "status": "processing"})
+        for i in range(4):
+            job = await storage.create_ai_job({"service_type": "detect", "prompt": str(i)})
+            await storage.update_ai_job(job.id, {"status": "completed", "result": {"objects": [i]}})
+        for i in range(3):
+            await storage.create_chat_message({"role": "user", "content": str(i)})
+
+        jobs = await storage.get_ai_jobs_by_user(1)
+        history = await storage.get_chat_history(1)
+        await storage.stop()
+        return in_flight, jobs, history, await storage.get_storage_stats()
+
+    in_flight, jobs, history, stats = asyncio.run(scenario())
+    # The running job is kept although it is the oldest
+    assert [job.prompt for job in jobs] == ["3", "2", None]
+    assert jobs[-1].id == in_flight.id
+    assert [msg.content for msg in history] == ["1", "2"]
+    retention = stats["retention"]
+    assert (retention["evicted_jobs"], retention["evicted_messages"], retention["evicted_by_count"]) == (2, 1, 3)
+    assert retention["spilled_jobs"] == 2 and retention["pending_spill"] == 0
+    assert stats["memory"]["estimated_job_bytes"] == sum(len(json.dumps(job.to_dict(), default=str)) for job in jobs)
+
+    db = sessionmaker(bind=engine)()
+    spilled = db.query(AIRequest).order_by(AIRequest.id).all()
+    db.close()
+    assert [(row.prompt, row.status, row.result) for row in spilled] == [
+        ("0", "completed", {"objects": [0]}), ("1", "completed", {"objects": [1]})
+    ]
+
+
+def test_sweep_expires_by_age_and_byte_budget():
+    async def scenario():
+        storage = MemoryStorage(max_jobs=0, max_messages=0, max_age_hours=1, max_bytes=0)
+        jobs = [
+            await storage.create_ai_job({"service_type": "segment", "status": "completed", "result": {"mask": "x" * 1000}})
+            for _ in range(3)
+        ]
+        storage.ai_jobs[jobs[0].id].created_at -= timedelta(hours=2)
+        by_age = storage.sweep()
+
+        storage.max_bytes = storage.job_bytes - 1
+        await storage.create_chat_message({"role": "user", "content": "hi"})
+        return by_age, list(storage.ai_jobs), jobs[2].id, len(storage.chat_messages), storage.retention_stats
+
+    by_age, remaining, newest, messages, stats = asyncio.run(scenario())
+    assert by_age == 1
+    # Over the byte budget, jobs go before chat messages
+    assert remaining == [newest] and messages == 1
+    assert (stats["evicted_by_age"], stats["evicted_by_bytes"]) == (1, 1)
+
+
+def test_finishing_job_is_not_evicted_by_its_own_update():
+    async def scenario():
+        storage = MemoryStorage(max_jobs=1, max_messages=0, max_age_hours=0, max_bytes=0)
+        first = await storage.create_ai_job({"service_type": "generate", "status": "processing"})
+        second = await storage.create_ai_job({"service_type": "generate", "status": "processing"})
+        waiter = asyncio.create_task(storage.wait_for_ai_job(first.id, timeout=5))
+        await asyncio.sleep(0)
+        # Over max_jobs, and the first job is the oldest finished one
+        await storage.update_ai_job(first.id, {"status": "completed", "result": {"url": "x"}})
+        kept = await storage.get_ai_job(first.id)
+        await storage.update_ai_job(second.id, {"status": "completed", "result": {"url": "y"}})
+        return first, kept, await waiter, list(storage.ai_jobs), second.id, storage._job_events
+
+    first, kept, waited, remaining, second_id, events = asyncio.run(scenario())
+    assert kept is first
+    assert waited is first and waited.status.value == "completed"
+    # The next write evicts it as usual
+    assert remaining == [second_id]
+    assert events == {}
+
+
+def test_user_index_skips_jobs_evicted_behind_a_running_one():
+    async def scenario():
+        storage = MemoryStorage(max_jobs=2, max_messages=0, max_age_hours=0, max_bytes=0)
+        running = await storage.create_ai_job({"service_type": "generate", "status": "processing", "prompt": "running"})
+        for i in range(3):
+            await storage.create_ai_job({"service_type": "detect", "status": "completed", "prompt": str(i)})
+        latest = await storage.get_ai_jobs_by_user(1, limit=2)
+        every = await storage.get_ai_jobs_by_user(1)
+
+        await storage.update_ai_job(running.id, {"status": "completed"})
+        await storage.create_ai_job({"service_type": "detect", "status": "completed", "prompt": "3"})
+        return latest, every, await storage.get_ai_jobs_by_user(1), len(storage._jobs_by_user[1])
+
+    latest, every, after, indexed = asyncio.run(scenario())
+    assert [job.prompt for job in latest] == ["2", "running"]
+    assert [job.prompt for job in every] == ["2", "running"]
+    assert [job.prompt for job in after] == ["3", "2"]
+    # Ids evicted behind the running job are trimmed once it goes too
+    assert indexed == 2
+
+
+def test_job_payload_is_only_reserialised_when_it_changes(monkeypatch):
+    from services import storage as storage_module
+
+    estimate = storage_module._estimate_payload_bytes
+    calls = []
+    monkeypatch.setattr(storage_module, "_estimate_payload_bytes", lambda job: calls.append(job.id) or estimate(job))
+
+    async def scenario():
+        storage = MemoryStorage()
+        job = await storage.create_ai_job({"service_type": "segment", "status": "pending", "prompt": "p"})
+        await storage.update_ai_job(job.id, {"status": "processing"})
+        await storage.update_ai_job(job.id, {"status": "completed", "result": {"mask": "x" * 1000}})
+        return job, storage.job_bytes
+
+    job, job_bytes = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert job_bytes == job.size == len(json.dumps(job.to_dict(), default=str))
+
+
+def test_running_jobs_over_the_limit_do_not_make_every_write_sweep():
+    async def scenario():
+        storage = MemoryStorage(max_jobs=3, max_messages=0, max_age_hours=0, max_bytes=0)
+        running = [await storage.create_ai_job({"service_type": "generate", "status": "processing"}) for _ in range(50)]
+        idle_sweeps = storage.retention_stats["sweeps"]
+
+        for job in running[:2]:
+            await storage.update_ai_job(job.id, {"status": "completed"})
+        await storage.create_ai_job({"service_type": "generate", "status": "processing"})
+        return idle_sweeps, storage.retention_stats, list(storage.ai_jobs), [job.id for job in running]
+
+    idle_sweeps, stats, remaining, running_ids = asyncio.run(scenario())
+    # Only the first write over the limit swept; the others had nothing to evict
+    assert idle_sweeps == 1
+    # The second job to finish is held back from its own update, then evicted by the next write
+    assert stats["evicted_jobs"] == 2
+    assert remaining[:48] == running_ids[2:]
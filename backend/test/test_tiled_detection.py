@@ -0,0 +1,109 @@
+import asyncio
+import io
+
+import numpy as np
+from PIL import Image
+
+from services.tiled_detection import detect_tiled, merge_tile_detections, non_max_suppression, plan_tiles
+from services.uploads import IngestedUpload
+
+
+def upload_of(width: int, height: int) -> IngestedUpload:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (90, 120, 150)).save(buffer, format="JPEG")
+    return IngestedUpload.from_bytes(buffer.getvalue(), "image/jpeg", "digest")
+
+
+def test_tiles_cover_the_image_with_overlap():
+    tiles = plan_tiles(2500, 1000, tile_size=1024, overlap=0.25)
+
+    assert tiles[:, 0].tolist() == [0, 768, 1476]
+    assert (tiles[:, 1] == 0).all()
+    assert tiles[:, 2].max() == 2500 and tiles[:, 3].max() == 1000
+    assert plan_tiles(800, 600, 1024, 0.2).tolist() == [[0, 0, 800, 600]]
+
+
+def test_nms_suppresses_overlaps_within_a_label_only():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [0, 0, 10, 10], [50, 50, 60, 60]], dtype=float)
+    scores = np.array([0.9, 0.8, 0.7, 0.6])
+    labels = np.array(["car", "car", "person", "car"])
+
+    assert non_max_suppression(boxes, scores, labels, 0.5).tolist() == [0, 2, 3]
+
+
+def test_tile_boxes_map_to_global_percentages_and_merge():
+    tiles = plan_tiles(2000, 1000, tile_size=1000, overlap=0.5)
+    # The same car at pixels (900, 400)-(1000, 500) seen by the first two tiles
+    tile_objects = [
+        [{"name": "car", "confidence": 0.9, "bbox": [90, 40, 10, 10]}],
+        [{"name": "Car", "confidence": 0.8, "bbox": [40, 40, 10, 10]}],
+        [{"name": "person", "confidence": 0.7, "bbox": [0, 0, 5, 20]}, {"name": "bad", "bbox": [1, 2]}]
+    ]
+
+    objects, raw = merge_tile_detections(tile_objects, tiles, 2000, 1000)
+
+    assert raw == 4 - 1
+    assert objects == [
+        {"name": "car", "confidence": 0.9, "bbox": [45.0, 40.0, 5.0, 10.0]},
+        {"name": "person", "confidence": 0.7, "bbox": [50.0, 0.0, 2.5, 20.0]}
+    ]
+
+
+def test_detect_tiled_caps_concurrency_and_fails_whole_request_on_tile_error():
+    upload = upload_of(3000, 2000)
+    in_flight = {"now": 0, "peak": 0, "calls": 0}
+
+    async def call(image_url):
+        in_flight["now"] += 1
+        in_flight["calls"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        return {"success": True, "data": {"objects": [{"name": "dot", "confidence": 0.5, "bbox": [45, 45, 10, 10]}]}}
+
+    result = asyncio.run(detect_tiled(upload, call, tile_size=1024, overlap=0.2, max_concurrency=2))
+
+    assert result["success"]
+    assert result["data"]["tiling"]["tiles"] == in_flight["calls"] == 12
+    assert in_flight["peak"] == 2
+    assert len(result["data"]["objects"]) == 12
+
+    async def failing(image_url):
+        return {"success": False, "error": "Object detection failed: blocked", "error_code": "policy_rejection"}
+
+    failed = asyncio.run(detect_tiled(upload, failing, tile_size=1024, overlap=0.2, max_concurrency=1))
+    assert not failed["success"]
+    assert failed["error_code"] == "policy_rejection"
+    assert "1 of 12 tiles" in failed["error"]
+
+
+def test_malformed_confidences_default_to_zero_and_malformed_boxes_are_skipped():
+    tiles = plan_tiles(1000, 1000, tile_size=1000, overlap=0.2)
+    tile_objects = [[
+        {"name": "cup", "confidence": None, "bbox": [0, 0, 10, 10]},
+        {"name": "mug", "confidence": "high", "bbox": [20, 20, 10, 10]},
+        {"name": "jar", "confidence": float("nan"), "bbox": [40, 40, 10, 10]},
+        {"name": "pot", "confidence": "0.6", "bbox": [60, 60, 10, 10]},
+        {"name": "lid", "confidence": 0.9, "bbox": [1, "two", 3, 4]}
+    ]]
+
+    objects, raw = merge_tile_detections(tile_objects, tiles, 1000, 1000)
+
+    assert raw == 4
+    assert [(obj["name"], obj["confidence"]) for obj in objects] == [("pot", 0.6), ("cup", 0.0), ("mug", 0.0), ("jar", 0.0)]
+
+
+def test_detect_tiled_refuses_unreadable_or_oversized_images_without_calling_upstream():
+    calls = []
+
+    async def call(image_url):
+        calls.append(image_url)
+        return {"success": True, "data": {"objects": []}}
+
+    too_many = asyncio.run(detect_tiled(upload_of(3000, 2000), call, tile_size=1024, overlap=0.2, max_tiles=4))
+    unreadable = asyncio.run(detect_tiled(IngestedUpload.from_bytes(b"not an image", "image/jpeg"), call))
+
+    assert not too_many["success"] and too_many["error_code"] == "too_many_tiles"
+    assert "12 tiles" in too_many["error"]
+    assert not unreadable["success"] and unreadable["error_code"] == "unreadable_image"
+    assert calls == []
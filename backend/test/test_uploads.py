@@ -0,0 +1,120 @@
+import asyncio
+import base64
+import io
+import tempfile
+
+import httpx
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from starlette.datastructures import Headers
+
+from services.request_coalescer import content_hash
+from services.uploads import UploadSizeLimitMiddleware, UploadTooLarge, ingest_upload
+
+
+def make_upload(data: bytes, content_type: str = "image/png") -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename="photo.png", headers=Headers({"content-type": content_type}))
+
+
+def test_ingested_upload_takes_over_the_spool_and_matches_in_memory_encoding():
+    data = bytes(range(256)) * 5000 + b"tail"
+    # As Starlette leaves a large file part: spooled and rolled to disk
+    spool = tempfile.SpooledTemporaryFile(max_size=1024)
+    spool.write(data)
+    form_upload = UploadFile(spool, filename="photo.png", headers=Headers({"content-type": "image/png"}))
+
+    upload = asyncio.run(ingest_upload(form_upload, max_size=len(data)))
+    asyncio.run(form_upload.close())
+
+    assert upload.size == len(data)
+    assert upload.digest == content_hash(data)
+    assert upload.data_url() == "data:image/png;base64," + base64.b64encode(data).decode()
+    # The spool is kept rather than copied, and closing the request form leaves it open
+    assert upload.spool is spool and not spool.closed
+
+
+def test_unlisted_or_non_ascii_content_types_are_sent_as_jpeg():
+    async def ingest(content_type):
+        upload = await ingest_upload(make_upload(b"abc", content_type), max_size=1024)
+        return upload.content_type, upload.data_url()
+
+    assert asyncio.run(ingest("IMAGE/WEBP; q=1"))[0] == "image/webp"
+    assert asyncio.run(ingest("image/svg+xml"))[0] == "image/jpeg"
+    assert asyncio.run(ingest("image/pngé")) == ("image/jpeg", "data:image/jpeg;base64,YWJj")
+
+
+def test_ingest_rejects_uploads_over_the_limit():
+    with pytest.raises(UploadTooLarge) as error:
+        asyncio.run(ingest_upload(make_upload(b"x" * 2048), max_size=1024))
+    assert error.value.status_code == 413
+
+
+def test_middleware_stops_oversized_bodies():
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimitMiddleware, paths=["/upload"], max_body_size=4096)
+
+    @app.post("/upload")
+    async def upload(image: UploadFile = File(...)):
+        return {"size": len(await image.read())}
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            small = await client.post("/upload", files={"image": ("a.png", b"x" * 100, "image/png")})
+            large = await client.post("/upload", files={"image": ("a.png", b"x" * 10000, "image/png")})
+
+            async def chunked_body():
+                yield b"x" * 10000
+
+            # Without a Content-Length the limit is enforced while the body is read
+            streamed = await client.post(
+                "/upload", content=chunked_body(),
+                headers={"content-type": "multipart/form-data; boundary=abc"}
+            )
+            return small, large, streamed
+
+    small, large, streamed = asyncio.run(run())
+
+    assert small.json() == {"size": 100}
+    assert large.status_code == 413
+    assert streamed.status_code == 413
+
+
+def test_middleware_rejects_malformed_content_length():
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimitMiddleware, paths=["/upload"], max_body_size=4096)
+
+    @app.post("/upload")
+    async def upload(image: UploadFile = File(...)):
+        return {"size": len(await image.read())}
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(
+                "/upload", content=b"x",
+                headers={"content-length": "12abc", "content-type": "multipart/form-data; boundary=abc"}
+            )
+
+    assert asyncio.run(run()).status_code == 400
+
+
+def test_readers_are_independent_and_last_reference_closes_spool():
+    data = bytes(range(256)) * 20
+    upload = asyncio.run(ingest_upload(make_upload(data), max_size=len(data)))
+
+    first, second = upload.open(), upload.open()
+    assert first.read(100) == data[:100]
+    # A second consumer, such as a background refresh, starts from the beginning
+    assert second.read() == data
+    assert first.read() == data[100:]
+    first.seek(-4, io.SEEK_END)
+    assert first.read() == data[-4:]
+
+    held = upload.retain()
+    upload.close()
+    assert b"".join(held.chunks()) == data
+    held.close()
+    assert upload.spool.closed
+    with pytest.raises(ValueError):
+        upload.retain()
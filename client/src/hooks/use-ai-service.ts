@@ -1,3 +1,4 @@
+import { useEffect } from 'react';
 import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query';
 import { useAIStore } from '@/store/ai-store';
 import { generateImage, classifyImage, detectObjects, segmentImage, sendChatMessage, getChatHistory, getRecentJobs } from '@/lib/api';
@@ -219,8 +220,85 @@ export function useChatHistory() {
   });
 }
 
+const JOB_EVENT_TYPES = ['job.created', 'job.progress', 'job.completed', 'job.failed'];
+const JOB_EVENTS_RETRY_MS = 3000;
+
+// EventSource cannot send the bearer token, so the stream is read with fetch.
+// Calls onEvent with each event's type; resolves when the server ends the stream.
+async function readJobEvents(token: string, signal: AbortSignal, onOpen: () => void, onEvent: (type: string) => void) {
+  const response = await fetch('/api/v1/jobs/events', {
+    headers: { Authorization: `Bearer ${token}` },
+    signal,
+  });
+  if (!response.ok || !response.body) {
+    throw new Error(`Job events failed with status ${response.status}`);
+  }
+  onOpen();
+
+  const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) {
+      return;
+    }
+    buffer += value;
+    let end;
+    while ((end = buffer.indexOf('\n\n')) !== -1) {
+      const frame = buffer.slice(0, end);
+      buffer = buffer.slice(end + 2);
+      const type = frame.split('\n').find((line) => line.startsWith('event: '))?.slice('event: '.length);
+      if (type) {
+        onEvent(type);
+      }
+    }
+  }
+}
+
 export function useRecentJobs() {
   const { setRecentJobs } = useAIStore();
+  const queryClient = useQueryClient();
+  const token = localStorage.getItem('access_token');
+
+  // Events only say which of the user's jobs changed, so each one refetches the list
+  useEffect(() => {
+    if (!token) {
+      return;
+    }
+    const controller = new AbortController();
+    let connected = false;
+    const refetchJobs = () => queryClient.invalidateQueries({ queryKey: ['/api/v1/jobs'] });
+
+    (async () => {
+      while (!controller.signal.aborted) {
+        try {
+          await readJobEvents(
+            token,
+            controller.signal,
+            () => {
+              // Events sent while the stream was down are not replayed; catch up with one fetch
+              if (connected) {
+                refetchJobs();
+              }
+              connected = true;
+            },
+            (type) => {
+              if (JOB_EVENT_TYPES.includes(type)) {
+                refetchJobs();
+              }
+            },
+          );
+        } catch {
+          // Reconnect below unless the component unmounted
+        }
+        if (!controller.signal.aborted) {
+          await new Promise((resolve) => setTimeout(resolve, JOB_EVENTS_RETRY_MS));
+        }
+      }
+    })();
+
+    return () => controller.abort();
+  }, [queryClient, token]);
 
   return useQuery({
     queryKey: ['/api/v1/jobs'],
@@ -229,6 +307,8 @@ export function useRecentJobs() {
       setRecentJobs(data.jobs);
       return data.jobs;
     },
-    refetchInterval: 5000, // Refresh every 5 seconds
+    // Signed-out clients cannot open the event stream, so they poll instead
+    staleTime: token ? Infinity : 0,
+    refetchInterval: token ? false : 5000,
   });
 }